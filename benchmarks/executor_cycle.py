@@ -0,0 +1,136 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.fake_ib import LATENCY, PACING_REQUESTS, PACING_WINDOW, FakeIB
+from benchmarks.suite import RESULTS_DIR, _result, environment
+from benchmarks.synthetic import synthetic_symbols
+from utils import ibkr_data
+from utils.bar_store import BarStore
+from utils.contract_cache import ContractCache
+from utils.run_metrics import RunTimer
+from utils.trade_journal import TradeJournal
+
+# Full prod IBKR cycle (account, qualify, history, evaluate, quotes, orders + fills) against
+# benchmarks.fake_ib.FakeIB, for watchlists far larger than we could try on a real gateway.
+# Each size runs a 'cold' cycle (no bar or contract cache) and a 'warm' one.
+#
+#   python -m benchmarks.executor_cycle                          # 16, 250 and 1,000 symbols
+#   python -m benchmarks.executor_cycle --symbols 2000 --latency-scale 2 --pacing-violation-rate 0.02
+#
+# IB's 60-requests-per-10-minutes pacing is enforced by the fake and the client alike, shrunk by
+# --time-scale so a run takes seconds. 'pacing_bound_seconds' in the results is the floor the
+# real limit puts under the history phase: every request past the first 60 costs 10 seconds.
+# The cycle runs on a temporary bar store, contract cache, indicator state and journal passed to
+# run_cycle; the prod module's own settings are never touched.
+
+SYMBOL_COUNTS = [16, 250, 1000]
+TIME_SCALE = 0.001
+
+def import_prod():
+    '''
+    The prod executor creates its logs directory under a fixed ROOT_DIR on import, which only exists
+    on the trading machine; elsewhere this raises with a readable message instead
+    '''
+    try:
+        from executor import run_live_prod_ibkr
+    except OSError as e:
+        raise RuntimeError(f"executor.run_live_prod_ibkr can't be imported on this machine ({e})") from e
+    return run_live_prod_ibkr
+
+def bench_executor_cycle(n_symbols, time_scale=TIME_SCALE, latency_scale=1.0, pacing_violation_rate=0.0, fill_rate=1.0):
+    prod = import_prod()
+
+    ib = FakeIB(
+        latency={kind: seconds * latency_scale for kind, seconds in LATENCY.items()},
+        pacing_window=PACING_WINDOW * time_scale,
+        pacing_violation_rate=pacing_violation_rate,
+        fill_rate=fill_rate,
+    )
+    ib.connect()
+
+    # One fetcher for both phases, like the daemon keeps one per connection
+    fetcher = ibkr_data.HistoricalDataFetcher(
+        ib,
+        bucket=ibkr_data.TokenBucket(window_seconds=ibkr_data.PACING_WINDOW_SECONDS * time_scale),
+        backoff_seconds=ibkr_data.BACKOFF_SECONDS * time_scale,
+    )
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        settings = {
+            'watchlist': synthetic_symbols(n_symbols),
+            'live_mode': True,
+            'use_service': False,  # The cycle fetches from the fake itself
+            'store': BarStore(tmp / 'bars'),
+            'contract_cache': ContractCache(tmp / 'contracts.json'),
+            'state_dir': tmp / 'indicator_state',
+            'journal': TradeJournal('benchmark', root=tmp / 'trades'),
+            'orders_path': tmp / 'orders.jsonl',
+        }
+
+        for phase in ['cold', 'warm']:
+            ib.calls.clear()
+            timer = RunTimer('benchmark', metrics_dir=tmp / 'metrics')
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                prod.run_cycle(ib, timer=timer, fetcher=fetcher, **settings)
+            seconds = time.perf_counter() - started
+
+            history_requests = ib.calls.get('reqHistoricalData', 0) - ib.calls.get('pacing_violations', 0)
+            timing = {
+                'min': seconds,
+                'median': seconds,
+                'phases': timer.phase_totals(),
+                'calls': dict(ib.calls),
+                'pacing_bound_seconds': max(0, history_requests - PACING_REQUESTS) * PACING_WINDOW / PACING_REQUESTS,
+            }
+            results.append(_result('executor_cycle', 'run_live_prod_ibkr.run_cycle', timing, symbols=n_symbols, phase=phase))
+    return results
+
+def run_benchmark(symbol_counts=SYMBOL_COUNTS, out_path=None, **options):
+    results = []
+    for n_symbols in symbol_counts:
+        print(f"⏱ Benchmarking a prod cycle on {n_symbols} symbols...")
+        for row in bench_executor_cycle(n_symbols, **options):
+            phases = ', '.join(f"{phase} {t['seconds']:.2f}s" for phase, t in row['phases'].items() if t['seconds'] >= 0.01)
+            print(f"   {row['params']['phase']:<5} {row['median']:8.2f} s   {phases}")
+            print(f"         calls {row['calls']} · real pacing floor {row['pacing_bound_seconds'] / 60:.1f} min")
+            results.append(row)
+
+    env = environment()
+    report = {'environment': env, 'options': options, 'results': results}
+    if out_path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        out_path = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{env['commit']}-executor.json"
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"🗂 Results written to {out_path}")
+    return report
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prod IBKR cycle against a fake gateway")
+    parser.add_argument('--symbols', type=int, nargs='+', default=SYMBOL_COUNTS, help="watchlist sizes")
+    parser.add_argument('--time-scale', type=float, default=TIME_SCALE, help="pacing window / backoff multiplier")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="multiplier on the fake's call latencies")
+    parser.add_argument('--pacing-violation-rate', type=float, default=0.0, help="random error 162 rate per history request")
+    parser.add_argument('--fill-rate', type=float, default=1.0, help="chance an order fills at its limit")
+    parser.add_argument('--out', help="result file (default benchmarks/results/<time>-<commit>-executor.json)")
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(
+            args.symbols, out_path=args.out, time_scale=args.time_scale, latency_scale=args.latency_scale,
+            pacing_violation_rate=args.pacing_violation_rate, fill_rate=args.fill_rate,
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,285 @@
+import asyncio
+import random
+import zlib
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_bars
+
+# In-process stand-in for TWS / IB Gateway, for running the IBKR executors offline at any
+# watchlist size. It implements the ib_insync IB calls the executors make (connect, positions,
+# accountValues, qualifyContracts, reqHistoricalData(Async), reqMktData / cancelMktData /
+# waitOnUpdate, placeOrder / cancelOrder, run, sleep) and returns real ib_insync objects, so
+# utils.ibkr_data, utils.order_executor and the executors' run_cycle work against it unchanged.
+#
+#   ib = FakeIB(bars=recorded_bars(BarStore()), latency={'historical': 0.5})
+#   run_live_prod_ibkr.run_cycle(ib)
+#
+# Bars are replayed from `bars` ({symbol: normalize_bars frame}) or generated per symbol from
+# benchmarks.synthetic. Every call waits its configured latency on the event loop (concurrent calls
+# overlap, like the real socket). Historical requests beyond IB's pacing limit are answered with
+# error 162, optionally scaled down in time via pacing_window so big universes finish quickly.
+
+LATENCY = {                 # Seconds per call, before jitter
+    'qualify': 0.05,
+    'historical': 0.2,
+    'quote': 0.1,
+    'ack': 0.05,
+    'fill': 0.3,
+}
+JITTER = 0.2                # Latencies vary uniformly by +/- this fraction
+PACING_REQUESTS = 60        # Historical requests IB accepts per pacing window...
+PACING_WINDOW = 600         # ...of this many seconds
+SYNTHETIC_BARS = 400        # Daily bars generated per synthetic symbol (~1.5 years)
+ACCOUNT = 'DU0000000'
+PACING_VIOLATION = 162
+
+class FakeIB:
+    def __init__(self, bars=None, synthesize=True, capital=100_000.0, positions=None, latency=None,
+                 jitter=JITTER, pacing_requests=PACING_REQUESTS, pacing_window=PACING_WINDOW,
+                 pacing_violation_rate=0.0, fill_rate=1.0, unknown_symbols=(), seed=0):
+        '''
+        bars: {symbol: bars} to replay; synthesize: generate bars for any other symbol.
+        pacing_violation_rate adds random error 162s on top of the real limit; fill_rate is the
+        chance an order fills at its limit (the rest stay working until repriced or cancelled).
+        '''
+        self.bars = dict(bars or {})
+        self.synthesize = synthesize
+        self.cash = capital
+        self.holdings = dict(positions or {})  # {symbol: (shares, avg_cost)}
+        self.latency = {**LATENCY, **(latency or {})}
+        self.jitter = jitter
+        self.pacing_requests = pacing_requests
+        self.pacing_window = pacing_window
+        self.pacing_violation_rate = pacing_violation_rate
+        self.fill_rate = fill_rate
+        self.unknown_symbols = set(unknown_symbols)
+        self.rng = random.Random(seed)
+        self.loop = asyncio.new_event_loop()
+        self.connected = False
+        self.requests = []              # Loop times of accepted historical requests (pacing window)
+        self.calls = {}                 # Call counts, for reports
+        self.tickers = {}
+        self.trades = {}
+        self.next_order_id = 1
+        self.updated = asyncio.Event()
+
+    # === Connection + event loop ===
+    def connect(self, host='127.0.0.1', port=7497, clientId=1, timeout=None):
+        self.connected = True
+        return self
+
+    def disconnect(self):
+        self.connected = False
+
+    def isConnected(self):
+        return self.connected
+
+    def run(self, *awaitables):
+        asyncio.set_event_loop(self.loop)
+        if len(awaitables) == 1:
+            return self.loop.run_until_complete(awaitables[0])
+        return self.loop.run_until_complete(asyncio.gather(*awaitables))
+
+    def sleep(self, seconds=0.02):
+        self.run(asyncio.sleep(seconds))
+        return True
+
+    def waitOnUpdate(self, timeout=0):
+        async def wait():
+            self.updated.clear()
+            try:
+                await asyncio.wait_for(self.updated.wait(), timeout or None)
+            except asyncio.TimeoutError:
+                pass
+        self.run(wait())
+        return True
+
+    def _count(self, call):
+        self.calls[call] = self.calls.get(call, 0) + 1
+
+    def _delay(self, kind):
+        base = self.latency[kind]
+        return max(0.0, base * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    # === Account ===
+    def positions(self):
+        from ib_insync import Position, Stock
+
+        self._count('positions')
+        return [
+            Position(ACCOUNT, Stock(symbol, 'SMART', 'USD'), shares, avg_cost)
+            for symbol, (shares, avg_cost) in self.holdings.items() if shares
+        ]
+
+    def accountValues(self):
+        from ib_insync import AccountValue
+
+        self._count('accountValues')
+        market_value = sum(shares * self._last_close(symbol) for symbol, (shares, _) in self.holdings.items())
+        return [
+            AccountValue(ACCOUNT, 'NetLiquidation', f"{self.cash + market_value:.2f}", 'USD', ''),
+            AccountValue(ACCOUNT, 'TotalCashValue', f"{self.cash:.2f}", 'USD', ''),
+        ]
+
+    # === Contracts ===
+    def qualifyContracts(self, *contracts):
+        self._count('qualifyContracts')
+        self.sleep(self._delay('qualify'))
+        qualified = []
+        for contract in contracts:
+            if contract.symbol in self.unknown_symbols:
+                continue
+            contract.conId = zlib.crc32(contract.symbol.encode()) or 1
+            contract.primaryExchange = contract.primaryExchange or 'ARCA'
+            qualified.append(contract)
+        return qualified
+
+    # === Historical data ===
+    def symbol_bars(self, symbol):
+        if symbol not in self.bars:
+            if not self.synthesize:
+                return None
+            seed = zlib.crc32(symbol.encode())
+            self.bars[symbol] = synthetic_bars(SYNTHETIC_BARS, seed=seed, end=date.today().isoformat(), start_price=20 + seed % 480)
+        return self.bars[symbol]
+
+    def _last_close(self, symbol):
+        bars = self.symbol_bars(symbol)
+        return 0.0 if bars is None or bars.empty else float(bars['Close'].iloc[-1])
+
+    def _pacing_violated(self):
+        now = self.loop.time()
+        self.requests = [t for t in self.requests if now - t < self.pacing_window]
+        if len(self.requests) >= self.pacing_requests or self.rng.random() < self.pacing_violation_rate:
+            return True
+        self.requests.append(now)
+        return False
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime='', durationStr='100 D', barSizeSetting='1 day',
+                                     whatToShow='TRADES', useRTH=True, formatDate=1, keepUpToDate=False,
+                                     chartOptions=None, timeout=60):
+        from ib_insync import BarData
+        from ib_insync.wrapper import RequestError
+
+        self._count('reqHistoricalData')
+        await asyncio.sleep(self._delay('historical'))
+        if self._pacing_violated():
+            self._count('pacing_violations')
+            raise RequestError(0, PACING_VIOLATION, 'Historical Market Data Service error message:API historical data query cancelled')
+
+        bars = self.symbol_bars(contract.symbol)
+        if bars is None:
+            return []
+        window = bars[bars.index >= pd.Timestamp(datetime.now() - _duration(durationStr)).normalize()]
+        return [
+            BarData(ts.date(), row.Open, row.High, row.Low, row.Close, row.Volume, row.Close, 0)
+            for ts, row in zip(window.index, window.itertuples())
+        ]
+
+    def reqHistoricalData(self, *args, **kwargs):
+        return self.run(self.reqHistoricalDataAsync(*args, **kwargs))
+
+    # === Quotes ===
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False, mktDataOptions=None):
+        from ib_insync import Ticker
+
+        self._count('reqMktData')
+        ticker = Ticker(contract=contract)
+        self.tickers[contract.symbol] = ticker
+
+        def tick():
+            last = self._last_close(contract.symbol)
+            ticker.last = last
+            ticker.bid, ticker.ask = round(last * 0.9998, 2), round(last * 1.0002, 2)
+            self.updated.set()
+        self.loop.call_later(self._delay('quote'), tick)
+        return ticker
+
+    def cancelMktData(self, contract):
+        self.tickers.pop(contract.symbol, None)
+
+    # === Orders ===
+    def placeOrder(self, contract, order):
+        from ib_insync import OrderStatus, Trade
+
+        self._count('placeOrder')
+        trade = self.trades.get(order.orderId) if order.orderId else None
+        if trade is not None:
+            # Modification of a working order: the new limit gets its own chance to fill
+            self._schedule_fill(trade)
+            return trade
+
+        order.orderId = self.next_order_id
+        self.next_order_id += 1
+        trade = Trade(contract, order, OrderStatus(orderId=order.orderId, status='PendingSubmit'))
+        self.trades[order.orderId] = trade
+
+        def acknowledge():
+            if not trade.isDone():
+                self._set_status(trade, 'Submitted')
+        self.loop.call_later(self._delay('ack'), acknowledge)
+        self._schedule_fill(trade)
+        return trade
+
+    def cancelOrder(self, order):
+        trade = self.trades.get(order.orderId)
+        if trade is None:
+            return None
+
+        def cancel():
+            if not trade.isDone():
+                self._set_status(trade, 'Cancelled')
+        self.loop.call_later(self._delay('ack'), cancel)
+        return trade
+
+    def _schedule_fill(self, trade):
+        if self.rng.random() < self.fill_rate:
+            self.loop.call_later(self._delay('ack') + self._delay('fill'), self._fill, trade)
+
+    def _fill(self, trade):
+        from ib_insync import CommissionReport, Execution, Fill
+
+        if trade.isDone():
+            return
+        order, symbol = trade.order, trade.contract.symbol
+        shares, price = order.totalQuantity - trade.orderStatus.filled, order.lmtPrice
+        execution = Execution(
+            execId=f"fake.{order.orderId}.{len(trade.fills)}", time=datetime.now(), acctNumber=ACCOUNT,
+            side='BOT' if order.action == 'BUY' else 'SLD', shares=shares, price=price, orderId=order.orderId
+        )
+        fill = Fill(trade.contract, execution, CommissionReport(), execution.time)
+        trade.fills.append(fill)
+        trade.orderStatus.filled = order.totalQuantity
+        trade.orderStatus.remaining = 0
+        trade.orderStatus.avgFillPrice = price
+
+        held, avg_cost = self.holdings.get(symbol, (0, 0.0))
+        if order.action == 'BUY':
+            self.cash -= shares * price
+            self.holdings[symbol] = (held + shares, (held * avg_cost + shares * price) / (held + shares))
+        else:
+            self.cash += shares * price
+            self.holdings[symbol] = (held - shares, avg_cost)
+
+        trade.fillEvent.emit(trade, fill)
+        self._set_status(trade, 'Filled')
+
+    def _set_status(self, trade, status):
+        trade.orderStatus.status = status
+        trade.statusEvent.emit(trade)
+        self.updated.set()
+
+def _duration(duration_str):
+    # IB durationStr ('100 D', '2 W', '1 Y', ...) as a timedelta
+    amount, unit = duration_str.split()
+    days = {'S': 1 / 86400, 'D': 1, 'W': 7, 'M': 31, 'Y': 365}[unit] * int(amount)
+    return timedelta(days=days)
+
+def recorded_bars(store, source='ibkr', bar_size='1 day'):
+    '''
+    {symbol: bars} for every symbol cached in a utils.bar_store.BarStore, to replay real history
+    '''
+    directory = store.path(source, 'x', bar_size).parent
+    return {path.stem: pd.read_parquet(path) for path in sorted(directory.glob('*.parquet'))}
@@ -0,0 +1,128 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Startup-time gate for the entry points.
+# Every measurement runs in a fresh interpreter (so nothing is already imported), takes the median
+# of a few runs, and the script exits 1 if any median is over its budget, if importing an entry
+# point drags in a module that should only load on demand, or if a probe fails outright (reported
+# per module with the error it died on, and the remaining modules still measured).
+#
+#   python -m benchmarks.startup
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RUNS = 5
+
+# Seconds of wall time for the whole child process (includes Python's own startup)
+IMPORT_BUDGET = 1.0
+FIRST_EVALUATION_BUDGET = 1.5
+
+ENTRY_MODULES = [
+    # What launchd actually starts
+    'executor.run_live_prod_ibkr',
+    'executor.run_live_shadow',
+    'executor.run_live_shadow_ibkr',
+    'executor.run_intraday_ibkr',
+    'executor.daemon',
+    'executor.data_service',
+    # Libraries they build on
+    'strategies.defensive_strategy',
+    'simulator.run_simulation',
+    'utils.ibkr_data',
+    'utils.market_data',
+]
+# Only loaded when data is actually fetched / IB is actually contacted
+LAZY_MODULES = ['yfinance', 'ib_insync']
+
+IMPORT_PROBE = '''
+import json, sys
+import {module}
+print(json.dumps([name for name in {lazy!r} if name in sys.modules]))
+'''
+
+# Cold first evaluation: synthetic 100 daily bars through both evaluation paths,
+# with an empty indicator-state directory like a first run
+EVALUATION_PROBE = '''
+import json, sys, tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from strategies.defensive_strategy import evaluate_signal_from_df, evaluate_signal_incremental
+
+rng = np.random.default_rng(0)
+close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 100)))
+df = pd.DataFrame({{
+    "Close": close,
+    "High": close * 1.01,
+    "Low": close * 0.99,
+    "Volume": rng.integers(1_000_000, 2_000_000, 100).astype(float),
+}}, index=pd.bdate_range("2024-01-01", periods=100))
+
+evaluate_signal_from_df(df)
+with tempfile.TemporaryDirectory() as state_dir:
+    evaluate_signal_incremental(df, Path(state_dir) / "BENCH.json")
+print(json.dumps([name for name in {lazy!r} if name in sys.modules]))
+'''
+
+def run_probe(code):
+    '''
+    Runs code in a fresh interpreter and returns (seconds since launch, lazy modules it loaded, error).
+    error is the last line of stderr when the probe exited non-zero, otherwise None.
+    '''
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        stderr = result.stderr.strip().splitlines()
+        return seconds, [], f"exit {result.returncode}: {stderr[-1] if stderr else 'no stderr'}"
+    return seconds, json.loads(result.stdout.strip().splitlines()[-1]), None
+
+def measure(name, code, budget, runs=RUNS):
+    samples, loaded = [], []
+    for _ in range(runs):
+        seconds, loaded, error = run_probe(code)
+        if error is not None:
+            # A failing import fails the same way every run, no point timing it
+            return {'name': name, 'median_seconds': None, 'budget_seconds': budget, 'over_budget': False,
+                    'eager_imports': [], 'error': error}
+        samples.append(seconds)
+    median = statistics.median(samples)
+    return {
+        'name': name,
+        'median_seconds': round(median, 3),
+        'budget_seconds': budget,
+        'over_budget': median > budget,
+        'eager_imports': loaded,
+        'error': None,
+    }
+
+def run_startup_benchmark(runs=RUNS):
+    results = [
+        measure(f'import {module}', IMPORT_PROBE.format(module=module, lazy=LAZY_MODULES), IMPORT_BUDGET, runs)
+        for module in ENTRY_MODULES
+    ]
+    results.append(measure('first evaluation', EVALUATION_PROBE.format(lazy=LAZY_MODULES), FIRST_EVALUATION_BUDGET, runs))
+
+    failed = False
+    for result in results:
+        if result['error'] is not None:
+            failed = True
+            print(f"❌ {result['name']:<40} failed — {result['error']}")
+            continue
+        ok = not result['over_budget'] and not result['eager_imports']
+        failed = failed or not ok
+        status = '✅' if ok else '❌'
+        line = f"{status} {result['name']:<40} {result['median_seconds']:.3f}s (budget {result['budget_seconds']:.1f}s)"
+        if result['eager_imports']:
+            line += f" — eagerly imported {', '.join(result['eager_imports'])}"
+        print(line)
+
+    return results, failed
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    _, failed = run_startup_benchmark()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,224 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import (
+    BARS_PER_YEAR, synthetic_arrays, synthetic_bars, synthetic_batch_fetcher, synthetic_symbols, synthetic_universe
+)
+from signals.indicator_logic import calculate_atr, calculate_ema, calculate_rsi
+from strategies import defensive_strategy
+from strategies.defensive_strategy import calculate_panel_signals, evaluate_signal_fast, evaluate_signal_from_df
+from utils.bar_store import BarStore
+
+# Benchmark suite: indicators, per-ticker and panel signal evaluation, and a full run_simulated_bot
+# cycle, all on synthetic data (no network). Results go to benchmarks/results/<time>-<commit>.json.
+#
+#   python -m benchmarks.suite                      # full run
+#   python -m benchmarks.suite --quick              # smaller grid, for a fast sanity pass
+#   python -m benchmarks.suite --compare OLD NEW    # per-case speed ratio between two result files
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT_DIR / 'benchmarks' / 'results'
+
+HISTORY_LENGTHS = {'100d': 100, '1y': BARS_PER_YEAR, '5y': 5 * BARS_PER_YEAR, '10y': 10 * BARS_PER_YEAR}
+UNIVERSE_SIZES = [16, 500, 5000]
+LIVE_WINDOW = 100          # Bars per ticker in a live evaluation (period='100d')
+BOT_UNIVERSES = [16, 500]  # Watchlist sizes for the end-to-end simulator cycle
+REPEAT = 5
+
+QUICK_HISTORY_LENGTHS = {'100d': 100, '1y': BARS_PER_YEAR}
+QUICK_UNIVERSE_SIZES = [16, 500]
+QUICK_BOT_UNIVERSES = [16]
+
+def time_call(fn, repeat=REPEAT):
+    '''
+    Runs fn repeat times (after one warm-up call); returns {'min', 'median'} seconds
+    '''
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {'min': min(samples), 'median': statistics.median(samples)}
+
+def _result(group, name, timing, **params):
+    return {'group': group, 'name': name, 'params': params, **timing}
+
+# === Cases ===
+
+def bench_indicators(history_lengths):
+    results = []
+    for label, n_bars in history_lengths.items():
+        df = synthetic_bars(n_bars)
+        for name, fn in [
+            ('calculate_ema', lambda: calculate_ema(df, 10)),
+            ('calculate_atr', lambda: calculate_atr(df)),
+            ('calculate_rsi', lambda: calculate_rsi(df)),
+        ]:
+            results.append(_result('indicators', name, time_call(fn), history=label, bars=n_bars))
+    return results
+
+def bench_evaluation(history_lengths):
+    results = []
+    for label, n_bars in history_lengths.items():
+        df = synthetic_bars(n_bars)
+        # evaluate_signal_from_df adds columns and drops rows in place, so each call gets a fresh copy
+        timing = time_call(lambda: evaluate_signal_from_df(df.copy()))
+        results.append(_result('evaluation', 'evaluate_signal_from_df', timing, history=label, bars=n_bars))
+        timing = time_call(lambda: evaluate_signal_fast(df))
+        results.append(_result('evaluation', 'evaluate_signal_fast', timing, history=label, bars=n_bars))
+    return results
+
+def bench_universe(universe_sizes, history_lengths):
+    '''
+    Whole-universe evaluation: one evaluate_signal_from_df per ticker on the live window,
+    and the panel engine across every history length
+    '''
+    results = []
+    for n_symbols in universe_sizes:
+        frames = synthetic_universe(n_symbols, LIVE_WINDOW)
+        timing = time_call(lambda: [evaluate_signal_from_df(df.copy()) for df in frames.values()], repeat=1)
+        results.append(_result('universe', 'evaluate_signal_from_df_loop', timing, symbols=n_symbols, bars=LIVE_WINDOW))
+        timing = time_call(lambda: [evaluate_signal_fast(df) for df in frames.values()], repeat=1)
+        results.append(_result('universe', 'evaluate_signal_fast_loop', timing, symbols=n_symbols, bars=LIVE_WINDOW))
+
+        for label, n_bars in history_lengths.items():
+            arrays = synthetic_arrays(n_symbols, n_bars)
+            timing = time_call(lambda: calculate_panel_signals(arrays), repeat=3)
+            results.append(_result('universe', 'calculate_panel_signals', timing, symbols=n_symbols, history=label, bars=n_bars))
+            del arrays
+    return results
+
+def bench_bot_cycle(universe_sizes):
+    '''
+    End-to-end run_simulated_bot with the yfinance download replaced by synthetic bars.
+    'cold' starts from an empty bar cache and position store, 'warm' reuses them.
+    '''
+    from simulator import run_simulation
+
+    results = []
+    saved = (defensive_strategy.BAR_STORE, defensive_strategy.yfinance_batch_fetcher, run_simulation.WATCHLIST)
+    cwd = os.getcwd()
+    try:
+        for n_symbols in universe_sizes:
+            universe = synthetic_universe(n_symbols, LIVE_WINDOW)
+            defensive_strategy.yfinance_batch_fetcher = lambda **kwargs: synthetic_batch_fetcher(universe)
+            run_simulation.WATCHLIST = synthetic_symbols(n_symbols)
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # Logs, position store and trade journal all resolve relative to the cwd
+                os.chdir(tmp_dir)
+                os.makedirs('logs')
+                defensive_strategy.BAR_STORE = BarStore(Path(tmp_dir) / 'bars')
+
+                for phase in ['cold', 'warm']:
+                    started = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        run_simulation.run_simulated_bot()
+                    seconds = time.perf_counter() - started
+                    timing = {'min': seconds, 'median': seconds}
+                    results.append(_result('bot_cycle', 'run_simulated_bot', timing, symbols=n_symbols, phase=phase))
+
+                from utils.position_store import get_position_store
+                get_position_store().close()  # Release the temp dir's database before it is deleted
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        defensive_strategy.BAR_STORE, defensive_strategy.yfinance_batch_fetcher, run_simulation.WATCHLIST = saved
+    return results
+
+# === Results ===
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def case_key(result):
+    return (result['group'], result['name'], tuple(sorted(result['params'].items())))
+
+def run_suite(quick=False, out_path=None):
+    history_lengths = QUICK_HISTORY_LENGTHS if quick else HISTORY_LENGTHS
+    universe_sizes = QUICK_UNIVERSE_SIZES if quick else UNIVERSE_SIZES
+    bot_universes = QUICK_BOT_UNIVERSES if quick else BOT_UNIVERSES
+
+    results = []
+    for title, bench in [
+        ('indicators', lambda: bench_indicators(history_lengths)),
+        ('evaluation', lambda: bench_evaluation(history_lengths)),
+        ('universe', lambda: bench_universe(universe_sizes, history_lengths)),
+        ('bot cycle', lambda: bench_bot_cycle(bot_universes)),
+    ]:
+        print(f"⏱ Benchmarking {title}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = bench()
+        for row in rows:
+            params = ', '.join(f"{key}={value}" for key, value in row['params'].items())
+            print(f"   {row['name']:<32} {params:<40} {row['median'] * 1000:10.2f} ms")
+        results.extend(rows)
+
+    env = environment()
+    report = {'environment': env, 'quick': quick, 'results': results}
+    if out_path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        out_path = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{env['commit']}.json"
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"🗂 Results written to {out_path}")
+    return report
+
+def compare_results(base_path, new_path):
+    '''
+    Prints new/base median time per case present in both files (>1 means slower)
+    '''
+    with open(base_path) as f:
+        base = {case_key(row): row for row in json.load(f)['results']}
+    with open(new_path) as f:
+        new = json.load(f)['results']
+
+    for row in new:
+        old = base.get(case_key(row))
+        if old is None:
+            continue
+        ratio = row['median'] / old['median'] if old['median'] else float('nan')
+        flag = '🔺' if ratio > 1.1 else '🔻' if ratio < 0.9 else '  '
+        params = ', '.join(f"{key}={value}" for key, value in row['params'].items())
+        print(f"{flag} {row['name']:<32} {params:<40} {old['median'] * 1000:10.2f} → {row['median'] * 1000:10.2f} ms ({ratio:.2f}x)")
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strategy benchmark suite (synthetic data)")
+    parser.add_argument('--quick', action='store_true', help="smaller history/universe grid")
+    parser.add_argument('--out', help="result file (default benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+    else:
+        run_suite(quick=args.quick, out_path=args.out)
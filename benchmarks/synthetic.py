@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Reproducible synthetic OHLCV for benchmarks: geometric random walk closes, high/low around the
+# close, lognormal volume, business-day index. Same (n_bars, seed) always gives the same frame.
+
+END_DATE = '2025-06-30'
+BARS_PER_YEAR = 252
+
+def synthetic_ohlcv(n_bars, seed=0, start_price=100.0):
+    '''
+    {'Open', 'High', 'Low', 'Close', 'Volume'} float arrays for one ticker
+    '''
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0003, 0.012, n_bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + rng.normal(0, 0.002, n_bars))
+    spread = np.abs(rng.normal(0, 0.006, n_bars))
+    return {
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Volume': np.round(rng.lognormal(14, 0.4, n_bars)),
+    }
+
+@lru_cache(maxsize=None)
+def business_days(n_bars, end=END_DATE):
+    # bdate_range(end=..., periods=...) costs tens of ms; thousands of tickers share one index
+    return pd.bdate_range(end=end, periods=n_bars, name='date')
+
+def synthetic_bars(n_bars, seed=0, end=END_DATE, start_price=100.0):
+    '''
+    One ticker's daily bars in the normalize_bars layout (DatetimeIndex 'date' + OHLCV floats)
+    '''
+    return pd.DataFrame(synthetic_ohlcv(n_bars, seed, start_price), index=business_days(n_bars, end))
+
+def synthetic_symbols(n_symbols):
+    return [f"SYN{i:04d}" for i in range(n_symbols)]
+
+def synthetic_universe(n_symbols, n_bars, seed=0, end=END_DATE):
+    '''
+    {symbol: bars} for n_symbols tickers, each with its own seed
+    '''
+    return {
+        symbol: synthetic_bars(n_bars, seed=seed + i, end=end, start_price=20 + (seed + i) % 480)
+        for i, symbol in enumerate(synthetic_symbols(n_symbols))
+    }
+
+def synthetic_arrays(n_symbols, n_bars, seed=0, fields=('Close', 'High', 'Low', 'Volume')):
+    '''
+    The panel_arrays layout ({field: dates x tickers ndarray}) without building a panel DataFrame,
+    so the 5,000-symbol x 10-year case fits in memory
+    '''
+    columns = {field: [] for field in fields}
+    for i in range(n_symbols):
+        bars = synthetic_ohlcv(n_bars, seed=seed + i, start_price=20 + (seed + i) % 480)
+        for field in fields:
+            columns[field].append(bars[field])
+    return {field: np.column_stack(values) for field, values in columns.items()}
+
+def synthetic_batch_fetcher(universe):
+    '''
+    Stand-in for utils.market_data.yfinance_batch_fetcher that serves bars from universe
+    (BarStore.get_many fetch_tails contract: {symbol: bars from start onwards})
+    '''
+    def fetch_tails(symbols, start):
+        frames = {}
+        for symbol in symbols:
+            bars = universe.get(symbol)
+            if bars is None:
+                continue
+            frames[symbol] = bars if start is None else bars[bars.index >= start]
+        return frames
+    return fetch_tails
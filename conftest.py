@@ -0,0 +1,3 @@
+# Lets pytest import the top-level packages (signals, strategies, utils, ...) from the repo root.
+#
+#   python -m pytest -q
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import streamlit as st
+
+# streamlit puts dashboard/ on sys.path, the shared modules live one level up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.pnl_analytics import ANALYTICS_DIR, CHECKPOINT_FILE, load_analytics, refresh_analytics
+
+# Trading dashboard: reads the precomputed tables from utils/pnl_analytics, never the raw trade logs.
+#
+#   streamlit run dashboard/app.py      (from the repo root)
+
+@st.cache_data
+def cached_analytics(version):
+    # version is the checkpoint's mtime, so a refresh (here or from cron) invalidates the cache
+    return load_analytics()
+
+def checkpoint_version():
+    path = Path(ANALYTICS_DIR) / CHECKPOINT_FILE
+    return path.stat().st_mtime if path.exists() else None
+
+st.set_page_config(page_title="Quant Trading", layout="wide")
+st.title("📈 Quant Trading Dashboard")
+
+with st.sidebar:
+    if st.button("🔄 Refresh analytics"):
+        with st.spinner("Folding in new trades..."):
+            refresh_analytics()
+
+version = checkpoint_version()
+if version is None:
+    st.info("No analytics yet. Click **Refresh analytics** (or run `python -m utils.pnl_analytics`).")
+    st.stop()
+
+tables = cached_analytics(version)
+summary, daily, positions, ledger = tables['summary'], tables['daily'], tables['positions'], tables['ledger']
+if summary.empty:
+    st.info("No trades in the journal yet.")
+    st.stop()
+
+executors = list(summary['executor'])
+executor = st.sidebar.selectbox("Executor", executors)
+
+# === Summary ===
+row = summary.set_index('executor').loc[executor]
+cols = st.columns(5)
+cols[0].metric("Total P&L", f"${row['total_pnl']:,.2f}")
+cols[1].metric("Realized", f"${row['realized_pnl']:,.2f}")
+cols[2].metric("Unrealized", f"${row['unrealized_pnl']:,.2f}")
+cols[3].metric("Exposure", f"${row['exposure']:,.2f}")
+cols[4].metric("Max drawdown", f"${row['max_drawdown']:,.2f}")
+st.caption(f"As of {row['as_of']:%Y-%m-%d} · {row['trades']} trades")
+
+# === Curves ===
+curve = daily[daily['executor'] == executor].set_index('date')
+st.subheader("P&L")
+st.line_chart(curve[['realized_pnl', 'total_pnl']])
+left, right = st.columns(2)
+left.subheader("Drawdown")
+left.area_chart(curve['drawdown'])
+right.subheader("Exposure")
+right.area_chart(curve['exposure'])
+
+# === Positions + Trades ===
+st.subheader("Open positions")
+st.dataframe(positions[positions['executor'] == executor].drop(columns='executor'), hide_index=True)
+
+st.subheader("Recent trades")
+recent = ledger[ledger['executor'] == executor].sort_values('date', ascending=False).head(50)
+st.dataframe(recent.drop(columns='executor'), hide_index=True)
+
+st.subheader("All executors")
+st.dataframe(summary, hide_index=True)
@@ -0,0 +1,211 @@
+import json
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+from executor import run_live_prod_ibkr, run_live_shadow_ibkr
+from utils.gen_launchd_blocks import schedule_slots
+from utils.ibkr_data import HistoricalDataFetcher, TokenBucket, connect_ib, qualify_watchlist
+from utils.run_metrics import RunTimer
+
+# Resident executor: one IB connection, warm imports and caches, and evaluation cycles on the
+# same slots the launchd StartCalendarInterval snippet uses, instead of a cold start every 5 minutes.
+#
+#   python -m executor.daemon run        # start the daemon (e.g. under a KeepAlive launchd job)
+#   python -m executor.daemon status     # print the last cycle's status
+#   python -m executor.daemon trigger    # run a cycle now
+
+EXECUTORS = {
+    'prod_ibkr': run_live_prod_ibkr,
+    'shadow_ibkr': run_live_shadow_ibkr,
+}
+DAEMON_EXECUTORS = ['prod_ibkr']
+CLIENT_ID = run_live_prod_ibkr.CLIENT_ID  # Orders stay attached to the prod executor's clientId
+CONTROL_HOST = '127.0.0.1'
+CONTROL_PORT = 8765
+POLL_SECONDS = 1
+RECONNECT_BACKOFF = [5, 10, 30, 60]  # Seconds between reconnect attempts, last one repeats
+
+def launchd_weekday(moment):
+    # launchd counts Sunday as 0 (and 7), Monday as 1
+    return moment.isoweekday() % 7
+
+def next_scheduled_slot(after):
+    '''
+    First minute strictly after `after` that launchd would have fired on
+    '''
+    slots = {(wd % 7, hr, minute) for wd, hr, minute in schedule_slots()}
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(8 * 24 * 60):
+        if (launchd_weekday(moment), moment.hour, moment.minute) in slots:
+            return moment
+        moment += timedelta(minutes=1)
+    return None
+
+class ExecutorDaemon:
+    def __init__(self, executors=DAEMON_EXECUTORS, client_id=CLIENT_ID):
+        self.executors = executors
+        self.client_id = client_id
+        self.ib = None
+        self.bucket = TokenBucket()  # IB's pacing budget, kept across cycles and reconnects
+        self.fetcher = None
+        self.contracts = {}  # Qualified contracts per executor, kept across cycles
+        self.trigger = threading.Event()
+        self.lock = threading.Lock()
+        self.status = {
+            'state': 'starting',
+            'executors': list(executors),
+            'connected': False,
+            'cycles': 0,
+            'last_reason': None,
+            'last_started': None,
+            'last_finished': None,
+            'last_duration': None,
+            'last_error': None,
+            'next_slot': None,
+        }
+
+    def _update(self, **fields):
+        with self.lock:
+            self.status.update(fields)
+
+    def snapshot(self):
+        with self.lock:
+            status = dict(self.status)
+        status['connected'] = bool(self.ib and self.ib.isConnected())
+        return status
+
+    def ensure_connected(self):
+        attempt = 0
+        while self.ib is None or not self.ib.isConnected():
+            try:
+                if self.ib is not None:
+                    self.ib.disconnect()
+                self.ib = connect_ib(self.client_id)
+                self.fetcher = HistoricalDataFetcher(self.ib, bucket=self.bucket)
+                print(f"🔌 Connected to IBKR (clientId {self.client_id})")
+            except Exception as e:
+                self.ib = None
+                delay = RECONNECT_BACKOFF[min(attempt, len(RECONNECT_BACKOFF) - 1)]
+                print(f"🔌 Connection failed ({e}), retrying in {delay}s")
+                self._update(state='reconnecting', last_error=f"connect: {e}")
+                attempt += 1
+                time.sleep(delay)
+
+    def run_cycle(self, reason):
+        self.ensure_connected()
+        started = time.monotonic()
+        self._update(state='running', last_reason=reason, last_started=datetime.now().isoformat(timespec='seconds'))
+        print(f"\n🔁 Cycle started ({reason})")
+
+        errors = []
+        for name in self.executors:
+            module = EXECUTORS[name]
+            timer = RunTimer(name, metrics_dir=module.LOGS_DIR / "metrics")
+            status = 'error'
+            try:
+                if name not in self.contracts:
+                    with timer.span('qualify'):
+                        self.contracts[name] = qualify_watchlist(self.ib, module.WATCHLIST, cache=module.CONTRACT_CACHE)
+                status = 'ok' if module.run_cycle(self.ib, self.contracts[name], timer=timer, fetcher=self.fetcher) else 'no_account'
+                if status != 'ok':
+                    errors.append(f"{name}: account values unavailable")
+            except Exception as e:
+                traceback.print_exc()
+                errors.append(f"{name}: {e!r}")
+                module.JOURNAL.flush()  # Don't lose trades recorded before the failure
+            finally:
+                timer.finish(status)
+
+        duration = time.monotonic() - started
+        with self.lock:
+            self.status.update(
+                state='idle',
+                cycles=self.status['cycles'] + 1,
+                last_finished=datetime.now().isoformat(timespec='seconds'),
+                last_duration=round(duration, 3),
+                last_error='; '.join(errors) or None,
+            )
+        print(f"🔁 Cycle finished in {duration:.1f}s")
+
+    def serve_forever(self):
+        start_control_server(self)
+        self.ensure_connected()
+        next_slot = next_scheduled_slot(datetime.now())
+        self._update(state='idle', next_slot=next_slot and next_slot.isoformat())
+
+        while True:
+            if self.trigger.is_set():
+                self.trigger.clear()
+                self.run_cycle('manual')
+            elif next_slot and datetime.now() >= next_slot:
+                self.run_cycle('schedule')
+                # Slots missed while a cycle overran are skipped, like launchd does for a busy job
+                next_slot = next_scheduled_slot(datetime.now())
+                self._update(next_slot=next_slot and next_slot.isoformat())
+
+            if not self.ib.isConnected():
+                print("🔌 Lost IBKR connection, reconnecting...")
+                self.ensure_connected()
+
+            # ib.sleep keeps ib_insync's event loop serviced between cycles
+            self.ib.sleep(POLL_SECONDS)
+
+# === Control Interface ===
+
+def start_control_server(daemon, host=CONTROL_HOST, port=CONTROL_PORT):
+    class ControlHandler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/status':
+                self._reply(200, daemon.snapshot())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path == '/trigger':
+                daemon.trigger.set()
+                self._reply(202, {'triggered': True})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ControlHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🛰 Control interface on http://{host}:{port} (GET /status, POST /trigger)")
+    return server
+
+def control_request(path, method='GET', host=CONTROL_HOST, port=CONTROL_PORT):
+    request = Request(f"http://{host}:{port}{path}", method=method)
+    with urlopen(request, timeout=5) as response:
+        return json.load(response)
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+
+    if command == 'run':
+        ExecutorDaemon().serve_forever()
+    elif command == 'status':
+        print(json.dumps(control_request('/status'), indent=2))
+    elif command == 'trigger':
+        print(json.dumps(control_request('/trigger', method='POST'), indent=2))
+    else:
+        print(f"Usage: python -m executor.daemon [run|status|trigger] (got '{command}')")
+        exit(2)
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+from utils.bar_store import BAR_COLUMNS, BarStore
+from utils.contract_cache import ContractCache
+from utils.ibkr_data import (
+    HistoricalDataFetcher, TokenBucket, connect_ib, ibkr_batch_fetcher, load_account, qualify_watchlist, snapshot_quotes
+)
+from utils.market_data import yfinance_batch_fetcher
+from utils.run_metrics import NULL_TIMER
+
+# Shared market data for every executor variant: one IB connection fetches the account, each
+# symbol's bars and its quote once per cycle, and prod, shadow and shadow-IBKR read the result
+# instead of each connecting and spending IB's pacing budget on the same history.
+#
+#   python -m executor.data_service run      # start the service (e.g. under a KeepAlive launchd job)
+#   python -m executor.data_service status   # print what it has fetched and served
+#
+# Executors call request_snapshot(); when the service isn't running they fall back to
+# fetch_snapshot() on their own connection, which builds the same snapshot directly.
+# Requests arriving from HTTP threads are queued for the main thread, where ib_insync's event loop
+# runs. Daily bars younger than FRESH_SECONDS are served from memory, so executors that fire in the
+# same slot share one history fetch. The account and quotes move with every fill and tick, so they
+# are only shared for LIVE_FRESH_SECONDS, i.e. between requests that arrive together.
+
+ROOT_DIR = Path.cwd()
+BAR_STORE = BarStore(ROOT_DIR / "data" / "bars")
+CONTRACT_CACHE = ContractCache(ROOT_DIR / "data" / "contracts.json")
+CLIENT_ID = 100
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8766
+FRESH_SECONDS = 120     # Daily bars: covers executors launched in the same schedule slot
+LIVE_FRESH_SECONDS = 5  # Positions, capital and quotes: re-read unless just fetched
+REQUEST_TIMEOUT = 300   # A cold 100-day history fetch can sit behind IB's pacing window
+POLL_SECONDS = 0.2
+RECONNECT_BACKOFF = [5, 10, 30, 60]  # Seconds between reconnect attempts, last one repeats
+BAR_SIZES = {'ibkr': '1 day', 'yfinance': '1d'}
+
+# === Fetching (shared by the service and the direct fallback) ===
+
+def fetch_bars(ib, symbols, source='ibkr', contracts=None, store=BAR_STORE, contract_cache=CONTRACT_CACHE,
+               timer=NULL_TIMER, fetcher=None):
+    '''
+    Daily bars for symbols from IBKR (qualifying any symbol not in contracts first) or yfinance.
+    fetcher (utils.ibkr_data.HistoricalDataFetcher) carries a connection's pacing budget across calls.
+    Returns ({symbol: bars}, [symbols without bars], contracts)
+    '''
+    if source == 'yfinance':
+        with timer.span('history'):
+            frames, empty = store.get_many('yfinance', symbols, BAR_SIZES[source], yfinance_batch_fetcher(auto_adjust=False))
+        return frames, empty, contracts or {}
+
+    missing = [symbol for symbol in symbols if contracts is None or symbol not in contracts]
+    if missing:
+        with timer.span('qualify'):
+            contracts = {**(contracts or {}), **qualify_watchlist(ib, missing, cache=contract_cache)}
+    qualified = [symbol for symbol in symbols if symbol in contracts]
+    with timer.span('history'):
+        frames, empty = store.get_many('ibkr', qualified, BAR_SIZES[source], ibkr_batch_fetcher(ib, contracts, fetcher=fetcher))
+    return frames, empty + [symbol for symbol in symbols if symbol not in contracts], contracts
+
+def fetch_snapshot(ib, symbols, source='ibkr', quotes=True, contracts=None, store=BAR_STORE,
+                   contract_cache=CONTRACT_CACHE, timer=NULL_TIMER, fetcher=None):
+    '''
+    Everything an executor cycle reads, fetched on its own connection:
+    {'positions', 'capital', 'bars', 'empty', 'quotes', 'contracts'}.
+    quotes are live prices ({symbol: price or None}) for every symbol with bars (IBKR only).
+    '''
+    with timer.span('account'):
+        positions, capital = load_account(ib)
+    frames, empty, contracts = fetch_bars(ib, symbols, source, contracts, store, contract_cache, timer, fetcher)
+
+    prices = {}
+    if quotes and source == 'ibkr' and frames:
+        with timer.span('quotes'):
+            prices = snapshot_quotes(ib, {symbol: contracts[symbol] for symbol in frames})
+    return {
+        'positions': positions,
+        'capital': capital,
+        'bars': frames,
+        'empty': empty,
+        'quotes': prices,
+        'contracts': contracts,
+    }
+
+# === Service ===
+
+class MarketDataService:
+    def __init__(self, client_id=CLIENT_ID, store=BAR_STORE, contract_cache=CONTRACT_CACHE, fresh_seconds=FRESH_SECONDS,
+                 live_fresh_seconds=LIVE_FRESH_SECONDS):
+        self.client_id = client_id
+        self.store = store
+        self.contract_cache = contract_cache
+        self.fresh_seconds = fresh_seconds
+        self.live_fresh_seconds = live_fresh_seconds
+        self.ib = None
+        self.bucket = TokenBucket()  # IB's pacing budget, kept across cycles and reconnects
+        self.fetcher = None
+        self.pending = queue.Queue()  # (request, done event, reply holder) from HTTP threads
+        self.contracts = {}
+        self.bars = {}      # (source, symbol) -> (fetched_at monotonic, bars or None)
+        self.quotes = {}    # symbol -> (fetched_at, price or None)
+        self.account = None  # (fetched_at, positions, capital)
+        self.lock = threading.Lock()
+        self.status = {
+            'state': 'starting',
+            'requests': 0,
+            'symbols_fetched': 0,
+            'symbols_served': 0,
+            'last_fetch': None,
+            'last_fetch_duration': None,
+            'last_error': None,
+        }
+
+    def _update(self, **fields):
+        with self.lock:
+            self.status.update(fields)
+
+    def snapshot_status(self):
+        with self.lock:
+            status = dict(self.status)
+        status['connected'] = bool(self.ib and self.ib.isConnected())
+        status['cached_symbols'] = len(self.bars)
+        return status
+
+    def request(self, request, timeout=REQUEST_TIMEOUT):
+        '''
+        Called from an HTTP thread: queues the request for the main loop and waits for its reply
+        '''
+        done, reply = threading.Event(), {}
+        self.pending.put((request, done, reply))
+        if not done.wait(timeout):
+            return {'error': f"timed out after {timeout}s"}
+        return reply
+
+    def ensure_connected(self):
+        attempt = 0
+        while self.ib is None or not self.ib.isConnected():
+            try:
+                if self.ib is not None:
+                    self.ib.disconnect()
+                self.ib = connect_ib(self.client_id)
+                self.fetcher = HistoricalDataFetcher(self.ib, bucket=self.bucket)
+                print(f"🔌 Connected to IBKR (clientId {self.client_id})")
+            except Exception as e:
+                self.ib = None
+                delay = RECONNECT_BACKOFF[min(attempt, len(RECONNECT_BACKOFF) - 1)]
+                print(f"🔌 Connection failed ({e}), retrying in {delay}s")
+                self._update(state='reconnecting', last_error=f"connect: {e}")
+                attempt += 1
+                time.sleep(delay)
+
+    def _fresh(self, entry, now, max_age):
+        return entry is not None and now - entry[0] < max_age
+
+    def serve(self, batch):
+        '''
+        Answers every queued request, fetching only what no request in this batch has already
+        fetched (nor a recent one: FRESH_SECONDS for bars, LIVE_FRESH_SECONDS for the account and
+        quotes): one account read, one history round per source and one quote snapshot at most.
+        '''
+        self.ensure_connected()
+        started, now = time.monotonic(), time.monotonic()
+        fetched = 0
+
+        if not self._fresh(self.account, now, self.live_fresh_seconds):
+            positions, capital = load_account(self.ib)
+            self.account = (time.monotonic(), positions, capital)
+
+        for source in BAR_SIZES:
+            wanted = {symbol for request, _, _ in batch if request['source'] == source for symbol in request['symbols']}
+            stale = sorted(symbol for symbol in wanted if not self._fresh(self.bars.get((source, symbol)), now, self.fresh_seconds))
+            if stale:
+                frames, _, self.contracts = fetch_bars(
+                    self.ib, stale, source, self.contracts, self.store, self.contract_cache, fetcher=self.fetcher
+                )
+                for symbol in stale:
+                    self.bars[(source, symbol)] = (time.monotonic(), frames.get(symbol))
+                fetched += len(stale)
+
+        wanted = {
+            symbol for request, _, _ in batch if request['quotes'] and request['source'] == 'ibkr'
+            for symbol in request['symbols']
+            if self.bars.get(('ibkr', symbol), (0, None))[1] is not None
+        }
+        stale = sorted(symbol for symbol in wanted if not self._fresh(self.quotes.get(symbol), now, self.live_fresh_seconds))
+        if stale:
+            prices = snapshot_quotes(self.ib, {symbol: self.contracts[symbol] for symbol in stale})
+            for symbol in stale:
+                self.quotes[symbol] = (time.monotonic(), prices.get(symbol))
+
+        served = 0
+        for request, done, reply in batch:
+            reply.update(self._reply(request))
+            served += len(request['symbols'])
+            done.set()
+
+        duration = time.monotonic() - started
+        with self.lock:
+            self.status.update(
+                state='idle',
+                requests=self.status['requests'] + len(batch),
+                symbols_fetched=self.status['symbols_fetched'] + fetched,
+                symbols_served=self.status['symbols_served'] + served,
+                last_error=None,
+            )
+            if fetched:
+                self.status.update(last_fetch=datetime.now().isoformat(timespec='seconds'), last_fetch_duration=round(duration, 3))
+        print(f"📡 Served {len(batch)} request(s), {served} symbols ({fetched} fetched) in {duration:.1f}s")
+
+    def _reply(self, request):
+        _, positions, capital = self.account
+        bars, empty = {}, []
+        for symbol in request['symbols']:
+            frame = self.bars[(request['source'], symbol)][1]
+            if frame is None:
+                empty.append(symbol)
+            else:
+                bars[symbol] = encode_bars(frame)
+        quotes = {}
+        if request['quotes'] and request['source'] == 'ibkr':
+            quotes = {symbol: self.quotes[symbol][1] for symbol in bars}
+        return {'positions': positions, 'capital': capital, 'bars': bars, 'empty': empty, 'quotes': quotes}
+
+    def serve_forever(self):
+        start_service_server(self)
+        self.ensure_connected()
+        self._update(state='idle')
+
+        while True:
+            batch = []
+            while not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            if batch:
+                self._update(state='fetching')
+                try:
+                    self.serve(batch)
+                except Exception as e:
+                    traceback.print_exc()
+                    self._update(state='idle', last_error=repr(e))
+                    for _, done, reply in batch:
+                        if not done.is_set():
+                            reply['error'] = repr(e)
+                            done.set()
+
+            if not self.ib.isConnected():
+                print("🔌 Lost IBKR connection, reconnecting...")
+                self.ensure_connected()
+
+            # ib.sleep keeps ib_insync's event loop serviced between requests
+            self.ib.sleep(POLL_SECONDS)
+
+def encode_bars(df):
+    return {
+        'dates': [timestamp.isoformat() for timestamp in df.index],
+        'values': df[BAR_COLUMNS].to_numpy().tolist(),
+    }
+
+def decode_bars(payload):
+    index = pd.DatetimeIndex(pd.to_datetime(payload['dates']), name='date')
+    return pd.DataFrame(payload['values'], index=index, columns=BAR_COLUMNS, dtype=float)
+
+# === HTTP Interface ===
+
+def start_service_server(service, host=SERVICE_HOST, port=SERVICE_PORT):
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/status':
+                self._reply(200, service.snapshot_status())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/snapshot':
+                self._reply(404, {'error': 'not found'})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                request = {
+                    'symbols': list(dict.fromkeys(body['symbols'])),
+                    'source': body.get('source', 'ibkr'),
+                    'quotes': bool(body.get('quotes', True)),
+                }
+                if request['source'] not in BAR_SIZES:
+                    raise ValueError(f"unknown source {request['source']!r}")
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {'error': str(e)})
+                return
+            reply = service.request(request)
+            self._reply(503 if 'error' in reply else 200, reply)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🛰 Market data service on http://{host}:{port} (POST /snapshot, GET /status)")
+    return server
+
+# === Client ===
+
+def request_snapshot(symbols, source='ibkr', quotes=True, host=SERVICE_HOST, port=SERVICE_PORT, timeout=REQUEST_TIMEOUT):
+    '''
+    The service's snapshot for symbols, in fetch_snapshot's layout (without 'contracts').
+    Returns None when the service is not running or failed, so the caller can fetch directly.
+    '''
+    body = json.dumps({'symbols': list(symbols), 'source': source, 'quotes': quotes}).encode()
+    request = Request(f"http://{host}:{port}/snapshot", data=body, method='POST',
+                      headers={'Content-Type': 'application/json'})
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            payload = json.load(response)
+    except (URLError, OSError) as e:
+        print(f"📡 Market data service unavailable ({getattr(e, 'reason', e)}), fetching directly")
+        return None
+
+    return {
+        'positions': payload['positions'],
+        'capital': payload['capital'],
+        'bars': {symbol: decode_bars(bars) for symbol, bars in payload['bars'].items()},
+        'empty': payload['empty'],
+        'quotes': payload['quotes'],
+    }
+
+def get_snapshot(ib, symbols, source='ibkr', quotes=True, contracts=None, store=BAR_STORE,
+                 contract_cache=CONTRACT_CACHE, timer=NULL_TIMER, use_service=True, fetcher=None):
+    '''
+    request_snapshot, or fetch_snapshot on ib when the service is off or unreachable
+    '''
+    if use_service:
+        with timer.span('data_service'):
+            snapshot = request_snapshot(symbols, source, quotes)
+        if snapshot is not None:
+            return snapshot
+    return fetch_snapshot(ib, symbols, source, quotes, contracts, store, contract_cache, timer, fetcher)
+
+def service_status(host=SERVICE_HOST, port=SERVICE_PORT):
+    with urlopen(f"http://{host}:{port}/status", timeout=5) as response:
+        return json.load(response)
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+
+    if command == 'run':
+        MarketDataService().serve_forever()
+    elif command == 'status':
+        print(json.dumps(service_status(), indent=2))
+    else:
+        print(f"Usage: python -m executor.data_service [run|status] (got '{command}')")
+        exit(2)
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from datetime import datetime
+
+from executor import run_live_prod_ibkr
+from executor.run_live_prod_ibkr import LOGS_DIR, BAR_STORE, CONTRACT_CACHE
+from signals.indicator_state import IndicatorSet
+from strategies.defensive_strategy import evaluate_closed_bar
+from utils.ibkr_data import HistoricalDataFetcher, connect_ib, load_account, qualify_watchlist, ibkr_batch_fetcher
+from utils.order_executor import OrderExecutor
+from utils.realtime_bars import REALTIME_BAR_SECONDS, BarAggregator, bar_size_seconds
+from utils.run_metrics import NULL_TIMER, RunTimer
+from utils.trade_journal import TradeJournal
+
+# Event-driven intraday executor: subscribes to 5-second real-time bars for the watchlist, folds
+# them into BAR_SIZE bars and evaluates the defensive strategy the moment each bar closes, instead
+# of waiting for the next launchd slot. Indicators are seeded once from intraday history and then
+# updated one bar at a time (strategies.defensive_strategy.evaluate_closed_bar).
+#
+#   python -m executor.run_intraday_ibkr      # runs until Ctrl-C / disconnect
+
+# === Settings ===
+WATCHLIST = run_live_prod_ibkr.WATCHLIST
+BAR_SIZE = '5 mins'        # IB barSizeSetting of the bars the strategy sees
+BAR_SECONDS = bar_size_seconds(BAR_SIZE)  # For the real-time aggregation
+HISTORY_DAYS = 10          # Intraday history used to warm the indicators up (~780 five-minute bars)
+LIVE_MODE = False          # True: size + place orders through the prod executor; False: journal signals only
+CLIENT_ID = 104            # Different clientId from the launchd executors
+
+# === File + Log Paths ===
+TRADES_PATH = LOGS_DIR / "trades_intraday_ibkr.csv"
+ORDERS_PATH = LOGS_DIR / "orders_intraday_ibkr.jsonl"
+JOURNAL = TradeJournal('intraday_ibkr', TRADES_PATH, root=LOGS_DIR / "trades")
+
+class IntradayRunner:
+    def __init__(self, ib, contracts, bar_seconds=BAR_SECONDS, timer=NULL_TIMER):
+        self.ib = ib
+        self.contracts = contracts
+        self.bar_seconds = bar_seconds
+        self.timer = timer
+        self.states = {symbol: IndicatorSet() for symbol in contracts}
+        self.aggregators = {symbol: BarAggregator(bar_seconds) for symbol in contracts}
+        self.subscriptions = {}
+        self.fetcher = HistoricalDataFetcher(ib)  # One pacing budget for every history request on this connection
+        self.orders = OrderExecutor(ib, journal=run_live_prod_ibkr.JOURNAL, timer=timer, log_path=ORDERS_PATH)
+
+    # === Warm-up ===
+    def seed(self):
+        '''
+        Commits the finished intraday history bars to each symbol's indicators. A bar that is still
+        forming seeds the aggregator, and the real-time bars complete it.
+        '''
+        bar_frames, bar_empty = BAR_STORE.get_many(
+            'ibkr', list(self.contracts), BAR_SIZE,
+            ibkr_batch_fetcher(self.ib, self.contracts, bar_size=BAR_SIZE, duration=f'{HISTORY_DAYS} D', fetcher=self.fetcher),
+            lookback_days=HISTORY_DAYS
+        )
+        for symbol in bar_empty:
+            print(f"[{symbol}] ⚠️ No intraday history, indicators start cold.")
+
+        now = time.time()
+        for symbol, df in bar_frames.items():
+            state = self.states[symbol]
+            for date, row in df.iterrows():
+                # Naive IB timestamps are in TWS local time, which is this machine's time
+                start = date.to_pydatetime().timestamp()
+                if start + self.bar_seconds > now:
+                    self.aggregators[symbol].seed(start, row['Open'], row['High'], row['Low'], row['Close'], row['Volume'])
+                    break
+                state.update(row['Close'], row['High'], row['Low'], row['Volume'], date.isoformat())
+            print(f"[{symbol}] 🌱 Seeded with {state.bars_seen} bars")
+
+    # === Streaming ===
+    def subscribe(self):
+        for symbol, contract in self.contracts.items():
+            bars = self.ib.reqRealTimeBars(contract, REALTIME_BAR_SECONDS, 'TRADES', useRTH=True)
+            bars.updateEvent += self._handler(symbol)
+            self.subscriptions[symbol] = bars
+        print(f"📡 Subscribed to real-time bars for {len(self.subscriptions)} symbols")
+
+    def unsubscribe(self):
+        for bars in self.subscriptions.values():
+            self.ib.cancelRealTimeBars(bars)
+        self.subscriptions.clear()
+
+    def _handler(self, symbol):
+        def on_update(bars, has_new_bar):
+            if has_new_bar:
+                bar = bars[-1]
+                for finished in self.aggregators[symbol].add(bar.time, bar.open_, bar.high, bar.low, bar.close, bar.volume):
+                    self.on_bar(symbol, finished)
+        return on_update
+
+    def on_bar(self, symbol, bar):
+        closed_at = bar['start'] + self.bar_seconds
+        with self.timer.span('evaluate', symbol):
+            buy, sell, price = evaluate_closed_bar(
+                self.states[symbol], bar['Close'], bar['High'], bar['Low'], bar['Volume'],
+                datetime.fromtimestamp(bar['start']).isoformat()
+            )
+        signal_time = time.monotonic()
+        if price is None:
+            return
+
+        held_positions, capital = load_account(self.ib)  # Served from ib_insync's synced cache, no round trip
+        if capital is None:
+            return
+
+        holding = held_positions.get(symbol, 0) > 0
+        if LIVE_MODE:
+            run_live_prod_ibkr.act_on_signal(
+                self.orders, symbol, self.contracts[symbol], buy, sell, price, held_positions, capital,
+                signal_time=signal_time, reason="Intraday Signal"
+            )
+            # Already inside the event loop: track the fills in the background, journal when done
+            asyncio.ensure_future(self._settle_orders())
+        elif buy and not holding:
+            print(f"[{symbol}] 🟢 BUY signal @ ${price:.2f}")
+            JOURNAL.record(symbol, "BUY", price, int((capital * run_live_prod_ibkr.POSITION_PCT) / price), "Intraday Signal")
+        elif sell and holding:
+            print(f"[{symbol}] 🔴 SELL signal @ ${price:.2f}")
+            JOURNAL.record(symbol, "SELL", price, held_positions[symbol], "Intraday Signal")
+        JOURNAL.flush()
+
+        print(f"[{symbol}] ⏱ Bar {datetime.fromtimestamp(bar['start']):%H:%M} decided {time.time() - closed_at:.2f}s after close")
+
+    async def _settle_orders(self):
+        await self.orders.settle()
+        run_live_prod_ibkr.JOURNAL.flush()
+
+def main():
+    timer = RunTimer('intraday_ibkr', metrics_dir=LOGS_DIR / "metrics")
+    status, ib, runner = 'error', None, None
+    try:
+        with timer.span('connect'):
+            ib = connect_ib(CLIENT_ID)
+        with timer.span('qualify'):
+            contracts = qualify_watchlist(ib, WATCHLIST, cache=CONTRACT_CACHE)
+        runner = IntradayRunner(ib, contracts, timer=timer)
+        with timer.span('history'):
+            runner.seed()
+        runner.subscribe()
+        ib.run()  # Serve bar events until disconnect or Ctrl-C
+        status = 'ok'
+    except KeyboardInterrupt:
+        status = 'ok'
+    finally:
+        if runner is not None and ib.isConnected():
+            runner.unsubscribe()
+        JOURNAL.close()
+        run_live_prod_ibkr.JOURNAL.flush()
+        if ib is not None:
+            ib.disconnect()
+        timer.finish(status)
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    main()
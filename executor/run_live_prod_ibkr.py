@@ -1,158 +1,206 @@
-from ib_insync import IB, Stock, LimitOrder
-from strategies.defensive_strategy import evaluate_signal_from_df
+from strategies.defensive_strategy import evaluate_signal_incremental
 from datetime import datetime
-import pandas as pd
-import csv
-import os
-from pathlib import Path
 import time
+from pathlib import Path
+from utils.bar_store import BarStore
+from utils.trade_journal import TradeJournal
+from utils.run_metrics import NULL_TIMER, RunTimer
+from utils.contract_cache import ContractCache
+from utils.order_executor import OrderExecutor
+from utils.portfolio_state import BUY, SELL, size_orders
+from utils.universe import ETF_WATCHLIST, screened_watchlist
+from utils.ibkr_data import connect_ib, qualify_watchlist
+from executor.data_service import get_snapshot
 
 # === Settings ===
-WATCHLIST = ['QQQM', 'VOO', 'IAU', 'IEFA', 'VWO', 'BOTZ', 'ROBO', 'XLE', 'VGK', 'EWJ', 'IJH', 'XLV', 'XLU', 'CPNG', 'AAPL', 'TSLA']
-POSITION_PCT = 0.2
-MAX_POSITION_PCT = 0.4
+WATCHLIST = ETF_WATCHLIST + ['CPNG', 'AAPL', 'TSLA']
+UNIVERSE_SCREEN = False  # Also evaluate the survivors of the daily universe screen (utils/universe.py)
+POSITION_PCT = 0.2       # Of account value per trade (utils/portfolio_state.size_orders)
+MAX_POSITION_PCT = 0.4   # No new trade once a position is above this share of the account
 LIVE_MODE = True   # Toggle live trading on/off
-today = datetime.today().strftime("%m/%d/%Y %H:%M:%S")
+USE_DATA_SERVICE = True  # Read account, bars and quotes from executor/data_service.py when it is running
+CLIENT_ID = 103    # Different clientId for live executor
 
 # === File + Log Paths ===
 ROOT_DIR = Path("/Users/ianchang/Desktop/local-projects/quant-trading")
 LOGS_DIR = ROOT_DIR / "logs"
 TRADES_PATH = LOGS_DIR / "trades_live_PROD_ibkr.csv"
+ORDERS_PATH = LOGS_DIR / "orders_live_PROD_ibkr.jsonl"  # One line per order: fills, reprices, latencies
+STATE_DIR = LOGS_DIR / "indicator_state" / "ibkr"  # Resumable indicator state per symbol
+BAR_STORE = BarStore(ROOT_DIR / "data" / "bars")
+CONTRACT_CACHE = ContractCache(ROOT_DIR / "data" / "contracts.json")  # Qualified contracts, 7-day TTL
+UNIVERSE_PATH = ROOT_DIR / "data" / "universe.txt"
+SCREEN_PATH = ROOT_DIR / "data" / "universe_screen.json"
 LOGS_DIR.mkdir(exist_ok=True)
-
-# === IBKR Setup ===
-ib = IB()
-ib.connect('127.0.0.1', 7497, clientId=103, timeout=10)  # Different clientId for live executor
-time.sleep(1)
-
-account_id = ib.managedAccounts()[0]
-
-# === Logging Function ===
-def log_live_trade(ticker, action, price, shares, reason):
-    file_exists = TRADES_PATH.exists()
-    with open(TRADES_PATH, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['date', 'ticker', 'action', 'price', 'shares', 'reason'])
-        writer.writerow([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            ticker,
-            action,
-            round(price, 2),
-            shares,
-            reason
-        ])
-# Logs number of shares per trade
-
-# === Portfolio and Cash Check ===
-portfolio = ib.positions()
-held_positions = {p.contract.symbol: p.position for p in portfolio if p.position > 0}
-
-account_values = ib.accountValues()
-cash_available = None
-for val in account_values:
-    if val.tag == 'NetLiquidation' and val.currency == 'USD':
-        cash_available = float(val.value)
-        break
-
-if cash_available is None:
-    print("❌ Could not find NetLiquidation value.")
-    ib.disconnect()
-    exit(1)
-
-capital = cash_available
-print(f"💰 Account value: ${capital:,.2f}")
-
-# === Main Loop ===
-for symbol in WATCHLIST:
-    print(f"\n→ Evaluating {symbol}...")
-
-    try:
-        contract = Stock(symbol, 'SMART', 'USD')
-        ib.qualifyContracts(contract)
-
-        bars = ib.reqHistoricalData(
-            contract,
-            endDateTime='',
-            durationStr='100 D',
-            barSizeSetting='1 day',
-            whatToShow='TRADES',
-            useRTH=True,
-            formatDate=1
-        )
-
-        if not bars:
-            raise ValueError("No historical data returned.")
-
-        df = pd.DataFrame(bars)
-        df.rename(columns={'close': 'Close', 'high': 'High', 'low': 'Low', 'volume': 'Volume'}, inplace=True)
-
-    except Exception as e:
-        print(f"[{symbol}] ❌ Failed to fetch historical data: {e}")
-        continue
-
-    buy, sell, signal_price = evaluate_signal_from_df(df)
-    if signal_price is None:
-        print(f"[{symbol}] ❎ Skipped — not enough data for signal")
-        continue
-
-    snapshot = ib.reqMktData(contract, "", False, False)
-    time.sleep(1)
-
-    execution_price = None
-    if snapshot.bid and snapshot.ask and snapshot.bid > 0 and snapshot.ask > 0:
-        execution_price = (snapshot.bid + snapshot.ask) / 2
-    elif snapshot.last and snapshot.last > 0:
-        execution_price = snapshot.last
-    elif signal_price:
-        execution_price = signal_price
-
-    if not execution_price or pd.isna(execution_price):
-        print(f"[{symbol}] ❌ No execution price, skipping.")
-        continue
-
+JOURNAL = TradeJournal('prod_ibkr', TRADES_PATH, root=LOGS_DIR / "trades")  # Buffered; written at the end of each cycle
+
+def run_cycle(ib, contracts=None, timer=NULL_TIMER, fetcher=None, watchlist=None, live_mode=None, use_service=None,
+              store=None, contract_cache=None, state_dir=None, journal=None, orders_path=None):
+    '''
+    One evaluation + order cycle on an already connected IB.
+    contracts can carry qualified {symbol: contract} over from an earlier cycle, and fetcher
+    (utils.ibkr_data.HistoricalDataFetcher) the connection's pacing budget.
+    timer (utils.run_metrics.RunTimer) gets a span per phase and per symbol.
+    watchlist through orders_path default to the settings above (benchmarks pass their own).
+    Returns False if the account could not be read.
+    '''
+    watchlist = WATCHLIST if watchlist is None else watchlist
+    live_mode = LIVE_MODE if live_mode is None else live_mode
+    use_service = USE_DATA_SERVICE if use_service is None else use_service
+    store = BAR_STORE if store is None else store
+    contract_cache = CONTRACT_CACHE if contract_cache is None else contract_cache
+    state_dir = STATE_DIR if state_dir is None else state_dir
+    journal = JOURNAL if journal is None else journal
+    orders_path = ORDERS_PATH if orders_path is None else orders_path
+    today = datetime.today().strftime("%m/%d/%Y %H:%M:%S")
+
+    # === Account, bars and quotes: from the market data service, else fetched on this connection ===
+    snapshot = get_snapshot(ib, watchlist, contracts=contracts, store=store, contract_cache=contract_cache,
+                            timer=timer, use_service=use_service, fetcher=fetcher)
+    held_positions, capital = snapshot['positions'], snapshot['capital']
+    if capital is None:
+        return False
+
+    print(f"💰 Account value: ${capital:,.2f}")
+
+    # === Symbols: the watchlist, or it plus held positions and the universe screen's survivors ===
+    symbols = watchlist
+    if UNIVERSE_SCREEN:
+        with timer.span('screen'):
+            symbols = screened_watchlist(
+                watchlist, held_positions, universe_path=UNIVERSE_PATH, store=store, screen_path=SCREEN_PATH
+            )
+        print(f"🔎 Evaluating {len(symbols)} symbols ({len(watchlist)} core)")
+        extra = [symbol for symbol in symbols if symbol not in watchlist]
+        if extra:
+            more = get_snapshot(ib, extra, contracts=snapshot.get('contracts', contracts), store=store,
+                                contract_cache=contract_cache, timer=timer, use_service=use_service, fetcher=fetcher)
+            snapshot['bars'].update(more['bars'])
+            snapshot['empty'] = snapshot['empty'] + more['empty']
+            snapshot['quotes'].update(more['quotes'])
+            snapshot['contracts'] = {**snapshot.get('contracts', {}), **more.get('contracts', {})}
+    bar_frames, bar_empty, quotes = snapshot['bars'], snapshot['empty'], snapshot['quotes']
+
+    # === Contracts for the orders (already qualified when the bars were fetched here) ===
+    contracts = {**(contracts or {}), **snapshot.get('contracts', {})}
+    missing = [symbol for symbol in symbols if symbol not in contracts]
+    if missing:
+        with timer.span('qualify'):
+            contracts.update(qualify_watchlist(ib, missing, cache=contract_cache))
+
+    # === Evaluation Loop ===
+    signals, signal_times = {}, {}
+    for symbol in symbols:
+        print(f"\n→ Evaluating {symbol}...")
+
+        try:
+            if symbol not in contracts:
+                raise ValueError("Contract could not be qualified.")
+
+            if symbol in bar_empty or symbol not in bar_frames:
+                raise ValueError("No historical data returned.")
+            df = bar_frames[symbol]
+
+        except Exception as e:
+            print(f"[{symbol}] ❌ Failed to fetch historical data: {e}")
+            continue
+
+        with timer.span('evaluate', symbol):
+            buy, sell, signal_price = evaluate_signal_incremental(df, state_dir / f"{symbol}.json")
+        if signal_price is None:
+            print(f"[{symbol}] ❎ Skipped — not enough data for signal")
+            continue
+
+        signals[symbol] = (buy, sell, signal_price)
+        signal_times[symbol] = time.monotonic()
+
+    # === Sizing + Actions: size every signal at once (live quote, signal close when there was none),
+    # submit every order, then track them together until filled or cancelled ===
+    evaluated = list(signals)
+    prices = [quotes.get(symbol) or signals[symbol][2] for symbol in evaluated]
+    held = [held_positions.get(symbol, 0) for symbol in evaluated]
+    sized = size_orders(
+        [signals[symbol][0] for symbol in evaluated], [signals[symbol][1] for symbol in evaluated],
+        prices, held, capital, POSITION_PCT, MAX_POSITION_PCT
+    )
+    orders = OrderExecutor(ib, journal=journal, timer=timer, log_path=orders_path)
+    for i, symbol in enumerate(evaluated):
+        act_on_order(orders, symbol, contracts[symbol], sized['action'][i], sized['quantity'][i], sized['skip'][i],
+                     prices[i], held[i], capital, signal_time=signal_times[symbol], live_mode=live_mode)
+    with timer.span('fills'):
+        orders.wait()
+
+    # === End of Run ===
+    with timer.span('journal'):
+        journal.close()
+    print(f"{'='*10} End of Execution {today} {'='*10}\n")
+    return True
+
+def act_on_signal(orders, symbol, contract, buy, sell, execution_price, held_positions, capital,
+                  signal_time=None, reason="Live Signal"):
+    '''
+    Sizes and acts on one symbol's signal, for callers that decide a symbol at a time
+    (the intraday executor); run_cycle sizes the whole cycle with one size_orders call.
+    '''
     current_shares = held_positions.get(symbol, 0)
-    current_value = current_shares * execution_price
-
-    if current_value / capital > MAX_POSITION_PCT:
-        print(f"[{symbol}] ⚠️ Position too large ({current_value/capital:.1%}), skipping BUY.")
-        continue
-
-    shares_to_trade = int((capital * POSITION_PCT) / execution_price)
-    if shares_to_trade == 0:
+    sized = size_orders([buy], [sell], [execution_price], [current_shares], capital, POSITION_PCT, MAX_POSITION_PCT)
+    act_on_order(orders, symbol, contract, sized['action'][0], sized['quantity'][0], sized['skip'][0],
+                 execution_price, current_shares, capital, signal_time, reason)
+
+def act_on_order(orders, symbol, contract, action, quantity, skip, execution_price, current_shares, capital,
+                 signal_time=None, reason="Live Signal", live_mode=None):
+    '''
+    Submits one sized order (utils.portfolio_state.size_orders) to orders (utils.order_executor),
+    which journals the real fill once it is known. Dry runs journal the intended trade straight away,
+    in the same journal.
+    '''
+    live_mode = LIVE_MODE if live_mode is None else live_mode
+    if skip == 'no_price':
+        print(f"[{symbol}] ❌ No execution price, skipping.")
+    elif skip == 'too_large':
+        print(f"[{symbol}] ⚠️ Position too large ({current_shares * execution_price / capital:.1%}), skipping BUY.")
+    elif skip == 'too_small':
         print(f"[{symbol}] ⚠️ Trade size too small, skipping.")
-        continue
+    elif skip == 'not_held':
+        print(f"[{symbol}] ⚪ Ignored SELL — no position held.")
 
-    if buy:
+    elif action == BUY:
+        shares_to_trade = int(quantity)
         print(f"[{symbol}] 🟢 BUY signal detected @ ${execution_price:.2f}")
 
-        if LIVE_MODE:
-            order = LimitOrder('BUY', shares_to_trade, round(execution_price, 2))
-            trade = ib.placeOrder(contract, order)
-            print(f"[{symbol}] 🚀 Placed LIMIT BUY for {shares_to_trade} shares at ${execution_price:.2f}")
+        if live_mode:
+            orders.submit(symbol, contract, 'BUY', shares_to_trade, execution_price, signal_time, reason)
         else:
             print(f"[{symbol}] 🧪 Dry-Run: Would BUY {shares_to_trade} shares at ${execution_price:.2f}")
+            orders.journal.record(symbol, "BUY", execution_price, shares_to_trade, reason)
 
-        log_live_trade(symbol, "BUY", execution_price, shares_to_trade, "Live Signal")
+    elif action == SELL:
+        print(f"[{symbol}] 🔴 SELL signal detected @ ${execution_price:.2f}")
 
-    elif sell:
-        if current_shares > 0:
-            print(f"[{symbol}] 🔴 SELL signal detected @ ${execution_price:.2f}")
-
-            if LIVE_MODE:
-                order = LimitOrder('SELL', current_shares, round(execution_price, 2))
-                trade = ib.placeOrder(contract, order)
-                print(f"[{symbol}] 🚀 Placed LIMIT SELL for {current_shares} shares at ${execution_price:.2f}")
-            else:
-                print(f"[{symbol}] 🧪 Dry-Run: Would SELL {current_shares} shares at ${execution_price:.2f}")
-
-            log_live_trade(symbol, "SELL", execution_price, current_shares, "Live Signal")
+        if live_mode:
+            orders.submit(symbol, contract, 'SELL', current_shares, execution_price, signal_time, reason)
         else:
-            print(f"[{symbol}] ⚪ Ignored SELL — no position held.")
+            print(f"[{symbol}] 🧪 Dry-Run: Would SELL {current_shares} shares at ${execution_price:.2f}")
+            orders.journal.record(symbol, "SELL", execution_price, current_shares, reason)
 
     else:
         print(f"[{symbol}] ⏸ HOLD — no action.")
 
-# === End of Run ===
-print(f"{'='*10} End of Execution {today} {'='*10}\n")
-ib.disconnect()  # 🆕 NEW: Always disconnect at the end
\ No newline at end of file
+def main():
+    timer = RunTimer('prod_ibkr', metrics_dir=LOGS_DIR / "metrics")
+    status, ib = 'error', None
+    try:
+        with timer.span('connect'):
+            ib = connect_ib(CLIENT_ID)
+        status = 'ok' if run_cycle(ib, timer=timer) else 'no_account'
+        if status != 'ok':
+            exit(1)
+    finally:
+        JOURNAL.flush()  # Keeps trades buffered before a crash
+        if ib is not None:
+            ib.disconnect()  # 🆕 NEW: Always disconnect at the end
+        timer.finish(status)
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    main()
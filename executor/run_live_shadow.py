@@ -1,123 +1,135 @@
-from ib_insync import IB
-from strategies.defensive_strategy import evaluate_signal_from_df
+from strategies.defensive_strategy import evaluate_signal_incremental
 from datetime import datetime
-import pandas as pd
-import yfinance as yf
-import csv
-import os
 from pathlib import Path
-
-today = datetime.today().strftime("%m/%d/%Y")
+from utils.bar_store import BarStore
+from utils.trade_journal import TradeJournal
+from utils.run_metrics import NULL_TIMER, RunTimer
+from utils.universe import ETF_WATCHLIST
+from utils.portfolio_state import BUY, SELL, size_orders
+from utils.ibkr_data import connect_ib
+from executor.data_service import fetch_snapshot, request_snapshot
 
 # Define root directory explicitly
 ROOT_DIR = Path.cwd()
 LOGS_DIR = ROOT_DIR / "logs"
 TRADES_PATH = LOGS_DIR / "trades_shadow.csv"
+STATE_DIR = LOGS_DIR / "indicator_state" / "yfinance"  # Resumable indicator state per symbol
+
+BAR_STORE = BarStore(ROOT_DIR / "data" / "bars")
 
 # Ensure logs directory exists
 LOGS_DIR.mkdir(exist_ok=True)
+# Shadow CSVs never had a shares column; the Parquet journal records the would-trade size
+JOURNAL = TradeJournal('shadow', TRADES_PATH, csv_fields=['date', 'ticker', 'action', 'price', 'reason'], root=LOGS_DIR / "trades")
 
 # === Constants ===
-WATCHLIST = ['QQQM', 'VOO', 'IAU', 'IEFA', 'VWO', 'BOTZ', 'ROBO', 'XLE', 'VGK', 'EWJ', 'IJH', 'XLV', 'XLU']
+WATCHLIST = ETF_WATCHLIST
+POSITION_PCT = 0.2
+MAX_POSITION_PCT = 0.4  # e.g. 40% of capital max in one asset
 # TRADES_PATH = 'logs/trades_shadow.csv'
-
-# === Connect to IBKR (to read positions only) ===
-ib = IB()
-ib.connect('127.0.0.1', 7497, clientId=101)
-
-# === Wait for connection and fetch account ID ===
-ib.sleep(1)
-account_id = ib.managedAccounts()[0]  # uses the first available account
-
-def log_shadow_trade(ticker, action, price, reason):
-    file_exists = TRADES_PATH.exists()
-    with open(TRADES_PATH, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['date', 'ticker', 'action', 'price', 'reason'])
-        writer.writerow([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            ticker,
-            action,
-            round(price, 2),
-            reason
-        ])
-
-# === Pull actual holdings (so we only "SELL" if we own) ===
-portfolio = ib.positions()
-held_positions = {p.contract.symbol: p.position for p in portfolio if p.position > 0}
-
-# === Retrieve real-time account values
-ib.sleep(1)
-account_values = ib.accountValues()
-
-# Safely find the NetLiquidation value
-cash_available = None
-for val in account_values:
-    if val.tag == 'NetLiquidation' and val.currency == 'USD':
-        cash_available = float(val.value)
-        break
-
-if cash_available is None:
-    print("❌ Could not find NetLiquidation value in account values.")
-    ib.disconnect()
-    exit(1)
-
-capital = cash_available
-print(f"💰 Account value loaded: ${capital:,.2f}")
-
-# === Main Loop: YF-only evaluation ===
-for symbol in WATCHLIST:
-    print(f"\n→ Evaluating {symbol} using yfinance...")
-
-    try:
-        # Pull full historical window for indicators
-        yf_data = yf.download(symbol, period="100d", interval="1d", auto_adjust=False)
-        if yf_data.empty:
-            raise Exception("No data returned by yfinance")
-
-        # Make sure columns are properly named
-        df = yf_data[['Close', 'High', 'Low', 'Volume']].copy()
-        print(f"[{symbol}] ✅ Retrieved {df.shape[0]} rows of data")
-
-    except Exception as e:
-        print(f"[{symbol}] ❌ Failed to fetch data: {e}")
-        continue
-
-    # === Evaluate Buy/Sell Logic ===
-    buy, sell, price = evaluate_signal_from_df(df)
-
-    if price is None:
-        print(f"[{symbol}] ❎ Skipped — not enough data for signal")
-        continue
-    
-    position_pct = 0.2
-    max_pct_per_ticker = 0.4  # e.g. 40% of capital max in one asset
-
-    # If already held, compute % of portfolio
-    current_shares = held_positions.get(symbol, 0)
-    current_value = current_shares * price
-    if current_value / capital > max_pct_per_ticker:
-        print(f"[{symbol}] ⚠️ Skipping BUY — position too large (${current_value:.2f} = {100 * current_value / capital:.1f}% of account)")
-        continue
-    
-    max_trade_amt = capital * position_pct
-    shares_to_trade = int(max_trade_amt / price)
-    print(f"[{symbol}] ↳ Would trade {shares_to_trade} shares (~${max_trade_amt:.2f})") 
-    
-    if buy:
-        print(f"[{symbol}] 🟢 Shadow BUY @ ${price:.2f} (yfinance)")
-        log_shadow_trade(symbol, "BUY", price, "Signal from yfinance")
-    elif sell:
-        if held_positions.get(symbol, 0) > 0:
-            print(f"[{symbol}] 🔴 Shadow SELL @ ${price:.2f} (yfinance)")
-            log_shadow_trade(symbol, "SELL", price, "Signal from yfinance")
-        else:
+CLIENT_ID = 101  # IBKR is only used to read positions, and only when the market data service isn't running
+USE_DATA_SERVICE = True  # Read the account and bars from executor/data_service.py when it is running
+
+def run_cycle(ib, timer=NULL_TIMER, snapshot=None):
+    '''
+    One yfinance-driven shadow cycle; ib is only used to read holdings and account value.
+    snapshot (executor.data_service.request_snapshot) replaces both fetches, and ib may then be None.
+    timer (utils.run_metrics.RunTimer) gets a span per phase and per symbol.
+    Returns False if the account could not be read.
+    '''
+    today = datetime.today().strftime("%m/%d/%Y")
+
+    # === Actual holdings (so we only "SELL" if we own) + account value, and the whole watchlist's
+    # bars in one batched download (only missing tails go over the network) ===
+    if snapshot is None:
+        snapshot = fetch_snapshot(ib, WATCHLIST, source='yfinance', quotes=False, store=BAR_STORE, timer=timer)
+    held_positions, capital = snapshot['positions'], snapshot['capital']
+    yf_frames, yf_empty = snapshot['bars'], snapshot['empty']
+    if capital is None:
+        return False
+
+    print(f"💰 Account value loaded: ${capital:,.2f}")
+
+    # === Main Loop: YF-only evaluation ===
+    signals = {}
+    for symbol in WATCHLIST:
+        print(f"\n→ Evaluating {symbol} using yfinance...")
+
+        try:
+            if symbol in yf_empty:
+                raise Exception("No data returned by yfinance")
+            yf_data = yf_frames[symbol]
+
+            # Make sure columns are properly named
+            df = yf_data[['Close', 'High', 'Low', 'Volume']].copy()
+            print(f"[{symbol}] ✅ Retrieved {df.shape[0]} rows of data")
+
+        except Exception as e:
+            print(f"[{symbol}] ❌ Failed to fetch data: {e}")
+            continue
+
+        # === Evaluate Buy/Sell Logic ===
+        with timer.span('evaluate', symbol):
+            buy, sell, price = evaluate_signal_incremental(df, STATE_DIR / f"{symbol}.json")
+
+        if price is None:
+            print(f"[{symbol}] ❎ Skipped — not enough data for signal")
+            continue
+
+        signals[symbol] = (buy, sell, price)
+
+    # === Sizing + Actions: every signal sized at once, the prod executor's rules ===
+    symbols = list(signals)
+    prices = [signals[symbol][2] for symbol in symbols]
+    held = [held_positions.get(symbol, 0) for symbol in symbols]
+    sized = size_orders([signals[symbol][0] for symbol in symbols], [signals[symbol][1] for symbol in symbols],
+                        prices, held, capital, POSITION_PCT, MAX_POSITION_PCT)
+
+    for symbol, price, current_shares, action, quantity, skip in zip(
+        symbols, prices, held, sized['action'], sized['quantity'], sized['skip']
+    ):
+        if skip == 'too_large':
+            current_value = current_shares * price
+            print(f"[{symbol}] ⚠️ Skipping — position too large (${current_value:.2f} = {100 * current_value / capital:.1f}% of account)")
+        elif skip == 'no_price':
+            print(f"[{symbol}] ❌ No usable price, skipping (yfinance)")
+        elif skip == 'too_small':
+            print(f"[{symbol}] ⚠️ Trade size too small, skipping (yfinance)")
+        elif skip == 'not_held':
             print(f"[{symbol}] ⚪ Ignoring SELL — not held (yfinance)")
-    else:
-        print(f"[{symbol}] ⏸ HOLD — no signal (yfinance)")
-
-print(f"{"="*10}End of Recs for {today}{"="*10}\n")
+        elif action == BUY:
+            print(f"[{symbol}] 🟢 Shadow BUY {int(quantity)} shares @ ${price:.2f} (yfinance)")
+            JOURNAL.record(symbol, "BUY", price, int(quantity), "Signal from yfinance")
+        elif action == SELL:
+            print(f"[{symbol}] 🔴 Shadow SELL {current_shares} shares @ ${price:.2f} (yfinance)")
+            JOURNAL.record(symbol, "SELL", price, current_shares, "Signal from yfinance")
+        else:
+            print(f"[{symbol}] ⏸ HOLD — no signal (yfinance)")
 
+    with timer.span('journal'):
+        JOURNAL.close()
+    print(f"{"="*10}End of Recs for {today}{"="*10}\n")
+    return True
 
-ib.disconnect()
\ No newline at end of file
+def main():
+    timer = RunTimer('shadow', metrics_dir=LOGS_DIR / "metrics")
+    status, ib, snapshot = 'error', None, None
+    try:
+        if USE_DATA_SERVICE:
+            with timer.span('data_service'):
+                snapshot = request_snapshot(WATCHLIST, source='yfinance', quotes=False)
+        if snapshot is None:
+            with timer.span('connect'):
+                ib = connect_ib(CLIENT_ID)
+        status = 'ok' if run_cycle(ib, timer=timer, snapshot=snapshot) else 'no_account'
+        if status != 'ok':
+            exit(1)
+    finally:
+        JOURNAL.flush()  # Keeps trades buffered before a crash
+        if ib is not None:
+            ib.disconnect()
+        timer.finish(status)
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    main()
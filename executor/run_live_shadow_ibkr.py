@@ -1,138 +1,160 @@
-from ib_insync import IB, Stock
-from strategies.defensive_strategy import evaluate_signal_from_df
+from strategies.defensive_strategy import evaluate_signal_incremental
+from strategies.registry import evaluate_strategies
 from datetime import datetime
-import pandas as pd
-import csv
-import os
 from pathlib import Path
-
-today = datetime.today().strftime("%m/%d/%Y %H:%M:%S")
+from utils.bar_store import BarStore
+from utils.trade_journal import TradeJournal
+from utils.run_metrics import NULL_TIMER, RunTimer
+from utils.universe import ETF_WATCHLIST
+from utils.contract_cache import ContractCache
+from utils.portfolio_state import BUY, SELL, size_orders
+from utils.ibkr_data import connect_ib
+from executor.data_service import fetch_snapshot, request_snapshot
 
 # === File + Log Paths ===
 ROOT_DIR = Path.cwd()
 LOGS_DIR = ROOT_DIR / "logs"
 TRADES_PATH = LOGS_DIR / "trades_shadow_ibkr.csv"
+STATE_DIR = LOGS_DIR / "indicator_state" / "shadow_ibkr"  # Resumable indicator state per symbol
+BAR_STORE = BarStore(ROOT_DIR / "data" / "bars")
+CONTRACT_CACHE = ContractCache(ROOT_DIR / "data" / "contracts.json")  # Qualified contracts, 7-day TTL
 LOGS_DIR.mkdir(exist_ok=True)
+# Shadow CSVs never had a shares column; the Parquet journal records the would-trade size
+JOURNAL = TradeJournal('shadow_ibkr', TRADES_PATH, csv_fields=['date', 'ticker', 'action', 'price', 'reason'], root=LOGS_DIR / "trades")
 
 # === IBKR Setup ===
-ib = IB()
-ib.connect('127.0.0.1', 7497, clientId=102, timeout=10)
-ib.sleep(1)
-account_id = ib.managedAccounts()[0]
-
-def log_shadow_trade(ticker, action, price, reason):
-    file_exists = TRADES_PATH.exists()
-    with open(TRADES_PATH, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['date', 'ticker', 'action', 'price', 'reason'])
-        writer.writerow([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            ticker,
-            action,
-            round(price, 2),
-            reason
-        ])
-
-# === Portfolio and Cash Check ===
-portfolio = ib.positions()
-held_positions = {p.contract.symbol: p.position for p in portfolio if p.position > 0}
-
-ib.sleep(1)
-account_values = ib.accountValues()
-cash_available = None
-for val in account_values:
-    if val.tag == 'NetLiquidation' and val.currency == 'USD':
-        cash_available = float(val.value)
-        break
-
-if cash_available is None:
-    print("❌ Could not find NetLiquidation value in account values.")
-    ib.disconnect()
-    exit(1)
-
-capital = cash_available
-print(f"💰 Account value loaded: ${capital:,.2f}")
-
-# === Ticker Set ===
-WATCHLIST = ['QQQM', 'VOO', 'IAU', 'IEFA', 'VWO', 'BOTZ', 'ROBO', 'XLE', 'VGK', 'EWJ', 'IJH', 'XLV', 'XLU']
-
-# === Main Loop: IBKR market data (not yfinance) ===
-for symbol in WATCHLIST:
-    print(f"\n→ Evaluating {symbol} using IBKR snapshot data...")
-
-    try:
-        contract = Stock(symbol, 'SMART', 'USD')
-        ib.qualifyContracts(contract)
-        bars = ib.reqHistoricalData(
-            contract,
-            endDateTime='',
-            durationStr='100 D',
-            barSizeSetting='1 day',
-            whatToShow='TRADES',
-            useRTH=True,
-            formatDate=1
-        )
-        if not bars:
-            raise ValueError("No historical data returned")
-
-        df = pd.DataFrame(bars)
-        df.rename(columns={'close': 'Close', 'high': 'High', 'low': 'Low', 'volume': 'Volume'}, inplace=True)
-        print(f"[{symbol}] ✅ Retrieved {df.shape[0]} rows of data from IBKR")
-
-    except Exception as e:
-        print(f"[{symbol}] ❌ Failed to fetch IBKR data: {e}")
-        continue
-
-    buy, sell, signal_price = evaluate_signal_from_df(df)
-    if signal_price is None:
-        print(f"[{symbol}] ❎ Skipped — not enough data for signal")
-        continue
+CLIENT_ID = 102  # Only connects when the market data service isn't running
+USE_DATA_SERVICE = True  # Read account, bars and quotes from executor/data_service.py when it is running
+
+# === Ticker Set + Sizing (same rules as the prod executor) ===
+WATCHLIST = ETF_WATCHLIST
+POSITION_PCT = 0.2
+MAX_POSITION_PCT = 0.4
+
+# === Extra strategies (strategies/registry.py) shadowed on the same bars, sharing one indicator
+# cache per symbol; each gets a Parquet-only journal partition shadow_ibkr_<name> ===
+STRATEGIES = []
+STRATEGY_JOURNALS = {name: TradeJournal(f'shadow_ibkr_{name}', root=LOGS_DIR / "trades") for name in STRATEGIES}
+
+def run_cycle(ib, contracts=None, timer=NULL_TIMER, snapshot=None, fetcher=None):
+    '''
+    One shadow evaluation cycle on an already connected IB.
+    contracts can carry qualified {symbol: contract} over from an earlier cycle, and fetcher
+    (utils.ibkr_data.HistoricalDataFetcher) the connection's pacing budget.
+    snapshot (executor.data_service.request_snapshot) replaces the account, history and quote
+    fetches, and ib may then be None.
+    timer (utils.run_metrics.RunTimer) gets a span per phase and per symbol.
+    Returns False if the account could not be read.
+    '''
+    today = datetime.today().strftime("%m/%d/%Y %H:%M:%S")
+
+    # === Account, bars and quotes for the whole watchlist (pacing-aware when fetched here) ===
+    if snapshot is None:
+        snapshot = fetch_snapshot(ib, WATCHLIST, contracts=contracts, store=BAR_STORE, contract_cache=CONTRACT_CACHE,
+                                  timer=timer, fetcher=fetcher)
+    held_positions, capital = snapshot['positions'], snapshot['capital']
+    bar_frames, bar_empty, quotes = snapshot['bars'], snapshot['empty'], snapshot['quotes']
+    if capital is None:
+        return False
+
+    print(f"💰 Account value loaded: ${capital:,.2f}")
+
+    # === Evaluation Loop: IBKR market data (not yfinance) ===
+    signals = {}
+    strategy_signals = {name: {} for name in STRATEGIES}
+    for symbol in WATCHLIST:
+        print(f"\n→ Evaluating {symbol} using IBKR snapshot data...")
+
+        try:
+            if symbol in bar_empty or symbol not in bar_frames:
+                raise ValueError("No historical data returned.")
+            df = bar_frames[symbol]
+            print(f"[{symbol}] ✅ Retrieved {df.shape[0]} rows of data from IBKR")
+
+        except Exception as e:
+            print(f"[{symbol}] ❌ Failed to fetch IBKR data: {e}")
+            continue
+
+        # Same defensive path as the prod executor; the extra strategies share one IndicatorCache
+        with timer.span('evaluate', symbol):
+            buy, sell, signal_price = evaluate_signal_incremental(df, STATE_DIR / f"{symbol}.json")
+            decisions = evaluate_strategies(df, STRATEGIES) if STRATEGIES else {}
+        for name, decision in decisions.items():
+            if decision[2] is not None:
+                strategy_signals[name][symbol] = decision
+
+        if signal_price is None:
+            print(f"[{symbol}] ❎ Skipped — not enough data for signal")
+            continue
     
-    # Fetch live quote
-    snapshot = ib.reqMktData(contract, "", False, False)
-    ib.sleep(1)
-
-    # === Execution Price Resolution ===
-    execution_price = None
-
-    # Prefer bid/ask midpoint
-    if snapshot.bid is not None and snapshot.ask is not None and snapshot.bid > 0 and snapshot.ask > 0:
-        execution_price = (snapshot.bid + snapshot.ask) / 2
-    elif snapshot.last is not None and snapshot.last > 0:
-        execution_price = snapshot.last
-    elif signal_price is not None and signal_price > 0:
-        execution_price = signal_price  # Fallback to signal_close
-
-    # Final check
-    if execution_price is None or pd.isna(execution_price):
-        print(f"[{symbol}] ❌ Still no execution price after fallback. Skipping.")
-        continue
-
-    position_pct = 0.2
-    max_pct_per_ticker = 0.4
-
-    current_shares = held_positions.get(symbol, 0)
-    current_value = current_shares * execution_price
-
-    if current_value / capital > max_pct_per_ticker:
-        print(f"[{symbol}] ⚠️ Skipping BUY — position too large (${current_value:.2f} = {100 * current_value / capital:.1f}% of account)")
-        continue
-
-    shares_to_trade = int((capital * position_pct) / execution_price)
-    print(f"[{symbol}] ↳ Would trade {shares_to_trade} shares at ${execution_price:.2f}")
-
-    if buy:
-        print(f"[{symbol}] 🟢 Shadow BUY @ ${execution_price:.2f} (IBKR)")
-        log_shadow_trade(symbol, "BUY", execution_price, "Signal from IBKR")
-    elif sell:
-        if held_positions.get(symbol, 0) > 0:
-            print(f"[{symbol}] 🔴 Shadow SELL @ ${execution_price:.2f} (IBKR)")
-            log_shadow_trade(symbol, "SELL", execution_price, "Signal from IBKR")
+        signals[symbol] = (buy, sell, signal_price)
+
+    # === Sizing + Actions: live quote from the snapshot, signal close when there was none ===
+    record_shadow(JOURNAL, signals, quotes, held_positions, capital)
+    for name, decisions in strategy_signals.items():
+        print(f"\n→ Strategy {name}")
+        record_shadow(STRATEGY_JOURNALS[name], decisions, quotes, held_positions, capital, label=f"IBKR, {name}")
+
+    with timer.span('journal'):
+        JOURNAL.close()
+        for journal in STRATEGY_JOURNALS.values():
+            journal.close()
+    print(f"{'='*10} End of Recs for {today} {'='*10}\n")
+    return True
+
+def record_shadow(journal, signals, quotes, held_positions, capital, label="IBKR"):
+    '''
+    Sizes every {symbol: (buy, sell, signal_price)} at once like the prod executor
+    (utils.portfolio_state.size_orders) and journals the trades it would make
+    '''
+    symbols = list(signals)
+    prices = [quotes.get(symbol) or signals[symbol][2] for symbol in symbols]
+    held = [held_positions.get(symbol, 0) for symbol in symbols]
+    sized = size_orders([signals[symbol][0] for symbol in symbols], [signals[symbol][1] for symbol in symbols],
+                        prices, held, capital, POSITION_PCT, MAX_POSITION_PCT)
+
+    for symbol, execution_price, current_shares, action, quantity, skip in zip(
+        symbols, prices, held, sized['action'], sized['quantity'], sized['skip']
+    ):
+        if skip == 'no_price':
+            print(f"[{symbol}] ❌ Still no execution price after fallback. Skipping.")
+        elif skip == 'too_large':
+            current_value = current_shares * execution_price
+            print(f"[{symbol}] ⚠️ Skipping — position too large (${current_value:.2f} = {100 * current_value / capital:.1f}% of account)")
+        elif skip == 'too_small':
+            print(f"[{symbol}] ⚠️ Trade size too small, skipping ({label})")
+        elif skip == 'not_held':
+            print(f"[{symbol}] ⚪ Ignoring SELL — not held ({label})")
+        elif action == BUY:
+            print(f"[{symbol}] 🟢 Shadow BUY {int(quantity)} shares @ ${execution_price:.2f} ({label})")
+            journal.record(symbol, "BUY", execution_price, int(quantity), f"Signal from {label}")
+        elif action == SELL:
+            print(f"[{symbol}] 🔴 Shadow SELL {current_shares} shares @ ${execution_price:.2f} ({label})")
+            journal.record(symbol, "SELL", execution_price, current_shares, f"Signal from {label}")
         else:
-            print(f"[{symbol}] ⚪ Ignoring SELL — not held (IBKR)")
-    else:
-        print(f"[{symbol}] ⏸ HOLD — no signal (IBKR)")
+            print(f"[{symbol}] ⏸ HOLD — no signal ({label})")
 
-print(f"{'='*10} End of Recs for {today} {'='*10}\n")
-ib.disconnect()
\ No newline at end of file
+def main():
+    timer = RunTimer('shadow_ibkr', metrics_dir=LOGS_DIR / "metrics")
+    status, ib, snapshot = 'error', None, None
+    try:
+        if USE_DATA_SERVICE:
+            with timer.span('data_service'):
+                snapshot = request_snapshot(WATCHLIST)
+        if snapshot is None:
+            with timer.span('connect'):
+                ib = connect_ib(CLIENT_ID)
+        status = 'ok' if run_cycle(ib, timer=timer, snapshot=snapshot) else 'no_account'
+        if status != 'ok':
+            exit(1)
+    finally:
+        JOURNAL.flush()  # Keeps trades buffered before a crash
+        for journal in STRATEGY_JOURNALS.values():
+            journal.flush()
+        if ib is not None:
+            ib.disconnect()
+        timer.finish(status)
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    main()
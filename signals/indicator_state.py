@@ -0,0 +1,228 @@
+import json
+import math
+import os
+from collections import deque
+
+# Streaming versions of signals/indicator_logic.py.
+# Each state object takes one bar at a time and updates in constant time, and matches the
+# pandas functions when fed the same bars. Every state can round-trip through a plain dict,
+# so an IndicatorSet can be saved to JSON and resumed on the next launchd run.
+
+NAN = float('nan')
+
+def _is_nan(value):
+    return value is None or value != value
+
+class EMAState:
+    '''
+    Same recurrence as .ewm(span=span, adjust=False).mean()
+    '''
+    def __init__(self, span, weighted=NAN, old_wt=1.0):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.weighted = weighted
+        self.old_wt = old_wt
+
+    def _step(self, value):
+        if _is_nan(self.weighted):
+            return value, self.old_wt
+        old_wt = self.old_wt * (1.0 - self.alpha)
+        if _is_nan(value):
+            return self.weighted, old_wt
+        weighted = (old_wt * self.weighted + self.alpha * value) / (old_wt + self.alpha)
+        return weighted, 1.0
+
+    def update(self, value):
+        self.weighted, self.old_wt = self._step(value)
+        return self.weighted
+
+    def peek(self, value):
+        return self._step(value)[0]
+
+    def to_dict(self):
+        return {'span': self.span, 'weighted': self.weighted, 'old_wt': self.old_wt}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['span'], data['weighted'], data['old_wt'])
+
+class RollingMeanState:
+    '''
+    Same as .rolling(window).mean(): NaN until the window is full or while it holds a NaN
+    '''
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+
+    def _mean(self, values):
+        if len(values) < self.window or any(_is_nan(v) for v in values):
+            return NAN
+        # fsum is exactly rounded, which lines up with pandas' compensated rolling sum
+        return math.fsum(values) / self.window
+
+    def update(self, value):
+        self.values.append(value)
+        return self._mean(self.values)
+
+    def peek(self, value):
+        return self._mean(list(self.values)[1 - self.window:] + [value])
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['window'], data['values'])
+
+class ATRState:
+    def __init__(self, period=14, prev_close=NAN, true_range=None):
+        self.period = period
+        self.prev_close = prev_close
+        self.true_range = true_range or RollingMeanState(period)
+
+    def _range(self, high, low):
+        ranges = [high - low, abs(high - self.prev_close), abs(low - self.prev_close)]
+        ranges = [r for r in ranges if not _is_nan(r)]
+        return max(ranges) if ranges else NAN
+
+    def update(self, high, low, close):
+        atr = self.true_range.update(self._range(high, low))
+        self.prev_close = close
+        return atr
+
+    def peek(self, high, low, close):
+        return self.true_range.peek(self._range(high, low))
+
+    def to_dict(self):
+        return {'period': self.period, 'prev_close': self.prev_close, 'true_range': self.true_range.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['period'], data['prev_close'], RollingMeanState.from_dict(data['true_range']))
+
+class RSIState:
+    def __init__(self, period=14, prev_close=NAN, gains=None, losses=None):
+        self.period = period
+        self.prev_close = prev_close
+        self.gains = gains or RollingMeanState(period)
+        self.losses = losses or RollingMeanState(period)
+
+    def _split(self, close):
+        # The first bar has no delta and counts as 0 gain / 0 loss, same as delta.where(...)
+        delta = close - self.prev_close
+        if _is_nan(delta):
+            return 0.0, 0.0
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def _rsi(self, avg_gain, avg_loss):
+        if _is_nan(avg_gain) or _is_nan(avg_loss):
+            return NAN
+        if avg_loss == 0:
+            return NAN if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def update(self, close):
+        gain, loss = self._split(close)
+        self.prev_close = close
+        return self._rsi(self.gains.update(gain), self.losses.update(loss))
+
+    def peek(self, close):
+        gain, loss = self._split(close)
+        return self._rsi(self.gains.peek(gain), self.losses.peek(loss))
+
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'prev_close': self.prev_close,
+            'gains': self.gains.to_dict(),
+            'losses': self.losses.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['period'],
+            data['prev_close'],
+            RollingMeanState.from_dict(data['gains']),
+            RollingMeanState.from_dict(data['losses']),
+        )
+
+class IndicatorSet:
+    '''
+    EMA10, EMA50, ATR, RSI and Volume_SMA for one ticker, the same columns evaluate_signal_from_df adds.
+    update() commits a finished bar; peek() evaluates a bar that may still be forming without committing it.
+    '''
+    def __init__(self, ema10=None, ema50=None, atr=None, rsi=None, volume_sma=None, bars_seen=0, last_date=None):
+        self.ema10 = ema10 or EMAState(10)
+        self.ema50 = ema50 or EMAState(50)
+        self.atr = atr or ATRState(14)
+        self.rsi = rsi or RSIState(14)
+        self.volume_sma = volume_sma or RollingMeanState(20)
+        self.bars_seen = bars_seen
+        self.last_date = last_date
+
+    def update(self, close, high, low, volume, date=None):
+        values = {
+            'EMA10': self.ema10.update(close),
+            'EMA50': self.ema50.update(close),
+            'ATR': self.atr.update(high, low, close),
+            'RSI': self.rsi.update(close),
+            'Volume_SMA': self.volume_sma.update(volume),
+        }
+        self.bars_seen += 1
+        self.last_date = date
+        return values
+
+    def peek(self, close, high, low, volume):
+        return {
+            'EMA10': self.ema10.peek(close),
+            'EMA50': self.ema50.peek(close),
+            'ATR': self.atr.peek(high, low, close),
+            'RSI': self.rsi.peek(close),
+            'Volume_SMA': self.volume_sma.peek(volume),
+        }
+
+    def to_dict(self):
+        return {
+            'ema10': self.ema10.to_dict(),
+            'ema50': self.ema50.to_dict(),
+            'atr': self.atr.to_dict(),
+            'rsi': self.rsi.to_dict(),
+            'volume_sma': self.volume_sma.to_dict(),
+            'bars_seen': self.bars_seen,
+            'last_date': self.last_date,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            EMAState.from_dict(data['ema10']),
+            EMAState.from_dict(data['ema50']),
+            ATRState.from_dict(data['atr']),
+            RSIState.from_dict(data['rsi']),
+            RollingMeanState.from_dict(data['volume_sma']),
+            data['bars_seen'],
+            data['last_date'],
+        )
+
+def load_indicator_state(path):
+    '''
+    Returns the saved IndicatorSet, or None if there is no usable state file yet
+    '''
+    try:
+        with open(path, 'r') as f:
+            return IndicatorSet.from_dict(json.load(f))
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"⚠️ Ignoring unreadable indicator state {path}: {e}")
+        return None
+
+def save_indicator_state(state, path):
+    '''
+    Writes through a temp file so a crash mid-write never leaves a truncated state behind
+    '''
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Panel versions of signals/indicator_logic.py.
+# Every array here is a 2-D (dates x tickers) float block, so one call covers the whole watchlist.
+
+PANEL_FIELDS = ['Close', 'High', 'Low', 'Volume']
+
+def build_panel(frames):
+    '''
+    Stacks per-ticker OHLCV frames into one wide panel.
+    Returns a DataFrame with (field, ticker) MultiIndex columns, same layout as
+    yf.download([...], group_by='column')
+    '''
+    fields = {}
+    for field in PANEL_FIELDS:
+        fields[field] = pd.DataFrame({ticker: df[field].squeeze() for ticker, df in frames.items()})
+    return pd.concat(fields, axis=1).sort_index()
+
+def panel_arrays(panel):
+    '''
+    Splits a (field, ticker) panel into float arrays.
+    Returns ({field: ndarray}, dates, tickers)
+    '''
+    tickers = list(panel['Close'].columns)
+    arrays = {
+        field: panel[field][tickers].to_numpy(dtype=float)
+        for field in PANEL_FIELDS
+    }
+    return arrays, panel.index, tickers
+
+def stack_arrays(frames, fields=PANEL_FIELDS):
+    '''
+    Same result as panel_arrays(build_panel(frames)) without the intermediate DataFrame,
+    which is what dominates for thousands of tickers. Returns ({field: ndarray}, dates, tickers)
+    '''
+    tickers = list(frames)
+    dates = None
+    for df in frames.values():
+        if dates is None:
+            dates = df.index
+        elif not dates.equals(df.index):
+            dates = dates.union(df.index)
+    if dates is None:
+        dates = pd.DatetimeIndex([], name='date')
+
+    arrays = {field: np.full((len(dates), len(tickers)), np.nan) for field in fields}
+    positions = {}  # Column lookups are slow on string indexes; frames nearly always share one layout
+    for j, df in enumerate(frames.values()):
+        rows = slice(None) if df.index.equals(dates) else dates.get_indexer(df.index)
+        columns = tuple(df.columns)
+        if columns not in positions:
+            positions[columns] = [columns.index(field) for field in fields]
+        # One to_numpy per frame: per-column access costs far more across thousands of frames
+        values = df.to_numpy(dtype=float)[:, positions[columns]]
+        for k, field in enumerate(fields):
+            arrays[field][rows, j] = values[:, k]
+    return arrays, dates, tickers
+
+def shift_panel(x, periods=1):
+    out = np.full_like(x, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+def rolling_mean_panel(x, window):
+    '''
+    Same as .rolling(window).mean(): NaN until the window is full, NaN if any value in it is NaN
+    '''
+    out = np.full_like(x, np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).mean(axis=-1)
+    return out
+
+def calculate_ema_panel(close, span):
+    '''
+    Same recurrence as .ewm(span=span, adjust=False).mean(), run down the time axis
+    for all tickers at once. Tickers that start later are seeded at their first close.
+    '''
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+
+    out = np.empty_like(close)
+    weighted = close[0].copy()
+    old_wt = np.ones(close.shape[1])
+    out[0] = weighted
+
+    for i in range(1, close.shape[0]):
+        cur = close[i]
+        started = ~np.isnan(weighted)
+        update = started & ~np.isnan(cur)
+
+        # Weight keeps decaying across missing bars, like pandas with ignore_na=False
+        old_wt = np.where(started, old_wt * decay, old_wt)
+        blended = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+
+        weighted = np.where(update, blended, np.where(started, weighted, cur))
+        old_wt = np.where(update, 1.0, old_wt)
+        out[i] = weighted
+
+    return out
+
+def calculate_atr_panel(high, low, close, period=14):
+    prev_close = shift_panel(close)
+    high_low = high - low
+    high_close = np.abs(high - prev_close)
+    low_close = np.abs(low - prev_close)
+    # fmax skips NaN like DataFrame.max(axis=1), so the first bar is just High - Low
+    true_range = np.fmax(np.fmax(high_low, high_close), low_close)
+    return rolling_mean_panel(true_range, period)
+
+def calculate_rsi_panel(close, period=14, missing_gain=np.nan):
+    '''
+    A missing close is a panel gap (no bar that day), so its gain/loss is NaN by default.
+    missing_gain=0.0 treats it as a NaN row in one symbol's frame instead, which calculate_rsi
+    counts as 0 gain / 0 loss
+    '''
+    delta = close - shift_panel(close)
+    missing = np.isnan(close)
+    # The first bar's NaN delta counts as 0 gain / 0 loss, same as delta.where(...)
+    gain = np.where(missing, missing_gain, np.where(delta > 0, delta, 0.0))
+    loss = np.where(missing, missing_gain, -np.where(delta < 0, delta, 0.0))
+    avg_gain = rolling_mean_panel(gain, period)
+    avg_loss = rolling_mean_panel(loss, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def calculate_panel_indicators(arrays, ema_fast=10, ema_slow=50, atr_period=14, rsi_period=14, volume_sma=20):
+    '''
+    Computes the fast/slow EMAs, ATR, RSI and Volume_SMA for every ticker in one pass.
+    Takes the {field: ndarray} dict from panel_arrays and returns the same shape for indicators,
+    keyed like the DataFrame columns ('EMA10', 'EMA50', 'ATR', 'RSI', 'Volume_SMA' by default)
+    '''
+    close = arrays['Close']
+    return {
+        f'EMA{ema_fast}': calculate_ema_panel(close, ema_fast),
+        f'EMA{ema_slow}': calculate_ema_panel(close, ema_slow),
+        'ATR': calculate_atr_panel(arrays['High'], arrays['Low'], close, atr_period),
+        'RSI': calculate_rsi_panel(close, rsi_period),
+        'Volume_SMA': rolling_mean_panel(arrays['Volume'], volume_sma),
+    }
@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from signals.panel_logic import build_panel, panel_arrays
+from strategies.defensive_strategy import calculate_panel_signals
+from utils.market_data import download_watchlist
+from utils.portfolio_io import INITIAL_CAPITAL
+from utils.portfolio_state import HOLD, SELL, allocate_from_cash
+from simulator.run_simulation import WATCHLIST
+
+# Full-history backtest of the defensive strategy.
+# Signals for every bar come from the panel engine in one pass; the run_simulated_bot position
+# rules (20% of available cash, whole shares, full exit on sell) then replay day by day, but only
+# the tickers with an actionable signal are touched in Python.
+
+POSITION_PCT = 0.2
+BACKTEST_PERIOD = '10y'
+BACKTEST_DIR = Path('logs') / 'backtest'
+
+def run_backtest(panel, initial_capital=INITIAL_CAPITAL, position_pct=POSITION_PCT, params=None):
+    '''
+    Backtests a (field, ticker) OHLCV panel, with params overriding the strategy's DEFAULT_PARAMS.
+    Returns (equity curve DataFrame indexed by date, trades DataFrame in trades-log layout)
+    '''
+    arrays, dates, tickers = panel_arrays(panel)
+    signals = calculate_panel_signals(arrays, params)
+    return simulate_positions(
+        arrays['Close'], signals['buy'], signals['sell'], dates, tickers, initial_capital, position_pct
+    )
+
+def simulate_positions(close, buy, sell, dates, tickers, initial_capital=INITIAL_CAPITAL, position_pct=POSITION_PCT):
+    '''
+    Replays run_simulated_bot's rules over (dates x tickers) close prices and buy/sell masks.
+    Tickers are handled in column order within a day, so cash freed by a sell is only
+    available to tickers after it, same as the simulator's loop over WATCHLIST.
+    '''
+    n_days, n_tickers = close.shape
+    shares = np.zeros(n_tickers)
+    cash = float(initial_capital)
+
+    shares_history = np.empty((n_days, n_tickers))
+    cash_history = np.empty(n_days)
+    trades = []
+
+    for t in range(n_days):
+        holding = shares > 0
+        if ((buy[t] & ~holding) | (sell[t] & holding)).any():
+            action, quantity, cash = allocate_from_cash(buy[t], sell[t], close[t], shares, cash, position_pct)
+            for j in np.flatnonzero(action != HOLD):
+                side = 'SELL' if action[j] == SELL else 'BUY'
+                trades.append((dates[t], tickers[j], side, close[t, j], quantity[j], f"{side.title()} Signal Triggered"))
+                shares[j] = 0.0 if action[j] == SELL else quantity[j]
+
+        shares_history[t] = shares
+        cash_history[t] = cash
+
+    # Value holdings at the last known close so a missing bar doesn't zero a position
+    marks = pd.DataFrame(close).ffill().to_numpy()
+    positions_value = np.nansum(shares_history * marks, axis=1)
+
+    equity = pd.DataFrame({
+        'cash': cash_history,
+        'positions_value': positions_value,
+        'equity': cash_history + positions_value,
+    }, index=pd.Index(dates, name='date'))
+
+    trades = pd.DataFrame(trades, columns=['date', 'ticker', 'action', 'price', 'shares', 'reason'])
+    return equity, trades
+
+def summarize_backtest(equity, trades):
+    curve = equity['equity']
+    drawdown = curve / curve.cummax() - 1
+    return {
+        'start': str(curve.index[0].date()),
+        'end': str(curve.index[-1].date()),
+        'final_equity': float(curve.iloc[-1]),
+        'total_return': float(curve.iloc[-1] / curve.iloc[0] - 1),
+        'max_drawdown': float(drawdown.min()),
+        'trades': int(len(trades)),
+    }
+
+def run_watchlist_backtest(tickers=WATCHLIST, period=BACKTEST_PERIOD):
+    print(f"📥 Downloading {period} of history for {len(tickers)} tickers...")
+    frames, empty = download_watchlist(tickers, period=period, auto_adjust=True)
+    if empty:
+        print(f"⚠️ No data for: {', '.join(empty)}")
+    if not frames:
+        print("❌ Nothing to backtest.")
+        return None
+
+    equity, trades = run_backtest(build_panel(frames))
+
+    BACKTEST_DIR.mkdir(parents=True, exist_ok=True)
+    equity.to_csv(BACKTEST_DIR / 'equity_curve.csv')
+    trades.to_csv(BACKTEST_DIR / 'trades.csv', index=False)
+
+    summary = summarize_backtest(equity, trades)
+    print(f"📈 {summary['start']} → {summary['end']}: "
+          f"${summary['final_equity']:,.2f} ({summary['total_return']:.1%}), "
+          f"max drawdown {summary['max_drawdown']:.1%}, {summary['trades']} trades")
+    print(f"🗂 Results written to {BACKTEST_DIR}")
+    return summary
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    run_watchlist_backtest()
@@ -0,0 +1,182 @@
+import csv
+import itertools
+import os
+import tempfile
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from signals.panel_logic import PANEL_FIELDS, build_panel, panel_arrays, calculate_panel_indicators
+from strategies.defensive_strategy import INDICATOR_PARAMS, calculate_panel_signals, resolve_params
+from simulator.backtest import simulate_positions, summarize_backtest
+from utils.market_data import download_watchlist
+
+# Grid search over the defensive strategy's thresholds.
+# Price arrays are written once to a .npy file that every worker memory-maps, so the pool
+# shares one copy through the page cache instead of pickling prices into each task.
+# Results stream into results.csv as they finish; ranked.csv is refreshed as the sweep goes.
+
+SWEEP_GRID = {
+    'ema_fast': [5, 10, 20],
+    'ema_slow': [30, 50, 100],
+    'volume_sma': [10, 20],
+    'rsi_buy_min': [35, 40, 45],
+    'rsi_buy_max': [65, 70, 75],
+    'rsi_sell': [25, 30, 35],
+    'atr_ratio_max': [0.02, 0.03, 0.04, 0.05],
+}
+ASSET_CLASSES = {
+    'etf': ['QQQM', 'VOO', 'IAU', 'IEFA', 'VWO', 'BOTZ', 'ROBO', 'XLE', 'VGK', 'EWJ', 'IJH', 'XLV', 'XLU'],
+    'single_name': ['CPNG', 'AAPL', 'TSLA'],
+}
+SWEEP_PERIOD = '10y'
+SWEEP_DIR = Path('logs') / 'sweeps'
+RANK_BY = 'return_over_drawdown'
+RANK_EVERY = 500  # Refresh ranked.csv every N finished combinations
+
+def expand_grid(grid):
+    '''
+    All combinations of the grid, minus the ones that make no sense.
+    Sorted so combinations sharing indicator settings sit next to each other (and land in the
+    same worker chunk, where the indicators are cached).
+    '''
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    combos = [
+        combo for combo in combos
+        if _get(combo, 'ema_fast') < _get(combo, 'ema_slow')
+        and _get(combo, 'rsi_sell') < _get(combo, 'rsi_buy_min') < _get(combo, 'rsi_buy_max')
+    ]
+    return sorted(combos, key=lambda combo: [_get(combo, key) for key in INDICATOR_PARAMS])
+
+def _get(combo, key):
+    return resolve_params(combo)[key]
+
+# === Worker side ===
+
+_WORKER = {}
+_CACHE_LIMIT = 16
+
+def _init_worker(array_path, dates, tickers, classes):
+    _WORKER['prices'] = np.load(array_path, mmap_mode='r')
+    _WORKER['dates'] = dates
+    _WORKER['tickers'] = tickers
+    _WORKER['classes'] = classes
+    _WORKER['arrays'] = {}
+    _WORKER['indicators'] = {}
+
+def _class_arrays(asset_class):
+    if asset_class not in _WORKER['arrays']:
+        cols = _WORKER['classes'][asset_class]
+        _WORKER['arrays'][asset_class] = {
+            field: np.ascontiguousarray(_WORKER['prices'][i][:, cols])
+            for i, field in enumerate(PANEL_FIELDS)
+        }
+    return _WORKER['arrays'][asset_class]
+
+def _run_combo(task):
+    asset_class, combo = task
+    params = resolve_params(combo)
+    arrays = _class_arrays(asset_class)
+
+    # Threshold-only variations reuse the indicators of the previous combination
+    key = (asset_class,) + tuple(params[name] for name in INDICATOR_PARAMS)
+    cache = _WORKER['indicators']
+    if key not in cache:
+        if len(cache) >= _CACHE_LIMIT:
+            cache.clear()
+        cache[key] = calculate_panel_indicators(arrays, *(params[name] for name in INDICATOR_PARAMS))
+
+    signals = calculate_panel_signals(arrays, params, cache[key])
+    tickers = [_WORKER['tickers'][col] for col in _WORKER['classes'][asset_class]]
+    equity, trades = simulate_positions(arrays['Close'], signals['buy'], signals['sell'], _WORKER['dates'], tickers)
+
+    summary = summarize_backtest(equity, trades)
+    max_drawdown = summary['max_drawdown']
+    return {
+        'asset_class': asset_class,
+        **combo,
+        'final_equity': summary['final_equity'],
+        'total_return': summary['total_return'],
+        'max_drawdown': max_drawdown,
+        'return_over_drawdown': summary['total_return'] / -max_drawdown if max_drawdown < 0 else 0.0,
+        'trades': summary['trades'],
+    }
+
+# === Parent side ===
+
+def rank_results(results, rank_by=RANK_BY):
+    ranked = pd.DataFrame(results)
+    if ranked.empty:
+        return ranked
+    ranked = ranked.sort_values(['asset_class', rank_by], ascending=[True, False])
+    ranked['rank'] = ranked.groupby('asset_class').cumcount() + 1
+    return ranked.reset_index(drop=True)
+
+def run_sweep(panel, grid=SWEEP_GRID, asset_classes=ASSET_CLASSES, workers=None, out_dir=SWEEP_DIR, rank_by=RANK_BY):
+    '''
+    Runs every grid combination against every asset class in a (field, ticker) panel on a process pool.
+    Returns the ranked results DataFrame (best first within each asset class)
+    '''
+    arrays, dates, tickers = panel_arrays(panel)
+    classes = {
+        name: [tickers.index(ticker) for ticker in members if ticker in tickers]
+        for name, members in asset_classes.items()
+    }
+    classes = {name: cols for name, cols in classes.items() if cols}
+
+    combos = expand_grid(grid)
+    tasks = [(name, combo) for name in classes for combo in combos]
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(tasks) // (workers * 8))
+    print(f"🧮 Sweeping {len(combos)} combinations x {len(classes)} asset classes on {workers} workers...")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        array_path = os.path.join(tmp_dir, 'prices.npy')
+        np.save(array_path, np.stack([arrays[field] for field in PANEL_FIELDS]))
+
+        with Pool(workers, initializer=_init_worker, initargs=(array_path, dates, tickers, classes)) as pool, \
+                open(out_dir / 'results.csv', 'w', newline='') as f:
+            writer = None
+            for row in pool.imap_unordered(_run_combo, tasks, chunksize=chunksize):
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                f.flush()
+                results.append(row)
+
+                if len(results) % RANK_EVERY == 0:
+                    rank_results(results, rank_by).to_csv(out_dir / 'ranked.csv', index=False)
+                    print(f"⏱ {len(results)}/{len(tasks)} done")
+
+    ranked = rank_results(results, rank_by)
+    ranked.to_csv(out_dir / 'ranked.csv', index=False)
+    return ranked
+
+def run_watchlist_sweep(asset_classes=ASSET_CLASSES, period=SWEEP_PERIOD):
+    tickers = [ticker for members in asset_classes.values() for ticker in members]
+    print(f"📥 Downloading {period} of history for {len(tickers)} tickers...")
+    frames, empty = download_watchlist(tickers, period=period, auto_adjust=True)
+    if empty:
+        print(f"⚠️ No data for: {', '.join(empty)}")
+    if not frames:
+        print("❌ Nothing to sweep.")
+        return None
+
+    ranked = run_sweep(build_panel(frames), asset_classes=asset_classes)
+    for asset_class, top in ranked.groupby('asset_class'):
+        print(f"\n🏆 Best for {asset_class}:")
+        print(top.head(5).to_string(index=False))
+    print(f"\n🗂 Results written to {SWEEP_DIR}")
+    return ranked
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    run_watchlist_sweep()
@@ -0,0 +1,327 @@
+import argparse
+import csv
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from signals.panel_logic import PANEL_FIELDS, build_panel, calculate_panel_indicators, panel_arrays
+from strategies.defensive_strategy import INDICATOR_PARAMS, calculate_panel_signals, resolve_params
+from simulator.backtest import POSITION_PCT
+from simulator.param_sweep import ASSET_CLASSES, expand_grid
+from utils.market_data import download_watchlist
+from utils.portfolio_io import INITIAL_CAPITAL
+from utils.portfolio_state import BUY, HOLD, SELL, allocate_from_cash
+
+# Out-of-sample checks for the defensive strategy's thresholds, on a process pool.
+#   Walk-forward: rolling train/test windows. Each window reports the fixed thresholds in and out
+#     of sample; with a grid, the combination that did best in training is scored on the test window.
+#   Monte Carlo: block-bootstrapped price paths (whole days resampled across all tickers, so
+#     cross-asset moves stay together), each traded with the run_simulated_bot sizing rules.
+# Prices reach the workers through a memory-mapped .npy file (as in param_sweep). A Monte Carlo task
+# is a batch of paths laid side by side as extra panel columns, so one panel pass covers the batch.
+# Rows stream into walk_forward.csv / monte_carlo.csv as tasks finish.
+#
+#   python -m simulator.robustness                          # 10,000 paths x the 16-ticker watchlist
+#   python -m simulator.robustness --paths 1000 --grid      # also re-select thresholds per window
+
+ROBUSTNESS_PERIOD = '10y'
+ROBUSTNESS_DIR = Path('logs') / 'robustness'
+BARS_PER_YEAR = 252
+TRAIN_DAYS = 3 * BARS_PER_YEAR
+TEST_DAYS = BARS_PER_YEAR
+MC_PATHS = 10_000
+MC_DAYS = 2 * BARS_PER_YEAR     # Bars per simulated path (the first ~60 only warm the indicators up)
+MC_BLOCK = 20                   # Days per bootstrap block, keeps short-term autocorrelation
+PATHS_PER_TASK = 200            # Paths per worker task; bounds a worker's panel at days x (paths x tickers)
+REPORT_EVERY = 10               # Print running Monte Carlo quantiles every N finished tasks
+RANK_BY = 'return_over_drawdown'
+
+# === Simulation ===
+
+def simulate_paths(close, buy, sell, initial_capital=INITIAL_CAPITAL, position_pct=POSITION_PCT):
+    '''
+    backtest.simulate_positions for many independent portfolios at once. Arrays are
+    (days, paths, tickers); each day is sized by utils.portfolio_state.allocate_from_cash on
+    (paths, tickers), the same rule the backtest uses. Returns (equity (days x paths), trades per path)
+    '''
+    n_days, n_paths, n_tickers = close.shape
+    shares = np.zeros((n_paths, n_tickers))
+    cash = np.full(n_paths, float(initial_capital))
+    marks = np.zeros((n_paths, n_tickers))  # Last known close, so a missing bar doesn't zero a position
+    equity = np.empty((n_days, n_paths))
+    trades = np.zeros(n_paths, dtype=int)
+
+    for t in range(n_days):
+        prices = close[t]
+        marks = np.where(np.isnan(prices), marks, prices)
+        holding = shares > 0
+        if ((buy[t] & ~holding) | (sell[t] & holding)).any():
+            action, quantity, cash = allocate_from_cash(buy[t], sell[t], prices, shares, cash, position_pct)
+            shares = np.where(action == SELL, 0.0, np.where(action == BUY, quantity, shares))
+            trades += (action != HOLD).sum(axis=1)
+
+        equity[t] = cash + (shares * marks).sum(axis=1)
+    return equity, trades
+
+def curve_stats(equity):
+    '''
+    Per-path total return, max drawdown and annualized Sharpe for an equity array (days x paths)
+    '''
+    total_return = equity[-1] / equity[0] - 1
+    max_drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+    daily = np.diff(equity, axis=0) / equity[:-1]
+    std = daily.std(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, daily.mean(axis=0) / std * np.sqrt(BARS_PER_YEAR), 0.0)
+        return_over_drawdown = np.where(max_drawdown < 0, total_return / -max_drawdown, 0.0)
+    return {
+        'total_return': total_return,
+        'max_drawdown': max_drawdown,
+        'sharpe': sharpe,
+        'return_over_drawdown': return_over_drawdown,
+    }
+
+# === Walk-forward windows + bootstrap paths ===
+
+def walk_forward_windows(n_days, train_days=TRAIN_DAYS, test_days=TEST_DAYS):
+    '''
+    [(train_start, test_start, test_end)] rolling forward by one test window at a time
+    '''
+    windows = []
+    start = 0
+    while start + train_days + test_days <= n_days:
+        windows.append((start, start + train_days, start + train_days + test_days))
+        start += test_days
+    return windows
+
+def bootstrap_days(rng, n_source, n_days, block=MC_BLOCK):
+    '''
+    Day indices 1..n_source-1 for one path: random blocks of consecutive days, end to end
+    '''
+    starts = rng.integers(1, max(2, n_source - block + 1), size=-(-n_days // block))
+    return (starts[:, None] + np.arange(block)).ravel()[:n_days].clip(max=n_source - 1)
+
+def resample_paths(source, rng, n_paths, n_days=MC_DAYS, block=MC_BLOCK):
+    '''
+    n_paths bootstrapped OHLCV paths from source ({field: days x tickers}, no NaN).
+    Each day keeps its close-to-close log return, High/Low relative to the close and its volume,
+    for every ticker at once. Paths start from the last real close.
+    Returns {field: (n_days, n_paths * n_tickers)}, path-major columns
+    '''
+    close = source['Close']
+    log_returns = np.log(close[1:] / close[:-1])
+    high_ratio, low_ratio = source['High'] / close, source['Low'] / close
+
+    days = np.stack([bootstrap_days(rng, len(close), n_days, block) for _ in range(n_paths)], axis=1)  # days x paths
+    path_close = close[-1] * np.exp(np.cumsum(log_returns[days - 1], axis=0))  # days x paths x tickers
+    fields = {
+        'Close': path_close,
+        'High': path_close * high_ratio[days],
+        'Low': path_close * low_ratio[days],
+        'Volume': source['Volume'][days],
+    }
+    return {field: values.reshape(n_days, -1) for field, values in fields.items()}
+
+# === Worker side ===
+
+_WORKER = {}
+_CACHE_LIMIT = 16
+
+def _init_worker(array_path, n_tickers):
+    _WORKER['prices'] = np.load(array_path, mmap_mode='r')
+    _WORKER['n_tickers'] = n_tickers
+    _WORKER['arrays'] = None
+    _WORKER['indicators'] = {}
+
+def _source_arrays():
+    if _WORKER['arrays'] is None:
+        _WORKER['arrays'] = {field: np.ascontiguousarray(_WORKER['prices'][i]) for i, field in enumerate(PANEL_FIELDS)}
+    return _WORKER['arrays']
+
+def _run_windows(task):
+    combo, windows = task
+    params = resolve_params(combo)
+    arrays = _source_arrays()
+
+    # Threshold-only variations reuse the indicators of the previous combination
+    key = tuple(params[name] for name in INDICATOR_PARAMS)
+    cache = _WORKER['indicators']
+    if key not in cache:
+        if len(cache) >= _CACHE_LIMIT:
+            cache.clear()
+        cache[key] = calculate_panel_indicators(arrays, *key)
+
+    # Signals over the whole history: indicators are causal, so a test window's signals only
+    # depend on bars up to that day (the train window doubles as the test window's warm-up)
+    signals = calculate_panel_signals(arrays, params, cache[key])
+    close = arrays['Close']
+    label = ' '.join(f"{name}={value}" for name, value in combo.items()) or 'fixed'
+
+    rows = []
+    for window, (train_start, test_start, test_end) in enumerate(windows):
+        row = {'window': window, 'thresholds': label, 'train_start': train_start, 'test_start': test_start, 'test_end': test_end}
+        for name, (start, end) in [('train', (train_start, test_start)), ('test', (test_start, test_end))]:
+            equity, trades = simulate_paths(
+                close[start:end, None], signals['buy'][start:end, None], signals['sell'][start:end, None]
+            )
+            row.update({f"{name}_{stat}": float(values[0]) for stat, values in curve_stats(equity).items()})
+            row[f"{name}_trades"] = int(trades[0])
+        rows.append(row)
+    return rows
+
+def _run_paths(task):
+    batch, seed, n_paths, n_days, block, combo = task
+    n_tickers = _WORKER['n_tickers']
+    rng = np.random.default_rng([seed, batch])
+    arrays = resample_paths(_source_arrays(), rng, n_paths, n_days, block)
+
+    signals = calculate_panel_signals(arrays, resolve_params(combo))
+    shape = (n_days, n_paths, n_tickers)
+    equity, trades = simulate_paths(
+        arrays['Close'].reshape(shape), signals['buy'].reshape(shape), signals['sell'].reshape(shape)
+    )
+    stats = curve_stats(equity)
+    return [
+        {'batch': batch, 'path': i, **{key: float(values[i]) for key, values in stats.items()}, 'trades': int(trades[i])}
+        for i in range(n_paths)
+    ]
+
+# === Parent side ===
+
+def _stream(pool, fn, tasks, path, on_row=None, chunksize=1):
+    '''
+    Runs tasks on the pool, appending every returned row (or list of rows) to a CSV as it arrives
+    '''
+    rows = []
+    with open(path, 'w', newline='') as f:
+        writer = None
+        for result in pool.imap_unordered(fn, tasks, chunksize=chunksize):
+            batch = result if isinstance(result, list) else [result]
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(batch[0]))
+                writer.writeheader()
+            writer.writerows(batch)
+            f.flush()
+            rows.extend(batch)
+            if on_row is not None:
+                on_row(rows)
+    return pd.DataFrame(rows)
+
+def _pool(arrays, n_tickers, workers, tmp_dir):
+    array_path = os.path.join(tmp_dir, 'prices.npy')
+    np.save(array_path, np.stack([arrays[field] for field in PANEL_FIELDS]))
+    return Pool(workers, initializer=_init_worker, initargs=(array_path, n_tickers))
+
+def run_walk_forward(panel, grid=None, workers=None, out_dir=ROBUSTNESS_DIR,
+                     train_days=TRAIN_DAYS, test_days=TEST_DAYS, rank_by=RANK_BY):
+    '''
+    Walk-forward over a (field, ticker) panel. Returns one row per (window, combination) with
+    train_* and test_* statistics; the fixed thresholds are the combination {}.
+    With a grid, 'selected' marks each window's best training combination.
+    '''
+    arrays, dates, tickers = panel_arrays(panel)
+    windows = walk_forward_windows(len(dates), train_days, test_days)
+    if not windows:
+        print(f"⚠️ {len(dates)} bars is too short for a {train_days}+{test_days} day window.")
+        return pd.DataFrame()
+
+    combos = [{}] + (expand_grid(grid) if grid else [])
+    tasks = [(combo, windows) for combo in combos]
+    workers = workers or os.cpu_count()
+    print(f"🪟 Walk-forward: {len(windows)} windows x {len(combos)} threshold sets on {workers} workers...")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir, _pool(arrays, len(tickers), workers, tmp_dir) as pool:
+        results = _stream(pool, _run_windows, tasks, out_dir / 'walk_forward.csv', chunksize=4)
+
+    results = results.sort_values(['window', 'thresholds']).reset_index(drop=True)
+    # Bar positions to dates; test_end is exclusive, so report its last bar
+    results['train_start'] = [dates[i].date() for i in results['train_start']]
+    results['test_start'] = [dates[i].date() for i in results['test_start']]
+    results['test_end'] = [dates[i - 1].date() for i in results['test_end']]
+    results['selected'] = False
+    if grid:
+        best = results.groupby('window')[f"train_{rank_by}"].idxmax()
+        results.loc[best, 'selected'] = True
+    results.to_csv(out_dir / 'walk_forward.csv', index=False)
+
+    fixed = results[results['thresholds'] == 'fixed']
+    print(f"📊 Fixed thresholds: mean test return {fixed['test_total_return'].mean():.1%} "
+          f"(train {fixed['train_total_return'].mean():.1%}), "
+          f"{(fixed['test_total_return'] > 0).mean():.0%} of test windows positive")
+    if grid:
+        selected = results[results['selected']]
+        print(f"📊 Re-selected each window: mean test return {selected['test_total_return'].mean():.1%} "
+              f"(train {selected['train_total_return'].mean():.1%})")
+    return results
+
+def run_monte_carlo(panel, n_paths=MC_PATHS, n_days=MC_DAYS, block=MC_BLOCK, params=None, seed=0,
+                    workers=None, out_dir=ROBUSTNESS_DIR, paths_per_task=PATHS_PER_TASK):
+    '''
+    Trades n_paths bootstrapped paths of the panel's tickers. Returns one row of statistics per path
+    '''
+    arrays, dates, tickers = panel_arrays(panel)
+    # Resample only days every ticker traded on, so each drawn day is a full cross-section
+    complete = ~np.isnan(np.stack([arrays[field] for field in PANEL_FIELDS])).any(axis=(0, 2))
+    source = {field: values[complete] for field, values in arrays.items()}
+    print(f"🎲 Monte Carlo: {n_paths} paths x {len(tickers)} tickers x {n_days} days "
+          f"from {int(complete.sum())} complete days on {workers or os.cpu_count()} workers...")
+
+    tasks = []
+    for batch, start in enumerate(range(0, n_paths, paths_per_task)):
+        tasks.append((batch, seed, min(paths_per_task, n_paths - start), n_days, block, params or {}))
+
+    started = time.perf_counter()
+    finished = {'tasks': 0}
+
+    def report(rows):
+        finished['tasks'] += 1
+        if finished['tasks'] % REPORT_EVERY == 0 or finished['tasks'] == len(tasks):
+            returns = np.array([row['total_return'] for row in rows])
+            p5, p50, p95 = np.percentile(returns, [5, 50, 95])
+            print(f"⏱ {len(rows)}/{n_paths} paths in {time.perf_counter() - started:.0f}s — "
+                  f"return p5 {p5:.1%} / p50 {p50:.1%} / p95 {p95:.1%}")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir, _pool(source, len(tickers), workers or os.cpu_count(), tmp_dir) as pool:
+        results = _stream(pool, _run_paths, tasks, out_dir / 'monte_carlo.csv', on_row=report)
+
+    drawdowns = results['max_drawdown']
+    print(f"📊 {(results['total_return'] > 0).mean():.0%} of paths profitable, "
+          f"median max drawdown {drawdowns.median():.1%}, 5% worst {drawdowns.quantile(0.05):.1%}")
+    return results
+
+def run_watchlist_robustness(asset_classes=ASSET_CLASSES, period=ROBUSTNESS_PERIOD, n_paths=MC_PATHS, grid=None, workers=None):
+    tickers = [ticker for members in asset_classes.values() for ticker in members]
+    print(f"📥 Downloading {period} of history for {len(tickers)} tickers...")
+    frames, empty = download_watchlist(tickers, period=period, auto_adjust=True)
+    if empty:
+        print(f"⚠️ No data for: {', '.join(empty)}")
+    if not frames:
+        print("❌ Nothing to test.")
+        return None
+
+    panel = build_panel(frames)
+    walk_forward = run_walk_forward(panel, grid=grid, workers=workers)
+    monte_carlo = run_monte_carlo(panel, n_paths=n_paths, workers=workers)
+    print(f"🗂 Results written to {ROBUSTNESS_DIR}")
+    return walk_forward, monte_carlo
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    from simulator.param_sweep import SWEEP_GRID
+
+    parser = argparse.ArgumentParser(description="Walk-forward + Monte Carlo robustness of the defensive strategy")
+    parser.add_argument('--paths', type=int, default=MC_PATHS, help="Monte Carlo paths")
+    parser.add_argument('--grid', action='store_true', help="re-select thresholds from the sweep grid in every window")
+    parser.add_argument('--workers', type=int, help="pool size (default: all cores)")
+    args = parser.parse_args()
+
+    run_watchlist_robustness(n_paths=args.paths, grid=SWEEP_GRID if args.grid else None, workers=args.workers)
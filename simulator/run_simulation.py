@@ -1,6 +1,6 @@
-from strategies.defensive_strategy import generate_signals
-from utils.portfolio_io import read_positions, write_positions, log_trade, get_cash_available
-import math
+from strategies.defensive_strategy import generate_watchlist_signals
+from utils.portfolio_io import INITIAL_CAPITAL, TRADE_JOURNAL, read_positions, write_positions, log_trade
+from utils.portfolio_state import BUY, POSITION_PCT, SELL, PortfolioState, allocate_from_cash
 
 # Tickers we want to simulate over
 WATCHLIST = ['QQQM', 'VOO', 'IAU', 'IEFA', 'MCHI']
@@ -8,61 +8,49 @@ WATCHLIST = ['QQQM', 'VOO', 'IAU', 'IEFA', 'MCHI']
 def run_simulated_bot():
     print("🤖 Running simulated bot...")
     
-    # Load existing portfolio from CSV
-    positions = read_positions()
-    
-    # Keep a dict of latest prices for each ETF
-    prices = {}
-    trades_made = 0
-    
-    for ticker in WATCHLIST:
-        # Get buy/sell signal + indicators for the current ETF
-        signal = generate_signals(ticker)
-        price = signal['price']
-        prices[ticker] = price
+    # Load existing portfolio from the position store, as arrays in watchlist order
+    state = PortfolioState.from_positions(read_positions(), WATCHLIST)
+
+    # Get buy/sell signals + indicators for the whole watchlist in one batched download
+    signals = generate_watchlist_signals(WATCHLIST)
+    state.mark({ticker: signals[ticker]['price'] for ticker in WATCHLIST})
+
+    # ===================== SIZING ===================== #
+    # Cash = initial capital - value of every current position at today's prices (the old per-ticker
+    # loop only counted tickers it had already walked). Every buy spends 20% of what is left at
+    # that point (whole shares), every sell exits in full, in watchlist order, in one pass
+    buy = state.vector({ticker: signals[ticker]['buy'] for ticker in WATCHLIST}, False)
+    sell = state.vector({ticker: signals[ticker]['sell'] for ticker in WATCHLIST}, False)
+    cash = INITIAL_CAPITAL - state.market_value()
+    action, quantity, _ = allocate_from_cash(buy, sell, state.last_price, state.shares, cash, POSITION_PCT)
 
-        # Get current holding info (default to 0 if not in positions yet)
-        current_position = positions.get(ticker, {'shares': 0, 'avg_price': 0})
-        holding = current_position['shares'] > 0
+    trades_made = 0
+    for i, ticker in enumerate(WATCHLIST):
+        price = state.last_price[i]
 
         # ===================== BUY LOGIC ===================== #
-        if signal['buy'] and not holding:
-            # Determine how much we can invest: 20% of available capital
-            cash_available = get_cash_available(positions, prices)
-            max_trade_amount = cash_available * 0.2
-            shares_to_buy = math.floor(max_trade_amount / price)  # Round down to whole shares
-
-            if shares_to_buy > 0:
-                # Update our positions record
-                positions[ticker] = {
-                    'shares': shares_to_buy,
-                    'avg_price': price
-                }
-                # Log the simulated trade
-                log_trade(ticker, 'BUY', price, shares_to_buy, 'Buy Signal Triggered')
-                print(f"✅ BUY {shares_to_buy} shares of {ticker} @ ${price:.2f}")
-                trades_made += 1
+        if action[i] == BUY:
+            log_trade(ticker, 'BUY', price, int(quantity[i]), 'Buy Signal Triggered')
+            print(f"✅ BUY {int(quantity[i])} shares of {ticker} @ ${price:.2f}")
+            trades_made += 1
 
         # ===================== SELL LOGIC ===================== #
-        elif signal['sell'] and holding:
-            shares_to_sell = current_position['shares']
-            
-            # Log the sell event
-            log_trade(ticker, 'SELL', price, shares_to_sell, 'Sell Signal Triggered')
-
-            # Clear the position
-            positions[ticker] = {'shares': 0, 'avg_price': 0}
-            print(f"❌ SELL {shares_to_sell} shares of {ticker} @ ${price:.2f}")
+        elif action[i] == SELL:
+            log_trade(ticker, 'SELL', price, quantity[i], 'Sell Signal Triggered')
+            print(f"❌ SELL {quantity[i]:g} shares of {ticker} @ ${price:.2f}")
             trades_made += 1
         
         # ===================== NO ACTION ===================== #
         else:
-            print(f"No tradeaction for {ticker}.\n  Buy Signal: {signal['buy']}, Sell Signal: {signal['sell']}, Holding: {holding}\n")
+            holding = state.shares[i] > 0
+            print(f"No tradeaction for {ticker}.\n  Buy Signal: {signals[ticker]['buy']}, Sell Signal: {signals[ticker]['sell']}, Holding: {holding}\n")
 
-    # Save updated positions back to file
-    write_positions(positions)
-    
-    write_positions(positions)
+    # Positions are replaced, not averaged into: buys only happen on flat tickers
+    state.apply(action, quantity, state.last_price)
+
+    # Save updated positions back to the store (one atomic commit), then write the day's trades in bulk
+    write_positions(state.to_positions())
+    TRADE_JOURNAL.close()
 
     print("\n🔚 Simulation complete.")
     if trades_made == 0:
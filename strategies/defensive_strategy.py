@@ -1,41 +1,86 @@
-import yfinance as yf
 from signals.indicator_logic import calculate_ema, calculate_rsi, calculate_atr
+from signals.panel_logic import panel_arrays, calculate_panel_indicators
+from signals.indicator_state import IndicatorSet, load_indicator_state, save_indicator_state
+from strategies.registry import Strategy, register_strategy
+import math
+import numpy as np
 import pandas as pd
+from utils.bar_store import BarStore, yfinance_fetcher
+from utils.market_data import yfinance_batch_fetcher
 
-def generate_signals(ticker): # for simulation
-    df = yf.download(ticker, period='100d', auto_adjust=True)
+MIN_ROWS = 60
+BAR_STORE = BarStore()
+
+# Strategy thresholds. Anything taking `params` accepts a dict overriding some of these keys.
+DEFAULT_PARAMS = {
+    'ema_fast': 10,
+    'ema_slow': 50,
+    'atr_period': 14,
+    'rsi_period': 14,
+    'volume_sma': 20,
+    'rsi_buy_min': 40,
+    'rsi_buy_max': 70,
+    'rsi_sell': 30,
+    'atr_ratio_max': 0.03,
+}
+# The keys that change indicator values (the rest are only thresholds on them)
+INDICATOR_PARAMS = ['ema_fast', 'ema_slow', 'atr_period', 'rsi_period', 'volume_sma']
+
+def resolve_params(params=None):
+    return {**DEFAULT_PARAMS, **(params or {})}
+
+def generate_watchlist_signals(tickers): # for simulation
+    '''
+    generate_signals for a whole watchlist off one batched download.
+    Tickers that came back empty get _empty_signal.
+    '''
+    frames, empty = BAR_STORE.get_many('yfinance_adj', tickers, '1d', yfinance_batch_fetcher(auto_adjust=True))
+
+    signals = {ticker: _empty_signal(ticker) for ticker in empty}
+    for ticker, df in frames.items():
+        signals[ticker] = generate_signals(ticker, df)
+    return signals
+
+def generate_signals(ticker, df=None): # for simulation
+    if df is None:
+        df = BAR_STORE.get_bars('yfinance_adj', ticker, '1d', yfinance_fetcher(ticker, auto_adjust=True))
 
     if df.empty:
         return _empty_signal(ticker)
 
-    buy, sell, close = evaluate_signal_from_df(df)
-    latest = df.iloc[-1]
+    buy, sell, close, latest = evaluate_signal_fast(df)
+    if close is None:
+        return _empty_signal(ticker)
 
     return {
         'ticker': ticker,
         'buy': buy,
         'sell': sell,
         'price': close,
-        'rsi': float(latest['RSI']),
-        'atr': float(latest['ATR']),
+        'rsi': latest['RSI'],
+        'atr': latest['ATR'],
         'volume': int(latest['Volume']),
-        'volume_avg': float(latest['Volume_SMA']),
-    }    
+        'volume_avg': latest['Volume_SMA'],
+    }
 
-def evaluate_signal_from_df(df: pd.DataFrame):
+def evaluate_signal_from_df(df: pd.DataFrame, params=None):
     """
     Calculates buy/sell signal from a dataframe.
     Assumes 'Close', 'High', 'Low', 'Volume' columns exist.
+    params overrides DEFAULT_PARAMS.
     """
-    if df.shape[0] < 60:
+    if df.shape[0] < MIN_ROWS:
         print("⚠️ Not enough rows for indicator calculation. Skipping.")
         return False, False, None
 
-    df['EMA10'] = calculate_ema(df, 10)
-    df['EMA50'] = calculate_ema(df, 50)
-    df['ATR'] = calculate_atr(df, 14)
-    df['RSI'] = calculate_rsi(df, 14)
-    df['Volume_SMA'] = df['Volume'].rolling(20).mean()
+    p = resolve_params(params)
+    fast_col, slow_col = f"EMA{p['ema_fast']}", f"EMA{p['ema_slow']}"
+
+    df[fast_col] = calculate_ema(df, p['ema_fast'])
+    df[slow_col] = calculate_ema(df, p['ema_slow'])
+    df['ATR'] = calculate_atr(df, p['atr_period'])
+    df['RSI'] = calculate_rsi(df, p['rsi_period'])
+    df['Volume_SMA'] = df['Volume'].rolling(p['volume_sma']).mean()
     df.dropna(inplace=True)
 
     if df.empty:
@@ -44,8 +89,8 @@ def evaluate_signal_from_df(df: pd.DataFrame):
     latest = df.iloc[-1]
 
     try:
-        ema10 = float(latest['EMA10'])
-        ema50 = float(latest['EMA50'])
+        ema_fast = float(latest[fast_col])
+        ema_slow = float(latest[slow_col])
         atr = float(latest['ATR'])
         close = float(latest['Close'])
         volume = int(latest['Volume'])
@@ -55,22 +100,268 @@ def evaluate_signal_from_df(df: pd.DataFrame):
         print(f"⚠️ Failed to extract indicators: {e}")
         return False, False, None
 
+    buy, sell = _signal_rules(ema_fast, ema_slow, atr, close, volume, volume_sma, rsi, p)
+
+    return buy, sell, close
+
+def evaluate_signal_fast(df: pd.DataFrame, params=None):
+    """
+    Same decision as evaluate_signal_from_df, computed from the Close/High/Low/Volume columns
+    without adding columns to df or dropping its rows.
+    Returns (buy, sell, close, indicators): indicators holds the decision bar's values, keyed like
+    the columns evaluate_signal_from_df adds, plus 'Close' and 'Volume'.
+    """
+    if df.shape[0] < MIN_ROWS:
+        print("⚠️ Not enough rows for indicator calculation. Skipping.")
+        return False, False, None, {}
+    return evaluate_signal_arrays(
+        _column(df, 'Close'), _column(df, 'High'), _column(df, 'Low'), _column(df, 'Volume'), params
+    )
+
+def evaluate_signal_arrays(close, high, low, volume, params=None):
+    """
+    Kernel behind evaluate_signal_fast, on 1-D float arrays. The EMAs need the whole history;
+    ATR, RSI and the volume SMA only read the last window of bars.
+    If the last bar would not survive evaluate_signal_from_df's dropna (a NaN in it or in its
+    indicators), the decision falls on an earlier bar, and the pandas path takes over.
+    """
+    if len(close) < MIN_ROWS:
+        return False, False, None, {}
+
+    p = resolve_params(params)
+    fast_col, slow_col = f"EMA{p['ema_fast']}", f"EMA{p['ema_slow']}"
+    latest = {
+        fast_col: _ema_last(close, p['ema_fast']),
+        slow_col: _ema_last(close, p['ema_slow']),
+        'ATR': _atr_last(high, low, close, p['atr_period']),
+        'RSI': _rsi_last(close, p['rsi_period']),
+        'Volume_SMA': _mean_last(volume, p['volume_sma']),
+        'Close': float(close[-1]),
+        'Volume': float(volume[-1]),
+    }
+    if any(math.isnan(value) for value in latest.values()) or math.isnan(high[-1]) or math.isnan(low[-1]):
+        return _evaluate_with_pandas(close, high, low, volume, p)
+
+    buy, sell = _signal_rules(
+        latest[fast_col], latest[slow_col], latest['ATR'], latest['Close'],
+        int(latest['Volume']), latest['Volume_SMA'], latest['RSI'], p,
+    )
+    return bool(buy), bool(sell), latest['Close'], latest
+
+def _ema_last(values, span):
+    # Last value of .ewm(span=span, adjust=False).mean(), same recurrence as indicator_state.EMAState
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    weighted, old_wt = math.nan, 1.0
+    for value in values.tolist():
+        if weighted != weighted:
+            weighted = value
+            continue
+        old_wt *= decay
+        if value == value:
+            weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+            old_wt = 1.0
+    return weighted
+
+def _mean_last(values, window):
+    # Last value of .rolling(window).mean(): NaN if the window holds a NaN
+    tail = values[-window:].tolist()
+    if len(tail) < window or any(v != v for v in tail):
+        return math.nan
+    return math.fsum(tail) / window
+
+def _atr_last(high, low, close, period):
+    # True range of the last `period` bars; fmax skips NaN like DataFrame.max(axis=1)
+    prev_close = close[-period - 1:-1]
+    high, low = high[-period:], low[-period:]
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return _mean_last(true_range, period)
+
+def _rsi_last(close, period):
+    # delta.where(delta > 0, 0) turns NaN deltas into 0 gain / 0 loss
+    delta = np.diff(close[-period - 1:])
+    avg_gain = math.fsum(np.where(delta > 0, delta, 0.0).tolist()) / period
+    avg_loss = math.fsum(np.where(delta < 0, -delta, 0.0).tolist()) / period
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else math.nan
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+def _evaluate_with_pandas(close, high, low, volume, params):
+    df = pd.DataFrame({'Close': close, 'High': high, 'Low': low, 'Volume': volume})
+    buy, sell, price = evaluate_signal_from_df(df, params)
+    if price is None:
+        return False, False, None, {}
+    fast_col, slow_col = f"EMA{params['ema_fast']}", f"EMA{params['ema_slow']}"
+    latest = df.iloc[-1]
+    return buy, sell, price, {
+        key: float(latest[key]) for key in [fast_col, slow_col, 'ATR', 'RSI', 'Volume_SMA', 'Close', 'Volume']
+    }
+
+def evaluate_signal_incremental(df: pd.DataFrame, state_path):
+    """
+    Same decision as evaluate_signal_from_df, but resumes the indicators from the IndicatorSet
+    saved at state_path instead of recomputing them over the whole history.
+    Finished bars newer than the saved state are committed and saved; the last bar may still be
+    forming, so it is only peeked at. Does not modify df.
+    ATR, RSI and the volume SMA only read the last window of bars, so resuming them is exact. The
+    EMAs are not: evaluate_signal_from_df seeds them at df's first row, so they are re-seeded
+    there on every call rather than carrying the state's longer history. A NaN in the decision
+    bar hands over to evaluate_signal_arrays, which decides on the bar dropna would keep.
+    """
+    if df.shape[0] < MIN_ROWS:
+        print("⚠️ Not enough rows for indicator calculation. Skipping.")
+        return False, False, None
+
+    dates = _bar_dates(df)
+    close = _column(df, 'Close')
+    high = _column(df, 'High')
+    low = _column(df, 'Low')
+    volume = _column(df, 'Volume')
+
+    state = load_indicator_state(state_path)
+    # Rebuild when there is no state, or when it doesn't join up with df (missed bars)
+    if state is None or state.last_date is None or not dates[0] <= state.last_date < dates[-1]:
+        state = IndicatorSet()
+
+    for i, date in enumerate(dates[:-1]):
+        if state.last_date is None or date > state.last_date:
+            state.update(close[i], high[i], low[i], volume[i], date)
+    save_indicator_state(state, state_path)
+
+    latest = state.peek(close[-1], high[-1], low[-1], volume[-1])
+    latest['EMA10'] = _ema_last(close, DEFAULT_PARAMS['ema_fast'])
+    latest['EMA50'] = _ema_last(close, DEFAULT_PARAMS['ema_slow'])
+    if any(np.isnan(v) for v in latest.values()) or np.isnan([close[-1], high[-1], low[-1], volume[-1]]).any():
+        # evaluate_signal_from_df would drop this bar and decide on an earlier one
+        return evaluate_signal_arrays(close, high, low, volume)[:3]
+
+    buy, sell = _signal_rules(
+        latest['EMA10'], latest['EMA50'], latest['ATR'], float(close[-1]),
+        int(volume[-1]), latest['Volume_SMA'], latest['RSI'],
+    )
+    return bool(buy), bool(sell), float(close[-1])
+
+def evaluate_closed_bar(state, close, high, low, volume, date=None):
+    """
+    Streaming form of evaluate_signal_from_df: commits one finished bar to an IndicatorSet and
+    applies the rules to it, so a bar-by-bar caller sees the decision the DataFrame path would
+    give on the history ending in that bar. Returns (buy, sell, close), or (False, False, None)
+    while the indicators are still warming up.
+    """
+    latest = state.update(close, high, low, volume, date)
+    if state.bars_seen < MIN_ROWS or any(np.isnan(v) for v in latest.values()):
+        return False, False, None
+
+    buy, sell = _signal_rules(
+        latest['EMA10'], latest['EMA50'], latest['ATR'], float(close),
+        int(volume), latest['Volume_SMA'], latest['RSI'],
+    )
+    return bool(buy), bool(sell), float(close)
+
+def _bar_dates(df):
+    # IBKR bars keep their timestamp in a 'date' column, yfinance puts it in the index
+    dates = df['date'] if 'date' in df.columns else df.index
+    return [ts.isoformat() for ts in pd.to_datetime(dates)]
+
+def _column(df, name):
+    # yfinance can return (Price, Ticker) MultiIndex columns, so df[name] may be a 1-column frame
+    return np.asarray(df[name], dtype=float).reshape(-1)
+
+def _signal_rules(ema_fast, ema_slow, atr, close, volume, volume_sma, rsi, params=DEFAULT_PARAMS):
+    """
+    Buy/sell rules of the defensive strategy.
+    Works on plain floats and on NumPy arrays alike, so the single-ticker and panel paths share it.
+    """
     atr_ratio = atr / close
 
     buy = (
-        ema10 > ema50 and
-        volume > volume_sma and
-        40 < rsi < 70 and
-        atr_ratio < 0.03
+        (ema_fast > ema_slow) &
+        (volume > volume_sma) &
+        (rsi > params['rsi_buy_min']) & (rsi < params['rsi_buy_max']) &
+        (atr_ratio < params['atr_ratio_max'])
     )
 
     sell = (
-        ema10 < ema50 or
-        rsi < 30 or
-        atr_ratio > 0.03
+        (ema_fast < ema_slow) |
+        (rsi < params['rsi_sell']) |
+        (atr_ratio > params['atr_ratio_max'])
     )
 
-    return buy, sell, close
+    return buy, sell
+
+# === Registry plugin (strategies/registry.py) ===
+
+def _defensive_indicators(p):
+    return {
+        f"EMA{p['ema_fast']}": ('ema', p['ema_fast']),
+        f"EMA{p['ema_slow']}": ('ema', p['ema_slow']),
+        'ATR': ('atr', p['atr_period']),
+        'RSI': ('rsi', p['rsi_period']),
+        'Volume_SMA': ('volume_sma', p['volume_sma']),
+    }
+
+def _defensive_rules(values, p):
+    return _signal_rules(
+        values[f"EMA{p['ema_fast']}"], values[f"EMA{p['ema_slow']}"], values['ATR'], values['Close'],
+        int(values['Volume']), values['Volume_SMA'], values['RSI'], p,
+    )
+
+STRATEGY = register_strategy(Strategy('defensive', _defensive_indicators, _defensive_rules, DEFAULT_PARAMS, MIN_ROWS))
+
+def calculate_panel_signals(arrays, params=None, indicators=None):
+    """
+    Buy/sell masks for every bar of every ticker in a (dates x tickers) panel.
+    Takes the {field: ndarray} dict from signals.panel_logic.panel_arrays.
+    Returns the indicator arrays plus 'buy', 'sell' and 'valid' masks; 'valid' marks the bars
+    evaluate_signal_from_df would decide on (enough history, row survives dropna).
+    Pass indicators from an earlier call to re-run only the thresholds.
+    """
+    p = resolve_params(params)
+    if indicators is None:
+        indicators = calculate_panel_indicators(arrays, *(p[key] for key in INDICATOR_PARAMS))
+
+    # A bar counts once the ticker has MIN_ROWS of history, like the single-ticker row check
+    valid = np.cumsum(~np.isnan(arrays['Close']), axis=0) >= MIN_ROWS
+    for values in list(arrays.values()) + list(indicators.values()):
+        valid &= ~np.isnan(values)
+
+    with np.errstate(invalid='ignore'):
+        buy, sell = _signal_rules(
+            indicators[f"EMA{p['ema_fast']}"], indicators[f"EMA{p['ema_slow']}"], indicators['ATR'], arrays['Close'],
+            np.trunc(arrays['Volume']), indicators['Volume_SMA'], indicators['RSI'], p,
+        )
+
+    return {**indicators, 'buy': buy & valid, 'sell': sell & valid, 'valid': valid}
+
+def evaluate_signals_panel(panel: pd.DataFrame, params=None):
+    """
+    Panel version of evaluate_signal_from_df for the whole watchlist in one pass.
+    Takes a wide (field, ticker) OHLCV panel, e.g. yf.download(WATCHLIST, group_by='column')
+    or signals.panel_logic.build_panel(frames).
+    Returns a DataFrame indexed by ticker with the same keys as generate_signals.
+    """
+    arrays, _, tickers = panel_arrays(panel)
+    signals = calculate_panel_signals(arrays, params)
+    valid = signals['valid']
+    n_rows = valid.shape[0]
+
+    # Last surviving row per ticker, i.e. df.dropna().iloc[-1]
+    has_row = valid.any(axis=0)
+    last = n_rows - 1 - valid[::-1].argmax(axis=0)
+    cols = np.arange(len(tickers))
+
+    def at_last(values):
+        return np.where(has_row, values[last, cols], np.nan)
+
+    return pd.DataFrame({
+        'buy': signals['buy'][last, cols] & has_row,
+        'sell': signals['sell'][last, cols] & has_row,
+        'price': at_last(arrays['Close']),
+        'rsi': at_last(signals['RSI']),
+        'atr': at_last(signals['ATR']),
+        'volume': at_last(arrays['Volume']),
+        'volume_avg': at_last(signals['Volume_SMA']),
+    }, index=pd.Index(tickers, name='ticker'))
 
 def _empty_signal(ticker):
     return {
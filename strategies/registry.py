@@ -0,0 +1,138 @@
+import importlib
+
+import numpy as np
+
+from signals.panel_logic import calculate_atr_panel, calculate_ema_panel, calculate_rsi_panel, rolling_mean_panel
+
+# Strategy plugins over a shared, per-symbol indicator cache.
+#
+#   from strategies.registry import evaluate_strategies
+#   decisions = evaluate_strategies(df, ['defensive', ...])   # {name: (buy, sell, close)}
+#
+# A strategy declares the indicators it reads as specs like ('ema', 10) or ('atr', 14), and
+# IndicatorCache computes each distinct spec once per symbol however many strategies ask for it.
+# Strategy modules register themselves on import; STRATEGY_MODULES lists the ones to load.
+
+STRATEGY_MODULES = ['strategies.defensive_strategy']
+BAR_FIELDS = ['Close', 'High', 'Low', 'Volume']
+
+STRATEGIES = {}
+
+# === Indicators ===
+
+# spec name -> kernel on one-column (bars x 1) arrays, the panel kernels applied to a single symbol.
+# A NaN close here is a row of the symbol's own frame, not a panel gap, hence RSI's missing_gain=0.0
+INDICATORS = {
+    'ema': lambda bars, span: calculate_ema_panel(bars['Close'], span),
+    'sma': lambda bars, window: rolling_mean_panel(bars['Close'], window),
+    'atr': lambda bars, period: calculate_atr_panel(bars['High'], bars['Low'], bars['Close'], period),
+    'rsi': lambda bars, period: calculate_rsi_panel(bars['Close'], period, missing_gain=0.0),
+    'volume_sma': lambda bars, window: rolling_mean_panel(bars['Volume'], window),
+}
+
+class IndicatorCache:
+    '''
+    One symbol's bars plus every indicator series computed on them so far, keyed by spec.
+    Series match the pandas indicators in signals/indicator_logic.py bar for bar, NaN rows included.
+    '''
+    def __init__(self, close, high, low, volume):
+        self.bars = {
+            field: np.asarray(values, dtype=float).reshape(-1, 1)
+            for field, values in zip(BAR_FIELDS, [close, high, low, volume])
+        }
+        self.series = {}
+        self.computed = 0
+        self.reused = 0
+
+    @classmethod
+    def from_df(cls, df):
+        # yfinance can return (Price, Ticker) MultiIndex columns, so df[field] may be a 1-column frame
+        return cls(*(np.asarray(df[field], dtype=float).reshape(-1) for field in BAR_FIELDS))
+
+    def __len__(self):
+        return self.bars['Close'].shape[0]
+
+    def get(self, spec):
+        if spec in self.series:
+            self.reused += 1
+        else:
+            name, *args = spec
+            self.series[spec] = INDICATORS[name](self.bars, *args)[:, 0]
+            self.computed += 1
+        return self.series[spec]
+
+    def field(self, name):
+        return self.bars[name][:, 0]
+
+# === Strategies ===
+
+class Strategy:
+    '''
+    A named rule set over declared indicators.
+    indicators(params) -> {column: spec}, e.g. {'EMA10': ('ema', 10), 'ATR': ('atr', 14)}
+    rules(values, params) -> (buy, sell), where values holds the decision bar's indicator columns
+    plus Close/High/Low/Volume as floats
+    '''
+    def __init__(self, name, indicators, rules, default_params=None, min_rows=1):
+        self.name = name
+        self.indicators = indicators
+        self.rules = rules
+        self.default_params = default_params or {}
+        self.min_rows = min_rows
+
+    def resolve_params(self, params=None):
+        return {**self.default_params, **(params or {})}
+
+def register_strategy(strategy):
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+def load_strategies(modules=STRATEGY_MODULES):
+    for module in modules:
+        importlib.import_module(module)
+    return STRATEGIES
+
+def get_strategy(name):
+    if name not in STRATEGIES:
+        load_strategies()
+    if name not in STRATEGIES:
+        raise KeyError(f"Unknown strategy {name!r} (registered: {', '.join(STRATEGIES) or 'none'})")
+    return STRATEGIES[name]
+
+def evaluate_strategy(strategy, cache, params=None):
+    '''
+    One strategy's decision on a symbol, the way evaluate_signal_from_df decides: at least
+    min_rows bars, then the last bar with no NaN in the bars or in the strategy's indicators.
+    Returns (buy, sell, close, values), or (False, False, None, {}) if there is no such bar.
+    '''
+    if len(cache) < strategy.min_rows:
+        return False, False, None, {}
+
+    p = strategy.resolve_params(params)
+    columns = {column: cache.get(spec) for column, spec in strategy.indicators(p).items()}
+    columns.update({field: cache.field(field) for field in BAR_FIELDS})
+
+    valid = np.ones(len(cache), dtype=bool)
+    for values in columns.values():
+        valid &= ~np.isnan(values)
+    if not valid.any():
+        return False, False, None, {}
+
+    last = len(valid) - 1 - int(valid[::-1].argmax())
+    values = {column: float(series[last]) for column, series in columns.items()}
+    buy, sell = strategy.rules(values, p)
+    return bool(buy), bool(sell), values['Close'], values
+
+def evaluate_strategies(df, names, params=None, cache=None):
+    '''
+    Several strategies on one symbol's bars, sharing one IndicatorCache.
+    params maps strategy name -> overrides. Returns {name: (buy, sell, close)}
+    '''
+    if cache is None:
+        cache = IndicatorCache.from_df(df)
+    params = params or {}
+    decisions = {}
+    for name in names:
+        buy, sell, close, _ = evaluate_strategy(get_strategy(name), cache, params.get(name))
+        decisions[name] = (buy, sell, close)
+    return decisions
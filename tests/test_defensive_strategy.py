@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_bars
+from strategies.defensive_strategy import evaluate_signal_from_df, evaluate_signal_incremental
+
+# evaluate_signal_incremental against the batch path on the frames prod actually sees: a fixed
+# window of daily bars sliding forward one bar per run, with the saved state carrying more history
+# than any single window.
+
+WINDOW = 100
+RUNS = 150
+
+def sliding_windows(bars, window=WINDOW):
+    for end in range(window, len(bars) + 1):
+        yield bars.iloc[end - window:end]
+
+@pytest.mark.parametrize('seed', range(8))
+def test_resumed_state_matches_batch_on_sliding_window(tmp_path, seed):
+    bars = synthetic_bars(WINDOW + RUNS, seed=seed)
+    state_path = tmp_path / 'state.json'
+    for df in sliding_windows(bars):
+        assert evaluate_signal_incremental(df, state_path) == evaluate_signal_from_df(df.copy())
+
+def test_resume_after_a_gap_of_several_bars(tmp_path):
+    bars = synthetic_bars(WINDOW + 40, seed=11)
+    state_path = tmp_path / 'state.json'
+    evaluate_signal_incremental(bars.iloc[:WINDOW], state_path)
+    df = bars.iloc[30:]
+    assert evaluate_signal_incremental(df, state_path) == evaluate_signal_from_df(df.copy())
+
+@pytest.mark.parametrize('column', ['Close', 'High', 'Volume'])
+def test_nan_in_forming_bar_falls_back_to_batch(tmp_path, column):
+    bars = synthetic_bars(WINDOW + 5, seed=12)
+    state_path = tmp_path / 'state.json'
+    evaluate_signal_incremental(bars.iloc[:WINDOW], state_path)
+    df = bars.iloc[5:].copy()
+    df.iloc[-1, df.columns.get_loc(column)] = np.nan
+    assert evaluate_signal_incremental(df, state_path) == evaluate_signal_from_df(df.copy())
+
+def test_too_few_rows(tmp_path):
+    df = synthetic_bars(59)
+    assert evaluate_signal_incremental(df, tmp_path / 'state.json') == (False, False, None)
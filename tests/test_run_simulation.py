@@ -0,0 +1,51 @@
+import pytest
+
+from simulator import run_simulation
+from utils.trade_journal import TradeJournal
+
+def signal(price, buy=False, sell=False):
+    return {'buy': buy, 'sell': sell, 'price': price}
+
+@pytest.fixture
+def simulate(tmp_path, monkeypatch):
+    '''
+    Runs run_simulated_bot on a given book and signals; returns (trades, positions written)
+    '''
+    def run(book, signals):
+        trades, written = [], {}
+        monkeypatch.setattr(run_simulation, 'read_positions', lambda: book)
+        monkeypatch.setattr(run_simulation, 'write_positions', written.update)
+        monkeypatch.setattr(run_simulation, 'generate_watchlist_signals', lambda tickers: signals)
+        monkeypatch.setattr(run_simulation, 'log_trade', lambda ticker, action, price, shares, reason: trades.append((ticker, action, shares)))
+        monkeypatch.setattr(run_simulation, 'TRADE_JOURNAL', TradeJournal('simulation', root=tmp_path))
+        run_simulation.run_simulated_bot()
+        return trades, written
+    return run
+
+def test_cash_excludes_holdings_later_in_the_watchlist(simulate):
+    # The pre-PortfolioState loop valued only the tickers it had already walked, so MCHI (last in
+    # the watchlist) was left out and QQQM bought 40 shares off the full 10,000
+    book = {'MCHI': {'shares': 20, 'avg_price': 90.0}}
+    signals = {ticker: signal(100.0) for ticker in run_simulation.WATCHLIST}
+    signals['QQQM'] = signal(50.0, buy=True)
+
+    trades, written = simulate(book, signals)
+
+    # (10,000 - 20 * 100) * 20% / 50
+    assert trades == [('QQQM', 'BUY', 32)]
+    assert written['QQQM'] == {'shares': 32, 'avg_price': 50.0}
+    assert written['MCHI']['shares'] == 20
+
+def test_sale_funds_later_buys_in_watchlist_order(simulate):
+    book = {'VOO': {'shares': 10, 'avg_price': 150.0}, 'MCHI': {'shares': 20, 'avg_price': 90.0}}
+    signals = {ticker: signal(100.0) for ticker in run_simulation.WATCHLIST}
+    signals['QQQM'] = signal(50.0, buy=True)
+    signals['VOO'] = signal(200.0, sell=True)
+    signals['IAU'] = signal(40.0, buy=True)
+
+    trades, _ = simulate(book, signals)
+
+    # cash 10,000 - 2,000 - 2,000 = 6,000; QQQM 24 @ 50 -> 4,800; VOO +2,000 -> 6,800; IAU 34 @ 40
+    assert [(ticker, action, int(shares)) for ticker, action, shares in trades] == [
+        ('QQQM', 'BUY', 24), ('VOO', 'SELL', 10), ('IAU', 'BUY', 34),
+    ]
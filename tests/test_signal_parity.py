@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_bars
+from strategies.defensive_strategy import evaluate_signal_fast, evaluate_signal_from_df, evaluate_signal_incremental
+
+# evaluate_signal_fast and evaluate_signal_incremental against evaluate_signal_from_df: every case
+# must give the same (buy, sell, close), and the fast path the same indicator values on the
+# decision bar (to RTOL). Timings for both paths are in benchmarks/suite.py.
+
+RTOL = 1e-9
+LENGTHS = [60, 61, 75, 100, 252, 1260]
+SEEDS = range(40)
+PARAM_SETS = [None, {'ema_fast': 5, 'ema_slow': 20, 'atr_period': 10, 'rsi_period': 7, 'volume_sma': 10, 'atr_ratio_max': 0.02}]
+
+def edge_cases():
+    '''
+    {name: df} for the cases that send evaluate_signal_from_df's dropna to an earlier bar or make
+    an indicator degenerate
+    '''
+    cases = {}
+
+    df = synthetic_bars(100, seed=1)
+    df.iloc[-1, df.columns.get_loc('Volume')] = np.nan
+    cases['NaN volume on the last bar'] = df
+
+    df = synthetic_bars(100, seed=2)
+    df.iloc[50, df.columns.get_loc('Close')] = np.nan
+    cases['NaN close mid-history'] = df
+
+    df = synthetic_bars(100, seed=3)
+    df.iloc[-5, df.columns.get_loc('High')] = np.nan
+    cases['NaN high inside the ATR window'] = df
+
+    df = synthetic_bars(100, seed=4)
+    df['Close'] = np.linspace(50, 80, 100)
+    cases['monotone rise (no losses, RSI 100)'] = df
+
+    df = synthetic_bars(100, seed=5)
+    df['Close'] = df['High'] = df['Low'] = 42.0
+    cases['flat prices (RSI 0/0)'] = df
+
+    df = synthetic_bars(100, seed=6)
+    df['Close'] = np.linspace(80, 50, 100)
+    cases['monotone fall'] = df
+    return cases
+
+EDGE_CASES = edge_cases()
+
+def assert_fast_matches(df, params):
+    expected_df = df.copy()
+    buy, sell, close = evaluate_signal_from_df(expected_df, params)
+    fast_buy, fast_sell, fast_close, latest = evaluate_signal_fast(df, params)
+
+    assert (fast_buy, fast_sell, fast_close) == (buy, sell, close)
+    if close is not None:
+        row = expected_df.iloc[-1]
+        for key, value in latest.items():
+            assert math.isclose(float(row[key]), value, rel_tol=RTOL), key
+
+@pytest.mark.parametrize('params', PARAM_SETS, ids=['default', 'custom'])
+@pytest.mark.parametrize('n_bars', LENGTHS)
+def test_fast_matches_pandas_on_random_walks(n_bars, params):
+    for seed in SEEDS:
+        assert_fast_matches(synthetic_bars(n_bars, seed=seed), params)
+
+@pytest.mark.parametrize('name', EDGE_CASES)
+def test_fast_matches_pandas_on_edge_cases(name):
+    assert_fast_matches(EDGE_CASES[name], None)
+
+def test_fast_does_not_modify_its_input():
+    df = synthetic_bars(100)
+    before = df.copy()
+    evaluate_signal_fast(df)
+    assert df.equals(before)
+
+@pytest.mark.parametrize('n_bars', LENGTHS)
+def test_incremental_matches_pandas_on_random_walks(tmp_path, n_bars):
+    for seed in SEEDS:
+        df = synthetic_bars(n_bars, seed=seed)
+        assert evaluate_signal_incremental(df, tmp_path / f"{seed}.json") == evaluate_signal_from_df(df.copy())
+
+@pytest.mark.parametrize('name', EDGE_CASES)
+def test_incremental_matches_pandas_on_edge_cases(tmp_path, name):
+    df = EDGE_CASES[name]
+    assert evaluate_signal_incremental(df, tmp_path / 'state.json') == evaluate_signal_from_df(df.copy())
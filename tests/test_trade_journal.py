@@ -0,0 +1,22 @@
+import csv
+
+import numpy as np
+
+from utils.trade_journal import TradeJournal, read_trades
+
+def test_csv_keeps_whole_shares_as_ints(tmp_path):
+    csv_path = tmp_path / 'trades.csv'
+    with TradeJournal('test', csv_path, root=tmp_path / 'trades') as journal:
+        journal.record('VOO', 'BUY', 512.304, 10)
+        journal.record('SPY', 'SELL', 601.2, np.int64(3))
+        journal.record('QQQ', 'BUY', 480.0, 2.5)
+        journal.record('IWM', 'BUY', 210.0)
+
+    with open(csv_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['shares'] for row in rows] == ['10', '3', '2.5', '']
+    assert rows[0]['price'] == '512.3'
+
+    trades = read_trades(tmp_path / 'trades')
+    assert trades['shares'].dtype == 'float64'
+    assert trades['shares'].tolist()[:3] == [10.0, 3.0, 2.5]
@@ -0,0 +1,181 @@
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# On-disk OHLCV cache shared by the yfinance and IBKR data paths.
+# One Parquet file per (source, symbol, bar size); each run only fetches the missing tail.
+
+BARS_DIR = 'data/bars'
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+LOOKBACK_DAYS = 100  # Same window as period='100d' / durationStr='100 D'
+OVERLAP_BARS = 2     # Re-fetch the last stored bars: the newest may have been partial
+
+def normalize_bars(df):
+    '''
+    Brings yfinance and IBKR frames to one layout:
+    DatetimeIndex named 'date' + Open/High/Low/Close/Volume float columns
+    '''
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name='date'), dtype=float)
+
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance single-ticker downloads come back as (Price, Ticker)
+        df.columns = df.columns.get_level_values(0)
+    df = df.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'})
+    if 'date' in df.columns:
+        df = df.set_index('date')
+
+    df.index = pd.to_datetime(df.index)
+    df.index.name = 'date'
+    return df[BAR_COLUMNS].astype(float).sort_index()
+
+class BarStore:
+    def __init__(self, root=BARS_DIR):
+        self.root = Path(root)
+
+    def path(self, source, symbol, bar_size):
+        return self.root / source / bar_size.replace(' ', '') / f"{symbol}.parquet"
+
+    def load(self, source, symbol, bar_size):
+        path = self.path(source, symbol, bar_size)
+        if not path.exists():
+            return None
+        return pd.read_parquet(path)
+
+    def save(self, source, symbol, bar_size, df):
+        path = self.path(source, symbol, bar_size)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.parquet.tmp')
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def get_bars(self, source, symbol, bar_size, fetch_tail, lookback_days=LOOKBACK_DAYS):
+        '''
+        Returns the last lookback_days of bars for (source, symbol, bar_size).
+        fetch_tail(start) must return bars from start onwards, or the full default window when start is None.
+        Only the missing tail is fetched; a full refetch happens when there is no cache yet
+        or when the overlapping bars no longer agree (e.g. a dividend re-adjusted the history).
+        A tail fetch that fails or comes back empty returns no bars rather than the stale cache.
+        '''
+        cached = self.load(source, symbol, bar_size)
+        start = _tail_start(cached)
+        fresh = _guarded(symbol, lambda: fetch_tail(start))
+        return self._merge_and_save(
+            source, symbol, bar_size, cached, start, fresh, lambda: fetch_tail(None), lookback_days
+        )
+
+    def get_many(self, source, symbols, bar_size, fetch_tails, lookback_days=LOOKBACK_DAYS):
+        '''
+        Batched get_bars for a whole watchlist.
+        fetch_tails(symbols, start) must return {symbol: bars}; it is called at most twice,
+        once for symbols with no cache yet and once from the oldest tail start of the rest.
+        Returns ({symbol: bars}, [symbols with no bars at all]). A symbol whose tail fetch failed or
+        came back empty is in the second list too, so callers skip it instead of trading on the
+        stale cache.
+        '''
+        cached = {symbol: self.load(source, symbol, bar_size) for symbol in symbols}
+        starts = {symbol: _tail_start(cached[symbol]) for symbol in symbols}
+
+        fresh = {}
+        missing = [symbol for symbol in symbols if starts[symbol] is None]
+        if missing:
+            fresh.update(_guarded(', '.join(missing), lambda: fetch_tails(missing, None)) or {})
+        known = [symbol for symbol in symbols if starts[symbol] is not None]
+        if known:
+            tail_start = min(starts[symbol] for symbol in known)
+            fresh.update(_guarded(', '.join(known), lambda: fetch_tails(known, tail_start)) or {})
+
+        frames, empty = {}, []
+        for symbol in symbols:
+            bars = self._merge_and_save(
+                source, symbol, bar_size, cached[symbol], starts[symbol], fresh.get(symbol),
+                lambda: (_guarded(symbol, lambda: fetch_tails([symbol], None)) or {}).get(symbol), lookback_days
+            )
+            if bars.empty:
+                empty.append(symbol)
+            else:
+                frames[symbol] = bars
+
+        return frames, empty
+
+    def _merge_and_save(self, source, symbol, bar_size, cached, start, fresh, fetch_full, lookback_days):
+        fresh = normalize_bars(fresh)
+
+        if start is None:
+            bars = fresh
+        elif fresh.empty:
+            # The tail fetch failed: the cache alone can't say whether it is still current
+            print(f"[{symbol}] ⚠️ No fresh {source} bars, skipping the cached ones")
+            return fresh
+        elif _overlap_matches(cached, fresh, start):
+            bars = pd.concat([cached, fresh])
+            bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+        else:
+            print(f"[{symbol}] ♻️ Cached {source} bars out of date, refetching full history")
+            bars = normalize_bars(fetch_full())
+
+        if bars.empty:
+            return bars
+
+        self.save(source, symbol, bar_size, bars)
+        return bars[bars.index >= bars.index[-1] - pd.Timedelta(days=lookback_days)]
+
+def _tail_start(cached):
+    # Where the next fetch should start, or None when a full fetch is needed
+    if cached is None or len(cached) < OVERLAP_BARS:
+        return None
+    return cached.index[-OVERLAP_BARS]
+
+def _guarded(label, fetch):
+    # A fetch that raises counts as one that returned nothing
+    try:
+        return fetch()
+    except Exception as e:
+        print(f"[{label}] ❌ Bar fetch failed: {e}")
+        return None
+
+def _overlap_matches(cached, fresh, start):
+    # fresh has rows but not the overlap bar -> nothing to compare, keep the cache
+    if start not in fresh.index:
+        return True
+    old_close = float(cached.loc[start, 'Close'])
+    new_close = float(fresh.loc[start, 'Close'])
+    return math.isclose(old_close, new_close, rel_tol=1e-6)
+
+# === Fetchers ===
+
+def yfinance_fetcher(symbol, interval='1d', auto_adjust=True, period=f'{LOOKBACK_DAYS}d'):
+    def fetch_tail(start):
+        import yfinance as yf  # Deferred: only needed when a tail is actually missing
+        if start is None:
+            return yf.download(symbol, period=period, interval=interval, auto_adjust=auto_adjust, progress=False)
+        return yf.download(symbol, start=start.strftime('%Y-%m-%d'), interval=interval, auto_adjust=auto_adjust, progress=False)
+    return fetch_tail
+
+def ibkr_fetcher(ib, contract, bar_size='1 day', duration=f'{LOOKBACK_DAYS} D', what_to_show='TRADES'):
+    def fetch_tail(start):
+        bars = ib.reqHistoricalData(
+            contract,
+            endDateTime='',
+            durationStr=duration if start is None else ibkr_duration_since(start),
+            barSizeSetting=bar_size,
+            whatToShow=what_to_show,
+            useRTH=True,
+            formatDate=1
+        )
+        return pd.DataFrame(bars)
+    return fetch_tail
+
+def ibkr_duration_since(start):
+    '''
+    Smallest IB durationStr that reaches back to start ('N D' up to a year, 'N Y' beyond)
+    '''
+    start = pd.Timestamp(start).tz_localize(None).to_pydatetime()
+    days = max((datetime.now() - start).days + 1, 1)
+    if days > 365:
+        return f"{math.ceil(days / 365)} Y"
+    return f"{days} D"
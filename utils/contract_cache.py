@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# On-disk cache of qualified IBKR contracts, keyed by symbol|exchange|currency.
+# conIds for our ETFs practically never change, so a cached contract is reused until it is older
+# than the TTL; only missing or expired symbols go back to IB (see ibkr_data.qualify_watchlist).
+
+CONTRACTS_PATH = 'data/contracts.json'
+CONTRACT_TTL_DAYS = 7
+
+class ContractCache:
+    def __init__(self, path=CONTRACTS_PATH, ttl_days=CONTRACT_TTL_DAYS):
+        self.path = Path(path)
+        self.ttl = timedelta(days=ttl_days)
+        self._entries = None
+
+    @staticmethod
+    def key(symbol, exchange='SMART', currency='USD'):
+        return f"{symbol}|{exchange}|{currency}"
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+        return self._entries
+
+    def get(self, symbol, exchange='SMART', currency='USD', now=None):
+        '''
+        The cached contract, or None if it was never qualified or has expired
+        '''
+        from ib_insync import Contract
+
+        entry = self.entries.get(self.key(symbol, exchange, currency))
+        if entry is None:
+            return None
+        if (now or datetime.now()) - datetime.fromisoformat(entry['qualified_at']) > self.ttl:
+            return None
+        return Contract.create(**entry['contract'])
+
+    def put(self, symbol, contract, exchange='SMART', currency='USD', now=None):
+        from ib_insync import util
+
+        self.entries[self.key(symbol, exchange, currency)] = {
+            'contract': util.dataclassNonDefaults(contract),
+            'qualified_at': (now or datetime.now()).isoformat(timespec='seconds'),
+        }
+
+    def invalidate(self, symbols, exchange='SMART', currency='USD'):
+        for symbol in symbols:
+            self.entries.pop(self.key(symbol, exchange, currency), None)
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -3,17 +3,28 @@ from datetime import datetime
 
 today = datetime.today().strftime("%Y%m%d")
 
-def generate_start_calendar_intervals():
+def schedule_slots():
+    '''
+    (Weekday, Hour, Minute) of every StartCalendarInterval entry, in launchd numbering
+    '''
     # Weekday 2 (Monday) to 6 (Friday) + Weekday 7 (Saturday early AM)
     weekdays = [2, 3, 4, 5, 6, 7]
-    output = []
+    slots = []
 
     for wd in weekdays:
         # Nighttime hours (22, 23) and early morning (0–5)
         for hr in ([22, 23] if wd in range(2, 6) else []) + ([0, 1, 2, 3, 4, 5] if wd in range(3, 8) else []):
             for minute in list(range(0,60,5)):
-                block = f"""    <dict><key>Weekday</key><integer>{wd}</integer><key>Hour</key><integer>{hr}</integer><key>Minute</key><integer>{minute}</integer></dict>"""
-                output.append(block)
+                slots.append((wd, hr, minute))
+
+    return slots
+
+def generate_start_calendar_intervals():
+    output = []
+
+    for wd, hr, minute in schedule_slots():
+        block = f"""    <dict><key>Weekday</key><integer>{wd}</integer><key>Hour</key><integer>{hr}</integer><key>Minute</key><integer>{minute}</integer></dict>"""
+        output.append(block)
 
     return '\n'.join(output)
 
@@ -0,0 +1,238 @@
+import asyncio
+import time
+
+import pandas as pd
+
+from utils.bar_store import LOOKBACK_DAYS, ibkr_duration_since
+
+# Concurrent IBKR historical-data fetching that stays inside IB's pacing rules:
+#   - at most 60 historical requests in any 10-minute window
+#   - no identical request within 15 seconds (so retries back off at least that long)
+#   - at most 50 requests open at once (we keep far fewer in flight)
+# The pacing budget belongs to the connection, not the cycle: long-running callers (daemon, data
+# service, intraday runner) keep one HistoricalDataFetcher and pass it in through fetcher=.
+# ib_insync is imported inside the functions that talk to IB, so importing this module stays cheap.
+
+IB_HOST = '127.0.0.1'
+IB_PORT = 7497
+CONNECT_TIMEOUT = 10
+
+PACING_REQUESTS = 60
+PACING_WINDOW_SECONDS = 600
+MAX_IN_FLIGHT = 6
+MAX_RETRIES = 2
+BACKOFF_SECONDS = 15
+REQUEST_TIMEOUT = 60
+PACING_VIOLATION = 162  # IB error code for historical-data pacing violations
+QUOTE_TIMEOUT = 5.0     # Seconds to wait for the whole watchlist's quotes
+
+def connect_ib(client_id, host=IB_HOST, port=IB_PORT, timeout=CONNECT_TIMEOUT):
+    from ib_insync import IB
+
+    ib = IB()
+    ib.connect(host, port, clientId=client_id, timeout=timeout)
+    ib.sleep(1)
+    return ib
+
+def load_account(ib):
+    '''
+    Reads held positions and the USD NetLiquidation value.
+    Returns ({symbol: shares held}, capital), with capital None if IB didn't report it
+    '''
+    portfolio = ib.positions()
+    held_positions = {p.contract.symbol: p.position for p in portfolio if p.position > 0}
+
+    capital = None
+    for val in ib.accountValues():
+        if val.tag == 'NetLiquidation' and val.currency == 'USD':
+            capital = float(val.value)
+            break
+
+    if capital is None:
+        print("❌ Could not find NetLiquidation value in account values.")
+    return held_positions, capital
+
+class TokenBucket:
+    '''
+    Async token bucket: `capacity` requests straight away, then refills at capacity / window_seconds
+    '''
+    def __init__(self, capacity=PACING_REQUESTS, window_seconds=PACING_WINDOW_SECONDS):
+        self.capacity = capacity
+        self.rate = capacity / window_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # Holding the lock while waiting keeps requests in FIFO order
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class HistoricalDataFetcher:
+    '''
+    Keeps several reqHistoricalDataAsync calls in flight, each one taking a token from the
+    pacing bucket first. Empty answers and pacing violations are retried with exponential backoff;
+    any other request error (unknown contract, no permissions) fails the symbol straight away.
+    '''
+    def __init__(self, ib, bucket=None, max_in_flight=MAX_IN_FLIGHT, max_retries=MAX_RETRIES,
+                 backoff_seconds=BACKOFF_SECONDS, timeout=REQUEST_TIMEOUT):
+        self.ib = ib
+        self.bucket = bucket or TokenBucket()
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+
+    async def fetch(self, contract, duration, bar_size='1 day', what_to_show='TRADES'):
+        from ib_insync.wrapper import RequestError
+
+        for attempt in range(self.max_retries + 1):
+            async with self.in_flight:
+                await self.bucket.acquire()
+                try:
+                    bars = await self.ib.reqHistoricalDataAsync(
+                        contract,
+                        endDateTime='',
+                        durationStr=duration,
+                        barSizeSetting=bar_size,
+                        whatToShow=what_to_show,
+                        useRTH=True,
+                        formatDate=1,
+                        timeout=self.timeout
+                    )
+                except RequestError as e:
+                    if e.code != PACING_VIOLATION:
+                        print(f"[{contract.symbol}] ❌ Historical data request failed: {e}")
+                        return []
+                    bars, reason = [], "Pacing violation"
+                else:
+                    reason = "No bars returned"
+
+            if bars:
+                return bars
+
+            if attempt < self.max_retries:
+                delay = self.backoff_seconds * 2 ** attempt
+                print(f"[{contract.symbol}] ⏳ {reason}, retrying in {delay:.0f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+        return []
+
+    async def fetch_many(self, contracts, duration, bar_size='1 day', what_to_show='TRADES'):
+        '''
+        Fetches {symbol: contract} concurrently. Returns {symbol: bars}, with [] for failures.
+        Request errors are raised while it runs (ib.RaiseRequestErrors) so fetch can tell a pacing
+        violation from a permanent error; ib_insync would otherwise log both and return no bars.
+        '''
+        raise_errors = getattr(self.ib, 'RaiseRequestErrors', False)
+        self.ib.RaiseRequestErrors = True
+        try:
+            results = await asyncio.gather(
+                *(self.fetch(contract, duration, bar_size, what_to_show) for contract in contracts.values())
+            )
+        finally:
+            self.ib.RaiseRequestErrors = raise_errors
+        return dict(zip(contracts, results))
+
+def snapshot_quotes(ib, contracts, fallback=None, timeout=QUOTE_TIMEOUT):
+    '''
+    Subscribes to every {symbol: contract} at once and waits until each one has a usable
+    bid/ask or last price, or until the deadline passes. Subscriptions are cancelled afterwards.
+    Returns {symbol: price}: bid/ask midpoint, else last, else fallback[symbol], else None
+    '''
+    fallback = fallback or {}
+    tickers = {symbol: ib.reqMktData(contract, '', False, False) for symbol, contract in contracts.items()}
+
+    deadline = time.monotonic() + timeout
+    try:
+        while any(quote_price(ticker) is None for ticker in tickers.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ib.waitOnUpdate(timeout=remaining)
+    finally:
+        for contract in contracts.values():
+            ib.cancelMktData(contract)
+
+    prices = {}
+    for symbol, ticker in tickers.items():
+        price = quote_price(ticker)
+        if price is None:
+            print(f"[{symbol}] ⚠️ No live quote before deadline, falling back to signal price")
+            price = _positive(fallback.get(symbol))
+        prices[symbol] = price
+    return prices
+
+def quote_price(ticker):
+    '''
+    Bid/ask midpoint if both sides are live, else last trade, else None
+    '''
+    bid, ask, last = _positive(ticker.bid), _positive(ticker.ask), _positive(ticker.last)
+    if bid and ask:
+        return (bid + ask) / 2
+    return last
+
+def _positive(value):
+    # ib_insync reports missing ticks as NaN (or -1 for some fields)
+    if value is None or value != value or value <= 0:
+        return None
+    return value
+
+def qualify_watchlist(ib, symbols, exchange='SMART', currency='USD', cache=None):
+    '''
+    Qualifies every symbol in one concurrent round.
+    With a ContractCache, symbols cached within its TTL skip IB entirely and only the rest
+    are qualified (and written back to the cache).
+    Returns {symbol: contract} for the ones IB recognised
+    '''
+    from ib_insync import Stock
+
+    qualified = {}
+    if cache is not None:
+        for symbol in symbols:
+            contract = cache.get(symbol, exchange, currency)
+            if contract is not None:
+                qualified[symbol] = contract
+
+    contracts = {symbol: Stock(symbol, exchange, currency) for symbol in symbols if symbol not in qualified}
+    if contracts:
+        ib.qualifyContracts(*contracts.values())
+
+    unknown = [symbol for symbol, contract in contracts.items() if not contract.conId]
+    if unknown:
+        print(f"⚠️ Could not qualify: {', '.join(unknown)}")
+
+    fresh = {symbol: contract for symbol, contract in contracts.items() if contract.conId}
+    if cache is not None and fresh:
+        for symbol, contract in fresh.items():
+            cache.put(symbol, contract, exchange, currency)
+        cache.save()
+    if cache is not None:
+        print(f"📇 Contracts: {len(qualified)} cached, {len(fresh)} qualified")
+
+    qualified.update(fresh)
+    return {symbol: qualified[symbol] for symbol in symbols if symbol in qualified}
+
+def ibkr_batch_fetcher(ib, contracts, bar_size='1 day', duration=f'{LOOKBACK_DAYS} D', what_to_show='TRADES', fetcher=None):
+    '''
+    fetch_tails callable for BarStore.get_many, backed by HistoricalDataFetcher.
+    Without a fetcher it makes one with a full pacing bucket, which only suits one-shot runs
+    '''
+    fetcher = fetcher or HistoricalDataFetcher(ib)
+
+    def fetch_tails(symbols, start):
+        wanted = {symbol: contracts[symbol] for symbol in symbols}
+        span = duration if start is None else ibkr_duration_since(start)
+        results = ib.run(fetcher.fetch_many(wanted, span, bar_size, what_to_show))
+        return {symbol: pd.DataFrame(bars) for symbol, bars in results.items() if bars}
+
+    return fetch_tails
@@ -0,0 +1,49 @@
+from utils.bar_store import LOOKBACK_DAYS, normalize_bars
+
+# Batched yfinance access: one threaded request for the whole watchlist instead of one per ticker.
+
+def download_watchlist(tickers, start=None, period=f'{LOOKBACK_DAYS}d', interval='1d', auto_adjust=True):
+    '''
+    Downloads every ticker in one threaded yf.download call and splits the result
+    into the per-ticker Close/High/Low/Volume frames evaluate_signal_from_df expects.
+    Returns ({ticker: df}, [tickers that came back empty])
+    '''
+    import yfinance as yf  # Deferred: importing it costs more than a cached evaluation
+
+    window = {'period': period} if start is None else {'start': start.strftime('%Y-%m-%d')}
+    data = yf.download(
+        list(tickers),
+        interval=interval,
+        auto_adjust=auto_adjust,
+        group_by='ticker',
+        threads=True,
+        progress=False,
+        **window
+    )
+
+    frames, empty = {}, []
+    for ticker in tickers:
+        df = _split_ticker(data, ticker)
+        if df.empty:
+            empty.append(ticker)
+        else:
+            frames[ticker] = df
+
+    return frames, empty
+
+def _split_ticker(data, ticker):
+    if data is None or data.empty or ticker not in data.columns.get_level_values(0):
+        return normalize_bars(None)
+    # The combined frame spans every ticker's dates; drop the rows this ticker has no bar for
+    return normalize_bars(data[ticker].dropna(how='all'))
+
+def yfinance_batch_fetcher(interval='1d', auto_adjust=True):
+    '''
+    fetch_tails callable for BarStore.get_many
+    '''
+    def fetch_tails(symbols, start):
+        frames, empty = download_watchlist(symbols, start=start, interval=interval, auto_adjust=auto_adjust)
+        if empty:
+            print(f"⚠️ yfinance returned no data for: {', '.join(empty)}")
+        return frames
+    return fetch_tails
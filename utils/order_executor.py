@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from utils.run_metrics import NULL_TIMER
+
+# Order execution for the IBKR executors: a cycle's limit orders are all submitted first, then
+# watched together until they fill. An order still working after ORDER_TIMEOUT is repriced
+# towards the market (one step per entry of REPRICE_STEPS), and cancelled after the last step.
+# ORDER_BUDGET is one order's worst case (every step plus the cancel), which keeps the wait well
+# inside the 5-minute slot. An executor built with a smaller budget shares what is left of it
+# between an order's remaining steps instead of giving each one its full timeout.
+#
+#   orders = OrderExecutor(ib, journal=JOURNAL, timer=timer)
+#   orders.submit('VOO', contract, 'BUY', 10, 512.30, signal_time=t)
+#   orders.wait()      # blocks until every order is filled, cancelled or rejected
+#
+# The journal gets the real average fill price and filled quantity (nothing for unfilled orders).
+# Latencies from signal to acknowledgement to fill go to the timer as 'ack' / 'fill' spans, and
+# every order is appended to log_path as one JSON line.
+
+ORDER_TIMEOUT = 15                  # Seconds an order may work before it is repriced or cancelled
+REPRICE_STEPS = [0.001, 0.0025]     # Fraction of the limit moved towards the market per reprice
+CANCEL_TIMEOUT = 10                 # Seconds to wait for IB to confirm a cancel
+# Seconds a cycle's orders may take in all: the first step, one per reprice, then the cancel
+ORDER_BUDGET = CANCEL_TIMEOUT + ORDER_TIMEOUT * (len(REPRICE_STEPS) + 1)
+POLL_SECONDS = 0.25
+ACK_STATUSES = {'PreSubmitted', 'Submitted', 'Filled'}
+
+class OrderTicket:
+    def __init__(self, symbol, contract, action, quantity, limit_price, signal_time, reason):
+        self.symbol = symbol
+        self.contract = contract
+        self.action = action
+        self.quantity = quantity
+        self.limit_price = limit_price
+        self.signal_time = signal_time
+        self.reason = reason
+        self.trade = None
+        self.submitted_at = None
+        self.acknowledged = None    # time.monotonic() of the first working/filled status
+        self.last_fill = None       # time.monotonic() of the latest execution
+        self.reprices = 0
+
+    def on_status(self, trade):
+        if self.acknowledged is None and trade.orderStatus.status in ACK_STATUSES:
+            self.acknowledged = time.monotonic()
+
+    def on_fill(self, trade, fill):
+        self.last_fill = time.monotonic()
+
+    def filled(self):
+        return sum(fill.execution.shares for fill in self.trade.fills)
+
+    def avg_fill_price(self):
+        shares = self.filled()
+        if not shares:
+            return None
+        return sum(fill.execution.price * fill.execution.shares for fill in self.trade.fills) / shares
+
+    def summary(self):
+        return {
+            'submitted_at': self.submitted_at.isoformat(timespec='seconds'),
+            'symbol': self.symbol,
+            'action': self.action,
+            'quantity': self.quantity,
+            'limit_price': self.limit_price,
+            'final_limit_price': self.trade.order.lmtPrice,
+            'reprices': self.reprices,
+            'status': self.trade.orderStatus.status,
+            'filled': self.filled(),
+            'avg_fill_price': self.avg_fill_price(),
+            'ack_latency': _elapsed(self.signal_time, self.acknowledged),
+            'fill_latency': _elapsed(self.signal_time, self.last_fill),
+        }
+
+class OrderExecutor:
+    def __init__(self, ib, journal=None, timer=NULL_TIMER, log_path=None,
+                 timeout=ORDER_TIMEOUT, reprice_steps=REPRICE_STEPS, budget=ORDER_BUDGET):
+        self.ib = ib
+        self.journal = journal
+        self.timer = timer
+        self.log_path = Path(log_path) if log_path is not None else None
+        self.timeout = timeout
+        self.reprice_steps = reprice_steps
+        self.budget = budget
+        self.pending = []
+
+    def submit(self, symbol, contract, action, quantity, limit_price, signal_time=None, reason='Live Signal'):
+        '''
+        Places a limit order without waiting for IB. signal_time is the time.monotonic() of the
+        decision, the start of the latency measurements (defaults to now)
+        '''
+        from ib_insync import LimitOrder
+
+        ticket = OrderTicket(
+            symbol, contract, action, quantity, round(limit_price, 2),
+            time.monotonic() if signal_time is None else signal_time, reason
+        )
+        ticket.submitted_at = datetime.now()
+        with self.timer.span('orders', symbol):
+            ticket.trade = self.ib.placeOrder(contract, LimitOrder(action, quantity, ticket.limit_price))
+        ticket.trade.statusEvent += ticket.on_status
+        ticket.trade.fillEvent += ticket.on_fill
+        ticket.on_status(ticket.trade)
+        self.pending.append(ticket)
+        print(f"[{symbol}] 🚀 Submitted LIMIT {action} for {quantity} shares at ${ticket.limit_price:.2f}")
+        return ticket
+
+    def wait(self):
+        '''
+        Blocks until every submitted order is done. Returns the order summaries
+        '''
+        return self.ib.run(self.settle())
+
+    async def settle(self):
+        '''
+        Awaitable form of wait(), for callers already inside the event loop
+        '''
+        tickets, self.pending = self.pending, []
+        if not tickets:
+            return []
+        deadline = time.monotonic() + self.budget
+        await asyncio.gather(*(self._watch(ticket, deadline) for ticket in tickets))
+        return [self._complete(ticket) for ticket in tickets]
+
+    def _step_timeout(self, ticket, deadline):
+        # The order's remaining steps (reprices left + the final one) share what is left of the
+        # budget after the cancel confirmation, capped at the usual per-step timeout
+        steps_left = len(self.reprice_steps) - ticket.reprices + 1
+        remaining = deadline - CANCEL_TIMEOUT - time.monotonic()
+        return max(0.0, min(self.timeout, remaining / steps_left))
+
+    async def _watch(self, ticket, deadline):
+        trade = ticket.trade
+        step_deadline = time.monotonic() + self._step_timeout(ticket, deadline)
+        while not trade.isDone():
+            if time.monotonic() >= step_deadline:
+                if ticket.reprices < len(self.reprice_steps):
+                    self._reprice(ticket)
+                    step_deadline = time.monotonic() + self._step_timeout(ticket, deadline)
+                else:
+                    print(f"[{ticket.symbol}] ⌛ Order unfilled after {ticket.reprices} reprices, cancelling.")
+                    self.ib.cancelOrder(trade.order)
+                    cancel_deadline = time.monotonic() + CANCEL_TIMEOUT
+                    while not trade.isDone() and time.monotonic() < cancel_deadline:
+                        await asyncio.sleep(POLL_SECONDS)
+                    return
+            await asyncio.sleep(POLL_SECONDS)
+
+    def _reprice(self, ticket):
+        step = self.reprice_steps[ticket.reprices]
+        order = ticket.trade.order
+        direction = 1 if ticket.action == 'BUY' else -1
+        order.lmtPrice = round(order.lmtPrice * (1 + direction * step), 2)
+        self.ib.placeOrder(ticket.contract, order)  # Same orderId: modifies the working order
+        ticket.reprices += 1
+        print(f"[{ticket.symbol}] 🔁 Repriced {ticket.action} to ${order.lmtPrice:.2f} ({ticket.reprices}/{len(self.reprice_steps)})")
+
+    def _complete(self, ticket):
+        summary = ticket.summary()
+        symbol = ticket.symbol
+        if summary['ack_latency'] is not None:
+            self.timer.record('ack', summary['ack_latency'], symbol)
+        if summary['fill_latency'] is not None:
+            self.timer.record('fill', summary['fill_latency'], symbol)
+        if summary['filled']:
+            if self.journal is not None:
+                self.journal.record(symbol, ticket.action, summary['avg_fill_price'], summary['filled'], ticket.reason)
+            print(f"[{symbol}] ✅ {ticket.action} filled {summary['filled']:g}/{ticket.quantity} @ ${summary['avg_fill_price']:.2f}")
+        else:
+            print(f"[{symbol}] ❌ {ticket.action} not filled ({summary['status']})")
+
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(summary) + '\n')
+        return summary
+
+def _elapsed(start, end):
+    return None if end is None else round(end - start, 6)
@@ -0,0 +1,284 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from utils.bar_store import BarStore
+from utils.portfolio_io import read_positions
+from utils.trade_journal import JOURNAL_DIR, TRADE_FIELDS, read_trades
+
+# Realized / unrealized P&L, exposure and drawdown per executor, built from the trade journal.
+# refresh_analytics() only folds in trades added since the last checkpoint (average-cost book per
+# executor and ticker), then rebuilds the small aggregate tables the dashboard reads:
+#
+#   logs/analytics/checkpoint.json   per-executor journal position + open book
+#   logs/analytics/ledger.parquet    every trade with its realized P&L and the book after it
+#   logs/analytics/daily.parquet     daily realized / unrealized / exposure / drawdown per executor
+#   logs/analytics/positions.parquet open positions marked at the latest cached close
+#   logs/analytics/summary.parquet   one row per executor
+
+ANALYTICS_DIR = Path('logs') / 'analytics'
+CHECKPOINT_FILE = 'checkpoint.json'
+LEDGER_FILE = 'ledger.parquet'
+DAILY_FILE = 'daily.parquet'
+POSITIONS_FILE = 'positions.parquet'
+SUMMARY_FILE = 'summary.parquet'
+
+# Trades written before the journal existed, only read the first time an executor shows up
+LEGACY_LOGS = {
+    'simulation': 'logs/trades_live.csv',
+    'prod_ibkr': 'logs/trades_live_PROD_ibkr.csv',
+    'shadow': 'logs/trades_shadow.csv',
+    'shadow_ibkr': 'logs/trades_shadow_ibkr.csv',
+}
+# Cached daily bars used as marks, first one found wins (unadjusted before adjusted)
+MARK_SOURCES = [('ibkr', '1 day'), ('yfinance', '1d'), ('yfinance_adj', '1d')]
+LEDGER_FIELDS = ['executor'] + TRADE_FIELDS + ['realized_pnl', 'shares_after', 'cost_after']
+
+# === Checkpointed trade fold ===
+
+def load_checkpoint(out_dir=ANALYTICS_DIR):
+    path = Path(out_dir) / CHECKPOINT_FILE
+    if not path.exists():
+        return {'executors': {}, 'book': {}, 'ledger_rows': 0}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(checkpoint, out_dir=ANALYTICS_DIR):
+    path = Path(out_dir) / CHECKPOINT_FILE
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+def new_trades(executor, mark, journal_dir=JOURNAL_DIR):
+    '''
+    Journal trades for executor after the checkpoint mark {'last_date', 'at_last_date'}.
+    Each executor's journal is written by one process in time order, so a per-executor
+    (timestamp, rows seen at that timestamp) pair is enough to resume from.
+    '''
+    if mark is None:
+        trades = read_trades(journal_dir, executors=[executor])
+        return pd.concat([legacy_trades(executor, before=_first_date(trades)), trades], ignore_index=True)
+
+    last_date = pd.Timestamp(mark['last_date'])
+    trades = read_trades(journal_dir, executors=[executor], start=last_date.strftime('%Y-%m-%d'))
+    trades = trades[trades['date'] >= last_date]
+    at_last = int((trades['date'] == last_date).sum())
+    skip = min(mark['at_last_date'], at_last)
+    # Rows at last_date come first after the stable sort; drop the ones already folded in
+    return trades.iloc[skip:].reset_index(drop=True)
+
+def _first_date(trades):
+    return None if trades.empty else trades['date'].iloc[0]
+
+def legacy_trades(executor, before=None):
+    path = LEGACY_LOGS.get(executor)
+    if path is None or not os.path.isfile(path):
+        return pd.DataFrame(columns=TRADE_FIELDS + ['executor'])
+    df = pd.read_csv(path).reindex(columns=TRADE_FIELDS)  # Shadow CSVs have no shares column
+    df['date'] = pd.to_datetime(df['date'])
+    if before is not None:
+        df = df[df['date'] < before]
+    return df.assign(executor=executor).sort_values('date', kind='stable').reset_index(drop=True)
+
+def fold_trades(trades, book):
+    '''
+    Applies trades to the average-cost book {'executor|ticker': [shares, cost_basis]} in place.
+    Returns the ledger rows (realized P&L per trade plus the book after it)
+    '''
+    rows = []
+    for trade in trades.itertuples(index=False):
+        key = f"{trade.executor}|{trade.ticker}"
+        shares, cost = book.get(key, (0.0, 0.0))
+        qty = 0.0 if pd.isna(trade.shares) else float(trade.shares)
+        realized = 0.0
+
+        if trade.action == 'BUY':
+            shares += qty
+            cost += qty * trade.price
+        elif trade.action == 'SELL' and shares > 0:
+            # Shadow SELLs carry the account's holding, which can differ from the journal's book
+            qty = min(qty, shares)
+            avg_cost = cost / shares
+            realized = qty * (trade.price - avg_cost)
+            cost -= qty * avg_cost
+            shares -= qty
+
+        book[key] = [shares, cost if shares > 0 else 0.0]
+        rows.append((trade.executor, trade.date, trade.ticker, trade.action, trade.price, trade.shares,
+                     trade.reason, realized, shares, book[key][1]))
+
+    return pd.DataFrame(rows, columns=LEDGER_FIELDS)
+
+# === Aggregates ===
+
+def load_marks(tickers, store=None):
+    '''
+    Cached daily closes for tickers as a (date x ticker) frame; no network access
+    '''
+    store = store or BarStore()
+    closes = {}
+    for ticker in tickers:
+        for source, bar_size in MARK_SOURCES:
+            bars = store.load(source, ticker, bar_size)
+            if bars is not None and not bars.empty:
+                closes[ticker] = bars['Close']
+                break
+    if not closes:
+        return pd.DataFrame(columns=list(tickers), dtype=float)
+    marks = pd.DataFrame(closes)
+    marks.index = pd.DatetimeIndex(marks.index).tz_localize(None).normalize()
+    return marks[~marks.index.duplicated(keep='last')]
+
+def daily_curve(ledger, marks):
+    '''
+    Daily realized / unrealized / exposure / drawdown for one executor's ledger, computed on
+    (days x tickers) frames. Tickers without cached bars are marked at their last trade price.
+    '''
+    day = ledger['date'].dt.normalize()
+    end_of_day = ledger.groupby([day, 'ticker']).last()
+    days = pd.date_range(day.min(), max(day.max(), marks.index.max() if not marks.empty else day.max()))
+
+    shares = end_of_day['shares_after'].unstack().reindex(days).ffill().fillna(0.0)
+    cost = end_of_day['cost_after'].unstack().reindex(days).ffill().fillna(0.0)
+    trade_prices = end_of_day['price'].unstack().reindex(days).ffill()
+    closes = marks.reindex(columns=shares.columns)
+    closes = closes.reindex(closes.index.union(days)).ffill().reindex(days)
+    prices = closes.combine_first(trade_prices)
+
+    market_value = shares * prices
+    realized = ledger.groupby(day)['realized_pnl'].sum().reindex(days, fill_value=0.0).cumsum()
+    unrealized = (market_value - cost).where(shares > 0, 0.0).sum(axis=1)
+    pnl = realized + unrealized
+
+    return pd.DataFrame({
+        'realized_pnl': realized,
+        'unrealized_pnl': unrealized,
+        'total_pnl': pnl,
+        'exposure': market_value.sum(axis=1),
+        'drawdown': pnl - pnl.cummax(),
+    }, index=pd.Index(days, name='date'))
+
+def open_positions(book, marks, ledger):
+    last_prices = ledger.groupby(['executor', 'ticker'])['price'].last()
+    rows = []
+    for key, (shares, cost) in book.items():
+        if shares <= 0:
+            continue
+        executor, ticker = key.split('|', 1)
+        if ticker in marks and marks[ticker].notna().any():
+            mark = marks[ticker].dropna().iloc[-1]
+        else:
+            mark = last_prices[(executor, ticker)]
+        rows.append({
+            'executor': executor,
+            'ticker': ticker,
+            'shares': shares,
+            'avg_cost': cost / shares,
+            'mark': mark,
+            'market_value': shares * mark,
+            'unrealized_pnl': shares * mark - cost,
+        })
+    positions = pd.DataFrame(rows, columns=['executor', 'ticker', 'shares', 'avg_cost', 'mark', 'market_value', 'unrealized_pnl'])
+
+    # The simulator's position store is authoritative for its own book
+    try:
+        book_shares = {ticker: data['shares'] for ticker, data in read_positions().items()}
+    except Exception:
+        book_shares = {}
+    simulated = positions['executor'] == 'simulation'
+    positions['book_shares'] = positions['ticker'].map(book_shares).where(simulated)
+    return positions
+
+def summarize(ledger, daily):
+    rows = []
+    for executor, curve in daily.groupby('executor'):
+        trades = ledger[ledger['executor'] == executor]
+        last = curve.iloc[-1]
+        rows.append({
+            'executor': executor,
+            'as_of': curve['date'].iloc[-1],
+            'trades': len(trades),
+            'realized_pnl': last['realized_pnl'],
+            'unrealized_pnl': last['unrealized_pnl'],
+            'total_pnl': last['total_pnl'],
+            'exposure': last['exposure'],
+            'max_drawdown': curve['drawdown'].min(),
+        })
+    return pd.DataFrame(rows)
+
+# === Refresh ===
+
+def refresh_analytics(journal_dir=JOURNAL_DIR, out_dir=ANALYTICS_DIR, executors=None, store=None):
+    '''
+    Folds in journal trades added since the last checkpoint and rewrites the aggregate tables.
+    Returns the summary DataFrame
+    '''
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = load_checkpoint(out_dir)
+    ledger_path = out_dir / LEDGER_FILE
+    ledger = pd.read_parquet(ledger_path) if ledger_path.exists() else pd.DataFrame(columns=LEDGER_FIELDS)
+    # Rows past the checkpoint come from a refresh that died before checkpointing; they get re-folded
+    ledger = ledger.iloc[:checkpoint['ledger_rows']]
+
+    journal_executors = [path.name.split('=', 1)[1] for path in Path(journal_dir).glob('executor=*')]
+    executors = executors or sorted(set(journal_executors) | set(checkpoint['executors']) |
+                                    {name for name, path in LEGACY_LOGS.items() if os.path.isfile(path)})
+
+    added = []
+    for executor in executors:
+        trades = new_trades(executor, checkpoint['executors'].get(executor), journal_dir)
+        if trades.empty:
+            continue
+        added.append(fold_trades(trades, checkpoint['book']))
+        last_date = trades['date'].iloc[-1]
+        already = checkpoint['executors'].get(executor)
+        carried = already['at_last_date'] if already and pd.Timestamp(already['last_date']) == last_date else 0
+        checkpoint['executors'][executor] = {
+            'last_date': last_date.isoformat(),
+            'at_last_date': carried + int((trades['date'] == last_date).sum()),
+        }
+
+    if added:
+        ledger = pd.concat([ledger] + added, ignore_index=True) if not ledger.empty else pd.concat(added, ignore_index=True)
+        tmp_path = ledger_path.with_suffix('.parquet.tmp')
+        ledger.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, ledger_path)
+    print(f"📊 Folded {sum(len(rows) for rows in added)} new trades into the analytics ledger")
+
+    marks = load_marks(sorted(ledger['ticker'].unique()), store)
+    curves = [
+        daily_curve(rows, marks).reset_index().assign(executor=executor)
+        for executor, rows in ledger.groupby('executor')
+    ]
+    daily = pd.concat(curves, ignore_index=True) if curves else pd.DataFrame(
+        columns=['date', 'realized_pnl', 'unrealized_pnl', 'total_pnl', 'exposure', 'drawdown', 'executor'])
+    summary = summarize(ledger, daily)
+
+    daily.to_parquet(out_dir / DAILY_FILE, index=False)
+    open_positions(checkpoint['book'], marks, ledger).to_parquet(out_dir / POSITIONS_FILE, index=False)
+    summary.to_parquet(out_dir / SUMMARY_FILE, index=False)
+
+    checkpoint['ledger_rows'] = len(ledger)
+    checkpoint['refreshed_at'] = datetime.now().isoformat(timespec='seconds')
+    save_checkpoint(checkpoint, out_dir)  # Last, so a crash above just redoes this refresh
+    return summary
+
+def load_analytics(out_dir=ANALYTICS_DIR):
+    '''
+    The precomputed tables: {'summary', 'daily', 'positions', 'ledger'} DataFrames (empty if never refreshed)
+    '''
+    out_dir = Path(out_dir)
+    tables = {}
+    for name, file in [('summary', SUMMARY_FILE), ('daily', DAILY_FILE), ('positions', POSITIONS_FILE), ('ledger', LEDGER_FILE)]:
+        path = out_dir / file
+        tables[name] = pd.read_parquet(path) if path.exists() else pd.DataFrame()
+    return tables
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    print(refresh_analytics().to_string(index=False))
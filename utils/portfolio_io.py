@@ -1,56 +1,41 @@
-import csv
-import os
-from datetime import datetime
+from utils.position_store import POSITIONS_BACKEND, POSITIONS_CSV_PATH, get_position_store
+from utils.trade_journal import TradeJournal
 
 # Define file paths and initial capital for simulated trading
 
-POSITIONS_PATH = 'logs/positions_live.csv'
+POSITIONS_PATH = POSITIONS_CSV_PATH  # Legacy CSV book; imported into the SQLite store on first use
 TRADES_PATH = 'logs/trades_live.csv'
 INITIAL_CAPITAL = 10000  # Starting simulated capital
+TRADE_JOURNAL = TradeJournal('simulation', TRADES_PATH)
 
-def read_positions():
+def read_positions(backend=POSITIONS_BACKEND):
     '''
-    Reads the current portfolio from the positions in the CSV File
+    Reads the current portfolio from the position store (SQLite by default, see utils/position_store.py)
     Returns a dict of {ticker: {'shares': x, 'avg_price': y}}
     '''
-    
-    positions = {}
-    
-    with open(POSITIONS_PATH, "r") as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            ticker = row["ticker"]
-            shares = float(row["shares"])
-            avg_price = float(row["avg_price"])
-            positions[ticker] = {"shares": shares, "avg_price": avg_price}
-    
-    return positions
+    return get_position_store(backend).read_all()
 
-def write_positions(positions):
+def read_position(ticker, backend=POSITIONS_BACKEND):
     '''
-    Writes the updated portfolio back to the positions CSV File.
-    Overwrites the entire file with th enew values
-    ''' 
-    with open(POSITIONS_PATH, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["ticker", "shares", "avg_price"])
-        writer.writeheader()
-        for ticker, data in positions.items():
-            writer.writerow({"ticker": ticker, "shares": data["shares"], "avg_price": data["avg_price"]})
+    Single-ticker lookup, without loading the whole book
+    Returns {'shares': x, 'avg_price': y} or None
+    '''
+    return get_position_store(backend).get(ticker)
+
+def write_positions(positions, backend=POSITIONS_BACKEND):
+    '''
+    Writes the updated portfolio back to the position store.
+    All rows commit together; only tickers whose values changed are rewritten
+    '''
+    get_position_store(backend).write_all(positions)
 
 def log_trade(ticker, action, price, shares, reason):
     '''
-    Appends a trade event (buy or sell) to the trades log file
-    If the file doesn't exist, it creates headers
+    Buffers a trade event (buy or sell) in the simulator's trade journal
+    Call TRADE_JOURNAL.close() at the end of the run to write them out
     '''
-    
-    file_exists = os.path.isfile(TRADES_PATH)
-    with open(TRADES_PATH, "a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["date", "ticker", "action", "price", "shares", "reason"])
-        writer.writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ticker, action, price, shares, reason])
-        
+    TRADE_JOURNAL.record(ticker, action, price, shares, reason)
+
 def calculate_portfolio_value(positions, prices):
     '''
     Calculates the total value of all held positions using current prices
@@ -0,0 +1,159 @@
+import math
+
+import numpy as np
+
+# Portfolio accounting and position sizing on arrays indexed by ticker, so a cycle sizes every
+# signal in one step instead of re-walking the positions dict per decision.
+#
+#   state = PortfolioState.from_positions(read_positions(), WATCHLIST)
+#   state.mark(prices)
+#   action, quantity, cash = allocate_from_cash(buy, sell, state.last_price, state.shares, cash)
+#   state.apply(action, quantity, state.last_price)
+#
+# Two sizing rules, one per caller:
+#   allocate_from_cash  simulator / backtest / robustness paths: a buy spends position_pct of the
+#                       cash left at that point (whole shares), a sell exits in full, in ticker order
+#   size_orders         live executors: position_pct of account value per trade, skipped when the
+#                       position already exceeds max_position_pct
+
+HOLD, BUY, SELL = 0, 1, -1
+POSITION_PCT = 0.2
+MAX_POSITION_PCT = 0.4
+
+class PortfolioState:
+    '''
+    shares, avg_price and last_price per ticker, in the order of tickers
+    '''
+    def __init__(self, tickers, shares=None, avg_price=None, last_price=None):
+        self.tickers = list(tickers)
+        n = len(self.tickers)
+        self.shares = np.zeros(n) if shares is None else np.asarray(shares, dtype=float)
+        self.avg_price = np.zeros(n) if avg_price is None else np.asarray(avg_price, dtype=float)
+        self.last_price = np.full(n, np.nan) if last_price is None else np.asarray(last_price, dtype=float)
+        self.booked = set(self.tickers)  # Tickers to_positions writes back even when flat
+
+    @classmethod
+    def from_positions(cls, positions, tickers=()):
+        '''
+        From a {ticker: {'shares', 'avg_price'}} book (utils.portfolio_io.read_positions).
+        tickers come first, in order, then any other ticker in the book
+        '''
+        order = list(dict.fromkeys([*tickers, *positions]))
+        book = [positions.get(ticker, {'shares': 0, 'avg_price': 0}) for ticker in order]
+        state = cls(order, [p['shares'] for p in book], [p['avg_price'] for p in book])
+        state.booked = set(positions)
+        return state
+
+    def to_positions(self):
+        '''
+        Back to a {ticker: {'shares', 'avg_price'}} book: every ticker that was in the book it came
+        from, plus any opened since
+        '''
+        return {
+            ticker: {'shares': float(self.shares[i]), 'avg_price': float(self.avg_price[i])}
+            for i, ticker in enumerate(self.tickers)
+            if ticker in self.booked or self.shares[i] > 0
+        }
+
+    def vector(self, values, fill=0.0):
+        '''
+        {ticker: value} as an array in ticker order, fill for tickers not in values
+        '''
+        return np.array([values.get(ticker, fill) for ticker in self.tickers])
+
+    def mark(self, prices):
+        '''
+        Sets last_price from {ticker: price}; tickers not in prices keep theirs
+        '''
+        known = np.array([ticker in prices for ticker in self.tickers], dtype=bool)
+        self.last_price = np.where(known, self.vector(prices, np.nan), self.last_price)
+
+    def market_value(self):
+        # Unpriced tickers count as 0, like prices.get(ticker, 0)
+        return float(np.nansum(self.shares * self.last_price))
+
+    def apply(self, action, quantity, prices):
+        '''
+        Books a cycle's orders: buys add shares at prices (averaging in), sells remove them
+        '''
+        buying, selling = action == BUY, action == SELL
+        new_shares = self.shares + np.where(buying, quantity, 0) - np.where(selling, quantity, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averaged = np.where(self.shares > 0, (self.shares * self.avg_price + quantity * prices) / new_shares, prices)
+        self.avg_price = np.where(buying, averaged, np.where(new_shares > 0, self.avg_price, 0.0))
+        self.shares = new_shares
+
+def allocate_from_cash(buy, sell, prices, shares, cash, position_pct=POSITION_PCT):
+    '''
+    Simulator sizing for one cycle. A held ticker with a sell signal exits in full; a flat ticker
+    with a buy signal spends position_pct of the cash available at that point on whole shares.
+    Orders apply in ticker order, so an earlier sale funds later buys. The masks are computed for
+    every ticker at once; only the tickers that act are walked, each in O(1).
+    Arrays are (tickers,) with a float cash, or (paths, tickers) with cash per path for many
+    independent portfolios at once, each ticker step then vectorized across paths.
+    Returns (action, quantity, cash left)
+    '''
+    prices = np.asarray(prices, dtype=float)
+    shares = np.asarray(shares, dtype=float)
+    held = shares > 0
+    acting = (np.asarray(buy, dtype=bool) & ~held) | (np.asarray(sell, dtype=bool) & held)
+    if prices.ndim > 1:
+        return _allocate_paths(acting, held, prices, shares, np.asarray(cash, dtype=float), position_pct)
+
+    action = np.full(len(prices), HOLD)
+    quantity = np.zeros(len(prices))
+    for j in np.flatnonzero(acting).tolist():
+        price = float(prices[j])
+        if held[j]:
+            cash += float(shares[j]) * price
+            action[j], quantity[j] = SELL, shares[j]
+        else:
+            shares_to_buy = math.floor(cash * position_pct / price)
+            if shares_to_buy > 0:
+                cash -= shares_to_buy * price
+                action[j], quantity[j] = BUY, shares_to_buy
+    return action, quantity, cash
+
+def _allocate_paths(acting, held, prices, shares, cash, position_pct):
+    action = np.full(prices.shape, HOLD)
+    quantity = np.zeros(prices.shape)
+    for j in np.flatnonzero(acting.any(axis=0)):
+        price = prices[:, j]
+        selling = acting[:, j] & held[:, j]
+        buying = acting[:, j] & ~held[:, j]
+        shares_to_buy = 0.0
+        if selling.any():
+            cash = cash + np.where(selling, shares[:, j] * price, 0.0)
+        if buying.any():
+            with np.errstate(invalid='ignore'):
+                shares_to_buy = np.floor(cash * position_pct / price)
+            buying &= shares_to_buy > 0
+            cash = cash - np.where(buying, shares_to_buy * price, 0.0)
+        action[:, j] = buying.astype(int) - selling  # BUY 1, SELL -1; the two never overlap
+        quantity[:, j] = np.where(selling, shares[:, j], np.where(buying, shares_to_buy, 0.0))
+    return action, quantity, cash
+
+def size_orders(buy, sell, prices, shares, capital, position_pct=POSITION_PCT, max_position_pct=MAX_POSITION_PCT):
+    '''
+    Live-executor sizing for every symbol at once: position_pct of capital (account value) per
+    trade in whole shares, sells exit the full holding.
+    Returns {'action', 'quantity', 'skip'}; skip says why a signal was dropped:
+    'no_price', 'too_large' (position already over max_position_pct of capital), 'too_small'
+    (under one share) or 'not_held' (sell without a position); '' otherwise
+    '''
+    buy, sell = np.asarray(buy, dtype=bool), np.asarray(sell, dtype=bool)
+    prices = np.asarray(prices, dtype=float)
+    shares = np.asarray(shares, dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        no_price = ~(prices > 0)
+        too_large = ~no_price & (shares * prices / capital > max_position_pct)
+        to_trade = np.where(no_price, 0.0, np.floor(capital * position_pct / prices))
+    too_small = ~no_price & ~too_large & (to_trade == 0)
+    tradable = ~(no_price | too_large | too_small)
+    not_held = tradable & ~buy & sell & ~(shares > 0)
+
+    action = np.select([tradable & buy, tradable & sell & ~not_held], [BUY, SELL], HOLD)
+    quantity = np.select([action == BUY, action == SELL], [to_trade, shares], 0.0)
+    skip = np.select([no_price, too_large, too_small, not_held], ['no_price', 'too_large', 'too_small', 'not_held'], '')
+    return {'action': action, 'quantity': quantity, 'skip': skip}
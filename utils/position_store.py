@@ -0,0 +1,152 @@
+import csv
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Position storage behind utils/portfolio_io's read_positions / write_positions.
+# The default backend is a SQLite database in WAL mode: one row per ticker, keyed lookups,
+# and every multi-row update commits atomically, so a crash leaves either the old book or the new one.
+# The CSV backend keeps the original file layout (written through a temp file) for anyone still
+# reading logs/positions_live.csv directly.
+
+POSITIONS_DB_PATH = 'logs/positions_live.db'
+POSITIONS_CSV_PATH = 'logs/positions_live.csv'
+POSITIONS_BACKEND = 'sqlite'  # 'sqlite' or 'csv'
+POSITION_FIELDS = ['ticker', 'shares', 'avg_price']
+
+class SQLitePositionStore:
+    def __init__(self, path=POSITIONS_DB_PATH, legacy_csv_path=POSITIONS_CSV_PATH):
+        self.path = Path(path)
+        self.legacy_csv_path = legacy_csv_path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not self.path.exists()
+            # isolation_level=None: transactions are opened explicitly in transaction()
+            self._conn = sqlite3.connect(self.path, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS positions ('
+                'ticker TEXT PRIMARY KEY, shares REAL NOT NULL, avg_price REAL NOT NULL, updated_at TEXT NOT NULL)'
+            )
+            if is_new and self.legacy_csv_path and os.path.isfile(self.legacy_csv_path):
+                self._import_csv(self.legacy_csv_path)
+        return self._conn
+
+    def _import_csv(self, csv_path):
+        positions = CSVPositionStore(csv_path).read_all()
+        with self.transaction() as cur:
+            self._upsert_many(cur, positions)
+        print(f"📦 Imported {len(positions)} positions from {csv_path} into {self.path}")
+
+    @contextmanager
+    def transaction(self):
+        '''
+        Everything written through the yielded cursor commits together, or not at all
+        '''
+        cur = self.conn.cursor()
+        cur.execute('BEGIN IMMEDIATE')
+        try:
+            yield cur
+        except BaseException:
+            cur.execute('ROLLBACK')
+            raise
+        cur.execute('COMMIT')
+
+    def _upsert_many(self, cur, positions):
+        now = datetime.now().isoformat(timespec='seconds')
+        cur.executemany(
+            'INSERT INTO positions (ticker, shares, avg_price, updated_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(ticker) DO UPDATE SET shares=excluded.shares, avg_price=excluded.avg_price, updated_at=excluded.updated_at',
+            [(ticker, float(data['shares']), float(data['avg_price']), now) for ticker, data in positions.items()]
+        )
+
+    def read_all(self):
+        rows = self.conn.execute('SELECT ticker, shares, avg_price FROM positions ORDER BY rowid')
+        return {ticker: {'shares': shares, 'avg_price': avg_price} for ticker, shares, avg_price in rows}
+
+    def get(self, ticker):
+        row = self.conn.execute('SELECT shares, avg_price FROM positions WHERE ticker = ?', (ticker,)).fetchone()
+        return None if row is None else {'shares': row[0], 'avg_price': row[1]}
+
+    def upsert(self, ticker, shares, avg_price):
+        with self.transaction() as cur:
+            self._upsert_many(cur, {ticker: {'shares': shares, 'avg_price': avg_price}})
+
+    def write_all(self, positions):
+        '''
+        Makes the stored book equal to positions in one transaction.
+        Only tickers whose values changed are written; tickers missing from positions are removed.
+        '''
+        with self.transaction() as cur:
+            current = {
+                ticker: (shares, avg_price)
+                for ticker, shares, avg_price in cur.execute('SELECT ticker, shares, avg_price FROM positions')
+            }
+            changed = {
+                ticker: data for ticker, data in positions.items()
+                if current.get(ticker) != (float(data['shares']), float(data['avg_price']))
+            }
+            removed = [(ticker,) for ticker in current if ticker not in positions]
+
+            if changed:
+                self._upsert_many(cur, changed)
+            if removed:
+                cur.executemany('DELETE FROM positions WHERE ticker = ?', removed)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class CSVPositionStore:
+    def __init__(self, path=POSITIONS_CSV_PATH):
+        self.path = path
+
+    def read_all(self):
+        positions = {}
+        with open(self.path, 'r') as f:
+            for row in csv.DictReader(f):
+                positions[row['ticker']] = {'shares': float(row['shares']), 'avg_price': float(row['avg_price'])}
+        return positions
+
+    def get(self, ticker):
+        return self.read_all().get(ticker)
+
+    def upsert(self, ticker, shares, avg_price):
+        positions = self.read_all() if os.path.isfile(self.path) else {}
+        positions[ticker] = {'shares': shares, 'avg_price': avg_price}
+        self.write_all(positions)
+
+    def write_all(self, positions):
+        # Written through a temp file so a crash mid-write never truncates the book
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=POSITION_FIELDS)
+            writer.writeheader()
+            for ticker, data in positions.items():
+                writer.writerow({'ticker': ticker, 'shares': data['shares'], 'avg_price': data['avg_price']})
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+BACKENDS = {
+    'sqlite': SQLitePositionStore,
+    'csv': CSVPositionStore,
+}
+
+_STORES = {}
+
+def get_position_store(backend=POSITIONS_BACKEND):
+    '''
+    One store per backend per process, so the SQLite connection is reused across calls
+    '''
+    if backend not in _STORES:
+        _STORES[backend] = BACKENDS[backend]()
+    return _STORES[backend]
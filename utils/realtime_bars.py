@@ -0,0 +1,69 @@
+import math
+
+# Folds IBKR real-time bars (reqRealTimeBars only delivers 5-second bars) into bars of the
+# strategy's bar size, aligned to the clock (a 5-minute bar covers 09:30:00-09:35:00).
+#
+#   aggregator = BarAggregator(300)
+#   for bar in aggregator.add(rt_bar.time, rt_bar.open_, rt_bar.high, rt_bar.low, rt_bar.close, rt_bar.volume):
+#       ...  # bar is a finished 5-minute bar
+#
+# A bucket is emitted as soon as the 5-second bar that ends on its boundary arrives, so a decision
+# never waits for the next bucket's first tick.
+
+REALTIME_BAR_SECONDS = 5
+BAR_SIZE_UNITS = {'sec': 1, 'secs': 1, 'min': 60, 'mins': 60, 'hour': 3600, 'hours': 3600}
+
+def bar_size_seconds(bar_size):
+    '''
+    Seconds in an intraday IB barSizeSetting, e.g. '5 mins' -> 300
+    '''
+    count, unit = bar_size.split()
+    if unit not in BAR_SIZE_UNITS:
+        raise ValueError(f"Unsupported intraday bar size {bar_size!r}")
+    return int(count) * BAR_SIZE_UNITS[unit]
+
+class BarAggregator:
+    def __init__(self, bar_seconds, source_seconds=REALTIME_BAR_SECONDS):
+        if bar_seconds % source_seconds:
+            raise ValueError(f"bar_seconds ({bar_seconds}) must be a multiple of {source_seconds}")
+        self.bar_seconds = bar_seconds
+        self.source_seconds = source_seconds
+        self.current = None  # The bucket being built: {'start', 'Open', 'High', 'Low', 'Close', 'Volume'}
+
+    def bucket_start(self, timestamp):
+        return math.floor(timestamp / self.bar_seconds) * self.bar_seconds
+
+    def seed(self, start, open_, high, low, close, volume):
+        '''
+        Starts the current bucket from a partial bar (e.g. the newest historical bar), so the first
+        bucket after subscribing is not missing the part that traded before the subscription
+        '''
+        self.current = {'start': start, 'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}
+
+    def add(self, time, open_, high, low, close, volume):
+        '''
+        Adds one source bar starting at time (datetime or Unix seconds).
+        Returns the list of finished bars (usually empty, at most two when a boundary bar was missed)
+        '''
+        timestamp = time.timestamp() if hasattr(time, 'timestamp') else float(time)
+        start = self.bucket_start(timestamp)
+        finished = []
+
+        if self.current is not None and self.current['start'] != start:
+            # The boundary bar never came (gap or halt): close the old bucket with what it has
+            if self.current['start'] < start:
+                finished.append(self.current)
+            self.current = None
+
+        if self.current is None:
+            self.seed(start, open_, high, low, close, volume)
+        else:
+            self.current['High'] = max(self.current['High'], high)
+            self.current['Low'] = min(self.current['Low'], low)
+            self.current['Close'] = close
+            self.current['Volume'] += volume
+
+        if timestamp + self.source_seconds >= start + self.bar_seconds:
+            finished.append(self.current)
+            self.current = None
+        return finished
@@ -0,0 +1,171 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+# Per-phase timing for executor runs.
+#
+#   timer = RunTimer('prod_ibkr')
+#   with timer.span('history'):
+#       ...
+#   with timer.span('evaluate', symbol):
+#       ...
+#   timer.finish()
+#
+# finish() appends one JSON line per run to logs/metrics/runs.jsonl (phase totals + every span)
+# and rewrites logs/metrics/quant_<executor>.prom for node_exporter's textfile collector, with
+# latency histograms that accumulate across runs. A disabled timer hands out one shared no-op
+# context manager, so instrumented code costs a method call per span.
+
+METRICS_DIR = Path('logs') / 'metrics'
+METRICS_ENABLED = True
+RUNS_FILE = 'runs.jsonl'
+HISTOGRAM_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]
+METRIC_PREFIX = 'quant_executor'
+
+_NULL_SPAN = nullcontext()
+
+class _Span:
+    __slots__ = ('timer', 'phase', 'symbol', 'started')
+
+    def __init__(self, timer, phase, symbol):
+        self.timer = timer
+        self.phase = phase
+        self.symbol = symbol
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.phase, time.perf_counter() - self.started, self.symbol)
+        return False
+
+class RunTimer:
+    def __init__(self, executor, enabled=METRICS_ENABLED, metrics_dir=METRICS_DIR):
+        self.executor = executor
+        self.enabled = enabled
+        self.metrics_dir = Path(metrics_dir)
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def span(self, phase, symbol=None):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, phase, symbol)
+
+    def timed(self, phase):
+        '''
+        Decorator form of span() for whole functions
+        '''
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(phase):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, phase, seconds, symbol=None):
+        if self.enabled:
+            self.spans.append({'phase': phase, 'symbol': symbol, 'seconds': round(seconds, 6)})
+
+    def phase_totals(self):
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span['phase'], {'seconds': 0.0, 'count': 0})
+            total['seconds'] += span['seconds']
+            total['count'] += 1
+        return {phase: {'seconds': round(t['seconds'], 6), 'count': t['count']} for phase, t in totals.items()}
+
+    def finish(self, status='ok'):
+        '''
+        Writes the run's JSON line and refreshes the Prometheus textfile. Returns the run record
+        '''
+        if not self.enabled:
+            return None
+        duration = time.perf_counter() - self.started
+        record = {
+            'executor': self.executor,
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'duration_seconds': round(duration, 6),
+            'status': status,
+            'phases': self.phase_totals(),
+            'spans': self.spans,
+        }
+
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_dir / RUNS_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self._export_prometheus(duration, status)
+
+        slowest = sorted(record['phases'].items(), key=lambda item: -item[1]['seconds'])[:3]
+        print(f"⏱ Run took {duration:.1f}s — " + ', '.join(f"{phase} {t['seconds']:.1f}s" for phase, t in slowest))
+        return record
+
+    # === Prometheus textfile ===
+
+    def _export_prometheus(self, duration, status):
+        state_path = self.metrics_dir / f"{self.executor}_histograms.json"
+        state = {}
+        if state_path.exists():
+            with open(state_path) as f:
+                state = json.load(f)
+
+        _observe(state, 'run', duration)
+        for span in self.spans:
+            _observe(state, span['phase'], span['seconds'])
+        _write_atomic(state_path, json.dumps(state))
+
+        labels = f'executor="{self.executor}"'
+        lines = [
+            f"# HELP {METRIC_PREFIX}_run_duration_seconds Wall time of a whole executor run",
+            f"# TYPE {METRIC_PREFIX}_run_duration_seconds histogram",
+            *_histogram_lines(f"{METRIC_PREFIX}_run_duration_seconds", labels, state['run']),
+            f"# HELP {METRIC_PREFIX}_phase_duration_seconds Time spent per phase span (one observation per span)",
+            f"# TYPE {METRIC_PREFIX}_phase_duration_seconds histogram",
+        ]
+        for phase in sorted(phase for phase in state if phase != 'run'):
+            lines += _histogram_lines(f"{METRIC_PREFIX}_phase_duration_seconds", f'{labels},phase="{phase}"', state[phase])
+        lines += [
+            f"# HELP {METRIC_PREFIX}_last_run_timestamp_seconds Unix time the last run finished",
+            f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge",
+            f"{METRIC_PREFIX}_last_run_timestamp_seconds{{{labels}}} {time.time():.3f}",
+            f"# HELP {METRIC_PREFIX}_last_run_success 1 if the last run finished without error",
+            f"# TYPE {METRIC_PREFIX}_last_run_success gauge",
+            f"{METRIC_PREFIX}_last_run_success{{{labels}}} {1 if status == 'ok' else 0}",
+        ]
+        _write_atomic(self.metrics_dir / f"quant_{self.executor}.prom", '\n'.join(lines) + '\n')
+
+def _observe(state, name, seconds):
+    histogram = state.setdefault(name, {'buckets': [0] * len(HISTOGRAM_BUCKETS), 'sum': 0.0, 'count': 0})
+    for i, bound in enumerate(HISTOGRAM_BUCKETS):
+        if seconds <= bound:
+            histogram['buckets'][i] += 1
+    histogram['sum'] += seconds
+    histogram['count'] += 1
+
+def _histogram_lines(metric, labels, histogram):
+    lines = [
+        f'{metric}_bucket{{{labels},le="{bound}"}} {count}'
+        for bound, count in zip(HISTOGRAM_BUCKETS, histogram['buckets'])
+    ]
+    lines += [
+        f'{metric}_bucket{{{labels},le="+Inf"}} {histogram["count"]}',
+        f"{metric}_sum{{{labels}}} {histogram['sum']:.6f}",
+        f"{metric}_count{{{labels}}} {histogram['count']}",
+    ]
+    return lines
+
+def _write_atomic(path, text):
+    # The textfile collector may read at any moment; never let it see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+NULL_TIMER = RunTimer('disabled', enabled=False)
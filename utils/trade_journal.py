@@ -0,0 +1,145 @@
+import csv
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# One trade journal for the simulator and every executor.
+# Trades are buffered during a run and written in bulk: appended to the executor's CSV (same
+# columns as before) and to a date-partitioned Parquet dataset with one schema for everyone:
+#
+#   logs/trades/executor=prod_ibkr/date=2025-05-01/part-....parquet
+#
+# so a year of prod / shadow / shadow_ibkr trades can be scanned with read_trades() in one call.
+
+JOURNAL_DIR = 'logs/trades'
+TRADE_FIELDS = ['date', 'ticker', 'action', 'price', 'shares', 'reason']
+FLUSH_ROWS = 100        # Flush once this many trades are buffered...
+FLUSH_SECONDS = 60      # ...or when the oldest buffered trade is this old
+COMPACTED_PART = 'part-compacted.parquet'
+
+class TradeJournal:
+    def __init__(self, executor, csv_path=None, csv_fields=TRADE_FIELDS, root=JOURNAL_DIR,
+                 flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        '''
+        executor names the Parquet partition; csv_path/csv_fields keep the executor's existing CSV
+        (pass csv_path=None for Parquet only)
+        '''
+        self.executor = executor
+        self.csv_path = csv_path
+        self.csv_fields = csv_fields
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.oldest = None
+
+    def record(self, ticker, action, price, shares=None, reason=''):
+        if not self.buffer:
+            self.oldest = time.monotonic()
+        self.buffer.append({
+            'date': datetime.now().replace(microsecond=0),
+            'ticker': ticker,
+            'action': action,
+            'price': round(float(price), 2),
+            'shares': _quantity(shares),
+            'reason': reason,
+        })
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.oldest >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        '''
+        Writes every buffered trade. Returns how many were written
+        '''
+        rows, self.buffer = self.buffer, []
+        if not rows:
+            return 0
+        if self.csv_path is not None:
+            self._append_csv(rows)
+        self._write_parquet(rows)
+        return len(rows)
+
+    def _append_csv(self, rows):
+        file_exists = os.path.isfile(self.csv_path)
+        with open(self.csv_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(self.csv_fields)
+            for row in rows:
+                values = {**row, 'date': row['date'].strftime("%Y-%m-%d %H:%M:%S")}
+                writer.writerow([values[field] for field in self.csv_fields])
+
+    def _write_parquet(self, rows):
+        df = pd.DataFrame(rows, columns=TRADE_FIELDS).astype({'shares': 'float64'})
+        for day, part in df.groupby(df['date'].dt.strftime('%Y-%m-%d')):
+            partition = self.root / f"executor={self.executor}" / f"date={day}"
+            partition.mkdir(parents=True, exist_ok=True)
+            _write_atomic(part, partition / f"part-{datetime.now():%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+
+    def close(self):
+        self.flush()
+        compact_journal(self.root, self.executor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _quantity(shares):
+    # Whole-share quantities stay ints so the CSVs keep writing 10, not 10.0 (Parquet stores float64)
+    if shares is None:
+        return None
+    shares = float(shares)
+    return int(shares) if shares.is_integer() else shares
+
+def _write_atomic(df, path):
+    tmp_path = path.with_suffix('.parquet.tmp')
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def compact_journal(root=JOURNAL_DIR, executor=None, before=None):
+    '''
+    Merges each finished day's part files into one, so old partitions stay one file per day.
+    Only days before `before` (default today) are touched, since today's may still be written to.
+    '''
+    before = before or datetime.now().strftime('%Y-%m-%d')
+    pattern = f"executor={executor}/date=*" if executor else "executor=*/date=*"
+
+    for partition in Path(root).glob(pattern):
+        if partition.name.split('=', 1)[1] >= before:
+            continue
+        parts = sorted(partition.glob('part-*.parquet'))
+        if len(parts) < 2:
+            continue
+        merged = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True).sort_values('date', kind='stable')
+        _write_atomic(merged, partition / COMPACTED_PART)
+        for part in parts:
+            if part.name != COMPACTED_PART:
+                part.unlink()
+
+def read_trades(root=JOURNAL_DIR, executors=None, start=None, end=None):
+    '''
+    Loads the journal as one DataFrame with an 'executor' column.
+    start/end are inclusive 'YYYY-MM-DD' strings and prune whole partitions before reading.
+    Partitions are walked by hand: the hive 'date=' key would clash with the 'date' column.
+    '''
+    root = Path(root)
+    frames = []
+    for partition in sorted(root.glob('executor=*/date=*')):
+        executor = partition.parent.name.split('=', 1)[1]
+        day = partition.name.split('=', 1)[1]
+        if executors is not None and executor not in executors:
+            continue
+        if (start and day < start) or (end and day > end):
+            continue
+        for part in sorted(partition.glob('part-*.parquet')):
+            frames.append(pd.read_parquet(part).assign(executor=executor))
+
+    if not frames:
+        return pd.DataFrame(columns=TRADE_FIELDS + ['executor'])
+    return pd.concat(frames, ignore_index=True).sort_values('date', kind='stable').reset_index(drop=True)
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from signals.panel_logic import calculate_atr_panel, calculate_ema_panel, stack_arrays
+from strategies.defensive_strategy import MIN_ROWS, resolve_params
+from utils.bar_store import LOOKBACK_DAYS, BarStore
+from utils.market_data import yfinance_batch_fetcher
+
+# Two-stage watchlist for scanning thousands of names.
+#   Stage 1 (here): the cheap half of the defensive strategy (EMA trend + ATR ratio) on each
+#     ticker's last cached daily bar, for the whole universe file in one panel pass.
+#   Stage 2 (executors): only the survivors, plus the core watchlist and held positions, get
+#     IBKR history, live quotes, full evaluation and orders.
+#
+#   python -m utils.universe                # refresh the universe's daily bars (yfinance), then screen
+#   python -m utils.universe --no-refresh   # screen the cached bars only
+#
+# Run it once a day (e.g. a launchd job before the first executor slot). The survivors go to
+# data/universe_screen.json; executors that find it missing or stale screen the cached bars inline.
+
+ETF_WATCHLIST = ['QQQM', 'VOO', 'IAU', 'IEFA', 'VWO', 'BOTZ', 'ROBO', 'XLE', 'VGK', 'EWJ', 'IJH', 'XLV', 'XLU']
+UNIVERSE_PATH = 'data/universe.txt'          # One symbol per line, '#' starts a comment
+SCREEN_PATH = 'data/universe_screen.json'
+UNIVERSE_SOURCE, UNIVERSE_BAR_SIZE = 'yfinance', '1d'
+REFRESH_CHUNK = 500         # Tickers per yf.download call
+MAX_CANDIDATES = 40         # Survivors promoted per cycle; each costs an IBKR history request + quote
+SCREEN_MAX_AGE_HOURS = 24
+
+def load_universe(path=UNIVERSE_PATH):
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            symbol = line.split('#', 1)[0].strip().upper()
+            if symbol:
+                symbols.append(symbol)
+    return list(dict.fromkeys(symbols))
+
+def refresh_universe_bars(symbols, store, chunk=REFRESH_CHUNK):
+    '''
+    Brings the universe's cached daily bars up to date, chunk tickers per download.
+    Returns {symbol: bars}
+    '''
+    frames = {}
+    for i in range(0, len(symbols), chunk):
+        batch = symbols[i:i + chunk]
+        print(f"📥 Refreshing daily bars {i + 1}-{i + len(batch)} of {len(symbols)}...")
+        fetched, _ = store.get_many(UNIVERSE_SOURCE, batch, UNIVERSE_BAR_SIZE, yfinance_batch_fetcher(auto_adjust=False))
+        frames.update(fetched)
+    return frames
+
+def load_cached_bars(symbols, store, lookback_days=LOOKBACK_DAYS):
+    frames = {}
+    for symbol in symbols:
+        bars = store.load(UNIVERSE_SOURCE, symbol, UNIVERSE_BAR_SIZE)
+        if bars is not None and not bars.empty:
+            frames[symbol] = bars[bars.index >= bars.index[-1] - pd.Timedelta(days=lookback_days)]
+    return frames
+
+def screen_universe(frames, params=None, max_candidates=MAX_CANDIDATES):
+    '''
+    Stage-1 filter: tickers whose last bar has the fast EMA above the slow one and an ATR/close
+    ratio under the strategy's maximum, strongest trend (fast/slow EMA spread) first.
+    A ticker failing these can't produce a BUY in evaluate_signal_from_df.
+    '''
+    if not frames:
+        return []
+    p = resolve_params(params)
+    arrays, _, tickers = stack_arrays(frames)
+    close = arrays['Close']
+    ema_fast = calculate_ema_panel(close, p['ema_fast'])
+    ema_slow = calculate_ema_panel(close, p['ema_slow'])
+    atr = calculate_atr_panel(arrays['High'], arrays['Low'], close, p['atr_period'])
+
+    # Tickers can end on different dates in the combined panel: use each one's last bar
+    has_close = ~np.isnan(close)
+    last = close.shape[0] - 1 - has_close[::-1].argmax(axis=0)
+    cols = np.arange(len(tickers))
+    fast, slow, last_atr, last_close = ema_fast[last, cols], ema_slow[last, cols], atr[last, cols], close[last, cols]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        survives = (
+            (has_close.sum(axis=0) >= MIN_ROWS) &
+            (fast > slow) &
+            (last_atr / last_close < p['atr_ratio_max'])
+        )
+        strength = fast / slow - 1
+
+    ranked = sorted(np.flatnonzero(survives), key=lambda i: -strength[i])
+    return [tickers[i] for i in ranked[:max_candidates]]
+
+def run_screen(universe_path=UNIVERSE_PATH, store=None, screen_path=SCREEN_PATH, refresh=True,
+               max_candidates=MAX_CANDIDATES):
+    '''
+    Stage 1 over the whole universe file. Saves and returns the survivors
+    '''
+    store = store or BarStore()
+    symbols = load_universe(universe_path)
+    frames = refresh_universe_bars(symbols, store) if refresh else load_cached_bars(symbols, store)
+    survivors = screen_universe(frames, max_candidates=max_candidates)
+
+    screen_path = Path(screen_path)
+    screen_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{screen_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'screened_at': datetime.now().isoformat(timespec='seconds'),
+            'universe': len(symbols),
+            'with_bars': len(frames),
+            'survivors': survivors,
+        }, f, indent=2)
+    os.replace(tmp_path, screen_path)
+
+    print(f"🔎 Screened {len(frames)}/{len(symbols)} symbols → {len(survivors)} candidates")
+    return survivors
+
+def load_screen(screen_path=SCREEN_PATH, max_age_hours=SCREEN_MAX_AGE_HOURS):
+    '''
+    The saved survivors, or None if there is no screen or it is older than max_age_hours
+    '''
+    screen_path = Path(screen_path)
+    if not screen_path.exists():
+        return None
+    with open(screen_path) as f:
+        screen = json.load(f)
+    if datetime.now() - datetime.fromisoformat(screen['screened_at']) > timedelta(hours=max_age_hours):
+        return None
+    return screen['survivors']
+
+def screened_watchlist(core, held=(), universe_path=UNIVERSE_PATH, store=None, screen_path=SCREEN_PATH,
+                       max_age_hours=SCREEN_MAX_AGE_HOURS):
+    '''
+    Stage-2 symbol list: the core watchlist, every held symbol (their SELLs must still be
+    evaluated) and the stage-1 survivors. A missing or stale screen is redone from cached bars,
+    without downloading anything.
+    '''
+    survivors = load_screen(screen_path, max_age_hours)
+    if survivors is None:
+        if Path(universe_path).exists():
+            survivors = run_screen(universe_path, store, screen_path, refresh=False)
+        else:
+            print(f"⚠️ No universe file at {universe_path}, using the core watchlist only")
+            survivors = []
+    return list(dict.fromkeys([*core, *held, *survivors]))
+
+# 🏁 Main entrypoint
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage-1 universe screen over cached daily bars")
+    parser.add_argument('--universe', default=UNIVERSE_PATH, help="symbol file, one per line")
+    parser.add_argument('--out', default=SCREEN_PATH, help="where to save the survivors")
+    parser.add_argument('--no-refresh', action='store_true', help="screen the cached bars without downloading")
+    parser.add_argument('--max-candidates', type=int, default=MAX_CANDIDATES)
+    args = parser.parse_args()
+
+    survivors = run_screen(args.universe, screen_path=args.out, refresh=not args.no_refresh, max_candidates=args.max_candidates)
+    print(', '.join(survivors))